@@ -1,15 +1,27 @@
 """
 backend/agent_OCR/__init__.py - Module OCR pour l'analyse de documents
+
+Les exports sont charges a la premiere utilisation : importer un sous-module
+leger (file_attente, reprise...) ne charge pas langgraph, openai, PyMuPDF
+ni reportlab.
 """
+import importlib
+
+_EXPORTS = {
+    'State': 'backend.agent_OCR.models',
+    'DocumentInfo': 'backend.agent_OCR.models',
+    'construire_workflow': 'backend.agent_OCR.workflow',
+    'creer_state_initial': 'backend.agent_OCR.workflow',
+    'traiter_dossier_documents': 'backend.agent_OCR.main',
+    'reprendre_dossier_documents': 'backend.agent_OCR.main'
+}
+
+__all__ = list(_EXPORTS)
+
 
-from backend.agent_OCR.models import State, DocumentInfo
-from backend.agent_OCR.workflow import construire_workflow, creer_state_initial
-from backend.agent_OCR.main import traiter_dossier_documents
-
-__all__ = [
-    'State',
-    'DocumentInfo',
-    'construire_workflow',
-    'creer_state_initial',
-    'traiter_dossier_documents'
-]
+def __getattr__(nom):
+    if nom not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+    valeur = getattr(importlib.import_module(_EXPORTS[nom]), nom)
+    globals()[nom] = valeur
+    return valeur
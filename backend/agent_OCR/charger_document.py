@@ -7,6 +7,7 @@ from typing import List
 import fitz  # PyMuPDF
 
 from backend.agent_OCR.utils import safe_print
+from backend.agent_OCR.metriques import compter
 
 
 def charger_documents(dossier_path: str) -> List[str]:
@@ -56,19 +57,19 @@ def verifier_pdf(pdf_path: str) -> bool:
         return False
 
 
-def convertir_pdf_en_images(pdf_paths, output_dir=None, dpi=300):
-    """
-    Convertit une liste de fichiers PDF en images en utilisant PyMuPDF (Fitz).
-    Cette fonction ne necessite pas Poppler.
+def iterer_pages_pdf(pdf_paths, output_dir=None, dpi=300, pages_ignorees=None):
     """
-    if not isinstance(pdf_paths, list):
-        raise TypeError("pdf_paths doit etre une liste de chemins de fichiers PDF.")
+    Rend les pages des PDFs une par une et produit le chemin de chaque image
+    des qu'elle est ecrite (generateur utilise par le mode pipeline).
 
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-        safe_print(f"Dossier de sortie cree: {output_dir}")
+    Les pages dont le chemin figure dans pages_ignorees (deja extraites lors
+    d'une execution precedente) sont produites sans etre rendues.
+    """
+    pages_ignorees = pages_ignorees or set()
 
-    images_paths = []
+    # Calculer le facteur de zoom base sur DPI (72 DPI est la resolution par defaut des PDF)
+    zoom = dpi / 72
+    mat = fitz.Matrix(zoom, zoom)
 
     for pdf_path in pdf_paths:
         try:
@@ -85,33 +86,60 @@ def convertir_pdf_en_images(pdf_paths, output_dir=None, dpi=300):
 
             safe_print(f"Conversion de {len(doc)} page(s) pour {base_name}")
 
-            # Convertir chaque page en image
-            for i, page in enumerate(doc):
-                # Calculer le facteur de zoom base sur DPI
-                zoom = dpi / 72  # 72 DPI est la resolution par defaut des PDF
+            try:
+                # Convertir chaque page en image
+                for i in range(len(doc)):
+                    # Definir le chemin de sortie
+                    if output_dir:
+                        image_path = os.path.join(output_dir, f"{base_name}_page_{i+1:02d}.png")
+                    else:
+                        image_path = f"{base_name}_page_{i+1:02d}.png"
+
+                    if image_path in pages_ignorees:
+                        yield image_path
+                        continue
+
+                    # Rendre la page comme une image et la sauvegarder
+                    pix = doc[i].get_pixmap(matrix=mat)
+                    pix.save(image_path)
+                    compter("pages_rendues")
+                    compter("octets_rendus", os.path.getsize(image_path))
+                    safe_print(f"Image sauvegardee: {image_path}")
+
+                    yield image_path
+            finally:
+                # Fermer le document
+                doc.close()
+
+        except Exception as e:
+            safe_print(f"Erreur lors de la conversion du PDF {pdf_path}: {str(e)}")
 
-                # Creer une matrice de transformation pour le zoom
-                mat = fitz.Matrix(zoom, zoom)
 
-                # Rendre la page comme une image
-                pix = page.get_pixmap(matrix=mat)
+def compter_pages_pdf(pdf_paths) -> int:
+    """Nombre total de pages des PDFs, sans rendu"""
+    total = 0
+    for pdf_path in pdf_paths:
+        try:
+            with fitz.open(pdf_path) as doc:
+                total += len(doc)
+        except Exception as e:
+            safe_print(f"Lecture du PDF {pdf_path} impossible: {str(e)}")
+    return total
 
-                # Definir le chemin de sortie
-                if output_dir:
-                    image_path = os.path.join(output_dir, f"{base_name}_page_{i+1:02d}.png")
-                else:
-                    image_path = f"{base_name}_page_{i+1:02d}.png"
 
-                # Sauvegarder l'image
-                pix.save(image_path)
-                images_paths.append(image_path)
-                safe_print(f"Image sauvegardee: {image_path}")
+def convertir_pdf_en_images(pdf_paths, output_dir=None, dpi=300):
+    """
+    Convertit une liste de fichiers PDF en images en utilisant PyMuPDF (Fitz).
+    Cette fonction ne necessite pas Poppler.
+    """
+    if not isinstance(pdf_paths, list):
+        raise TypeError("pdf_paths doit etre une liste de chemins de fichiers PDF.")
 
-            # Fermer le document
-            doc.close()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        safe_print(f"Dossier de sortie cree: {output_dir}")
 
-        except Exception as e:
-            safe_print(f"Erreur lors de la conversion du PDF {pdf_path}: {str(e)}")
+    images_paths = list(iterer_pages_pdf(pdf_paths, output_dir, dpi))
 
     safe_print(f"Nombre total d'images generees: {len(images_paths)}")
     return images_paths
@@ -1,51 +1,24 @@
 """
 backend/agent_OCR/concordance.py - Verification de concordance des documents
 """
-import re
 import os
 from typing import Dict, List, Tuple, Optional
-from datetime import datetime, timedelta
 
 from backend.agent_OCR.models import DocumentInfo
+from backend.services.normalisation import normaliser_texte
+from backend.services.index_identites import detecter_identites_partagees
+from backend.agent_OCR.rapprochement import parser_montant, parser_periode, construire_operations, rapprocher_salaires
+from backend.agent_OCR.regles import evaluer_regles
+from backend.config import PENALITES_SEVERITE_CONCORDANCE
 from backend.agent_OCR.utils import safe_print
 
 
 def normaliser_texte_ocr(texte: str) -> str:
     """
     Normalise le texte pour gerer les variations typiques de l'OCR
+    (minuscules, accents replies, ponctuation et espaces multiples supprimes)
     """
-    if not texte:
-        return ""
-
-    # Convertir en minuscules
-    texte = texte.lower()
-
-    # Enlever les accents
-    replacements = {
-        'a': 'a', 'a': 'a', 'a': 'a', 'a': 'a', 'a': 'a', 'a': 'a',
-        'e': 'e', 'e': 'e', 'e': 'e', 'e': 'e',
-        'i': 'i', 'i': 'i', 'i': 'i', 'i': 'i',
-        'o': 'o', 'o': 'o', 'o': 'o', 'o': 'o', 'o': 'o',
-        'u': 'u', 'u': 'u', 'u': 'u', 'u': 'u',
-        'c': 'c', 'n': 'n'
-    }
-    for ancien, nouveau in replacements.items():
-        texte = texte.replace(ancien, nouveau)
-
-    # Enlever ponctuation et espaces multiples
-    texte = re.sub(r'[^\w\s]', ' ', texte)
-    texte = re.sub(r'\s+', ' ', texte)
-
-    return texte.strip()
-
-
-def normaliser_numero(numero: str) -> str:
-    """
-    Normalise les numeros en enlevant espaces, tirets, points
-    """
-    if not numero:
-        return ""
-    return re.sub(r'[\s\-\.]', '', numero)
+    return normaliser_texte(texte)
 
 
 def comparer_textes_normalises(texte1: str, texte2: str, tolerance: float = 0.8) -> bool:
@@ -84,225 +57,69 @@ def verifier_concordance_complete(infos_documents: Dict[str, DocumentInfo]) -> T
         safe_print("Moins de 2 documents a comparer")
         return True, []
 
-    problemes = []
-
-    # 1. INFORMATIONS D'IDENTITE PERSONNELLE
-    problemes.extend(_verifier_identite_personnelle(infos_documents))
-
-    # 2. IDENTIFIANTS OFFICIELS
-    problemes.extend(_verifier_identifiants_officiels(infos_documents))
-
-    # 3. INFORMATIONS DE DOMICILE ET CONTACT
-    problemes.extend(_verifier_domicile_contact(infos_documents))
-
-    # 4. INFORMATIONS FINANCIERES
-    problemes.extend(_verifier_coherence_financiere(infos_documents))
-
-    # 5. COHERENCE TEMPORELLE
-    problemes.extend(_verifier_coherence_temporelle(infos_documents))
-
-    # 6. VERIFICATIONS CROISEES SPECIALISEES
-    problemes.extend(_verifier_croisements_specifiques(infos_documents))
-
-    return len(problemes) == 0, problemes
-
-
-def _verifier_identite_personnelle(infos_documents: Dict[str, DocumentInfo]) -> List[str]:
-    """Verifie la coherence des informations d'identite"""
-    problemes = []
-
-    # Collecter les informations
-    noms = [(chemin, info.nom) for chemin, info in infos_documents.items() if info.nom]
-    prenoms = [(chemin, info.prenom) for chemin, info in infos_documents.items() if info.prenom]
-    dates_naissance = [(chemin, info.date_naissance) for chemin, info in infos_documents.items() if info.date_naissance]
-
-    # Verifier les noms
-    if len(noms) >= 2:
-        noms_normalises = {normaliser_texte_ocr(nom) for _, nom in noms}
-        if len(noms_normalises) > 1:
-            problemes.append(f"Discordance des noms: {', '.join(f'{nom} ({os.path.basename(chemin)})' for chemin, nom in noms)}")
-
-    # Verifier les prenoms
-    if len(prenoms) >= 2:
-        prenoms_normalises = {normaliser_texte_ocr(prenom) for _, prenom in prenoms}
-        if len(prenoms_normalises) > 1:
-            problemes.append(f"Discordance des prenoms: {', '.join(f'{prenom} ({os.path.basename(chemin)})' for chemin, prenom in prenoms)}")
-
-    # Verifier les dates de naissance
-    if len(dates_naissance) >= 2:
-        dates_normalisees = {normaliser_numero(date) for _, date in dates_naissance}
-        if len(dates_normalisees) > 1:
-            problemes.append(f"Discordance des dates de naissance: {', '.join(f'{date} ({os.path.basename(chemin)})' for chemin, date in dates_naissance)}")
-
-    return problemes
+    analyse = evaluer_concordance(infos_documents)
+    return analyse["concordance_globale"], analyse["problemes_detectes"]
 
 
-def _verifier_identifiants_officiels(infos_documents: Dict[str, DocumentInfo]) -> List[str]:
-    """Verifie la coherence des identifiants officiels"""
-    problemes = []
-
-    # Numeros CIN
-    nums_cin = [(chemin, getattr(info, 'numero_cin', None)) for chemin, info in infos_documents.items() if getattr(info, 'numero_cin', None)]
-    if len(nums_cin) >= 2:
-        cin_normalises = {normaliser_numero(num) for _, num in nums_cin}
-        if len(cin_normalises) > 1:
-            problemes.append(f"Discordance des numeros CIN: {', '.join(f'{num} ({os.path.basename(chemin)})' for chemin, num in nums_cin)}")
-
-    # Numeros de securite sociale (si disponible)
-    nums_secu = [(chemin, getattr(info, 'numero_securite_sociale', None)) for chemin, info in infos_documents.items() if getattr(info, 'numero_securite_sociale', None)]
-    if len(nums_secu) >= 2:
-        secu_normalises = {normaliser_numero(num) for _, num in nums_secu}
-        if len(secu_normalises) > 1:
-            problemes.append(f"Discordance des numeros de securite sociale: {', '.join(f'{num} ({os.path.basename(chemin)})' for chemin, num in nums_secu)}")
-
-    return problemes
-
-
-def _verifier_domicile_contact(infos_documents: Dict[str, DocumentInfo]) -> List[str]:
-    """Verifie la coherence des informations de domicile et contact"""
-    problemes = []
-
-    # Adresses
-    adresses = [(chemin, info.adresse) for chemin, info in infos_documents.items() if info.adresse]
-    if len(adresses) >= 2:
-        # Grouper les adresses similaires
-        groupes_adresses = {}
-        for chemin, adresse in adresses:
-            adresse_norm = normaliser_texte_ocr(adresse)
-            groupe_trouve = False
-
-            for adresse_existante in groupes_adresses:
-                if comparer_textes_normalises(adresse_norm, adresse_existante, tolerance=0.7):
-                    groupes_adresses[adresse_existante].append((chemin, adresse))
-                    groupe_trouve = True
-                    break
-
-            if not groupe_trouve:
-                groupes_adresses[adresse_norm] = [(chemin, adresse)]
-
-        if len(groupes_adresses) > 1:
-            problemes.append(f"Possible discordance des adresses detectee entre {len(groupes_adresses)} groupes differents")
-
-    # Numeros de telephone
-    telephones = [(chemin, getattr(info, 'telephone', None)) for chemin, info in infos_documents.items() if getattr(info, 'telephone', None)]
-    if len(telephones) >= 2:
-        tel_normalises = {normaliser_numero(tel) for _, tel in telephones}
-        if len(tel_normalises) > 1:
-            problemes.append(f"Discordance des numeros de telephone: {', '.join(f'{tel} ({os.path.basename(chemin)})' for chemin, tel in telephones)}")
-
-    return problemes
-
-
-def _verifier_coherence_financiere(infos_documents: Dict[str, DocumentInfo]) -> List[str]:
-    """Verifie la coherence des informations financieres"""
-    problemes = []
-
-    # RIB/IBAN
-    ribs = [(chemin, getattr(info, 'rib', None)) for chemin, info in infos_documents.items() if getattr(info, 'rib', None)]
-    if len(ribs) >= 2:
-        rib_normalises = {normaliser_numero(rib) for _, rib in ribs}
-        if len(rib_normalises) > 1:
-            problemes.append(f"Discordance des RIB/IBAN: {', '.join(f'{rib} ({os.path.basename(chemin)})' for chemin, rib in ribs)}")
-
-    # Employeur (nom de l'entreprise)
-    employeurs = [(chemin, getattr(info, 'employeur', None)) for chemin, info in infos_documents.items() if getattr(info, 'employeur', None)]
-    if len(employeurs) >= 2:
-        employeurs_normalises = {normaliser_texte_ocr(emp) for _, emp in employeurs}
-        if len(employeurs_normalises) > 1:
-            problemes.append(f"Discordance des employeurs: {', '.join(f'{emp} ({os.path.basename(chemin)})' for chemin, emp in employeurs)}")
-
-    # Verification salaire vs virements (logique metier specifique)
-    salaires = [(chemin, getattr(info, 'salaire_net', None)) for chemin, info in infos_documents.items() if getattr(info, 'salaire_net', None)]
-    virements = [(chemin, getattr(info, 'montant_virement', None)) for chemin, info in infos_documents.items() if getattr(info, 'montant_virement', None)]
-
-    if salaires and virements:
-        # Logique de comparaison salaire/virement a implementer selon besoins
-        pass
-
-    return problemes
-
-
-def _verifier_coherence_temporelle(infos_documents: Dict[str, DocumentInfo]) -> List[str]:
-    """Verifie la coherence temporelle des documents"""
-    problemes = []
-
-    # Dates d'emission des documents
-    dates_emission = [(chemin, getattr(info, 'date_emission', None)) for chemin, info in infos_documents.items() if getattr(info, 'date_emission', None)]
-
-    if len(dates_emission) >= 2:
-        # Verifier que les dates ne sont pas trop eloignees (ex: plus de 6 mois)
-        try:
-            dates_parsed = []
-            for chemin, date_str in dates_emission:
-                # Tentative de parsing de differents formats de date
-                date_obj = _parser_date_flexible(date_str)
-                if date_obj:
-                    dates_parsed.append((chemin, date_obj))
-
-            if len(dates_parsed) >= 2:
-                dates_only = [date for _, date in dates_parsed]
-                ecart_max = max(dates_only) - min(dates_only)
+def _champ(info: DocumentInfo, cle: str):
+    """Valeur d'un champ du document : attribut ou, a defaut, autres_infos"""
+    valeur = getattr(info, cle, None)
+    if valeur is None:
+        valeur = info.autres_infos.get(cle)
+    return valeur if valeur not in ("", None) else None
 
-                if ecart_max.days > 180:  # Plus de 6 mois
-                    problemes.append(f"Ecart important entre les dates d'emission des documents: {ecart_max.days} jours")
-
-        except Exception as e:
-            safe_print(f"Erreur lors de la verification temporelle: {e}")
-
-    return problemes
-
-
-def _verifier_croisements_specifiques(infos_documents: Dict[str, DocumentInfo]) -> List[str]:
-    """Verifications croisees specialisees selon le type de document"""
-    problemes = []
-
-    # Identifier les types de documents disponibles
-    types_docs = {info.type_document for info in infos_documents.values()}
-
-    # Verifications specifiques CIN + Facture electricite
-    if 'cin' in types_docs and 'facture_electricite' in types_docs:
-        # L'adresse doit correspondre
-        # (deja verifie dans _verifier_domicile_contact mais on peut ajouter des regles specifiques)
-        pass
-
-    # Verifications specifiques Bulletin salaire + Releve bancaire
-    if 'bulletin_salaire' in types_docs and 'releve_bancaire' in types_docs:
-        # Les dates de paie doivent correspondre aux virements
-        # Les montants doivent etre coherents
-        pass
-
-    return problemes
 
+def _caracteristiques_document(chemin: str, info: DocumentInfo) -> Dict:
+    """
+    Construit l'enregistrement de caracteristiques d'un document : valeurs
+    brutes des champs compares par les regles et du rapprochement des salaires
+    """
+    numero_cin = _champ(info, 'numero_cin')
+    if numero_cin is None and 'cin' in (info.type_document or '').lower():
+        numero_cin = info.numero_document
+
+    caracteristiques = {
+        "chemin": chemin,
+        "fichier": os.path.basename(chemin),
+        "type_document": info.type_document,
+        "nom": info.nom,
+        "prenom": info.prenom,
+        "date_naissance": info.date_naissance,
+        "adresse": info.adresse,
+        "numero_cin": numero_cin,
+        "numero_securite_sociale": _champ(info, 'numero_securite_sociale'),
+        "telephone": _champ(info, 'telephone'),
+        "email": _champ(info, 'email'),
+        "rib": _champ(info, 'rib') or _champ(info, 'numero_compte'),  # Releve bancaire : numero_compte
+        "employeur": _champ(info, 'employeur') or _champ(info, 'entreprise'),
+        "date_emission": info.date_emission,
+        "salaire_net": parser_montant(_champ(info, 'salaire_net')),
+        "periode": parser_periode(_champ(info, 'periode')),
+        "operations": _champ(info, 'operations') or []
+    }
 
-def _parser_date_flexible(date_str: str) -> Optional[datetime]:
-    """Parse une date avec plusieurs formats possibles"""
-    if not date_str:
-        return None
+    return caracteristiques
 
-    formats = [
-        '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y',
-        '%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d',
-        '%d/%m/%y', '%d-%m-%y', '%d.%m.%y'
-    ]
 
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str.strip(), fmt)
-        except ValueError:
-            continue
+def evaluer_concordance(infos_documents: Dict[str, DocumentInfo], ref_demande: str = None) -> Dict[str, any]:
+    """
+    Moteur de concordance en une passe
 
-    return None
+    Chaque document est lu une seule fois en un enregistrement de
+    caracteristiques ; les regles declaratives (agent_OCR/regles.py), le
+    rapprochement des salaires et les statistiques de completude sont
+    calculees a partir de ces enregistrements.
 
+    Avec ref_demande, les identifiants extraits sont aussi recherches dans
+    l'index des autres demandes (meme CIN, RIB, telephone sous un autre nom).
 
-def analyser_concordance_detaillee(infos_documents: Dict[str, DocumentInfo]) -> Dict[str, any]:
-    """
-    Analyse detaillee de la concordance avec statistiques completes
+    Returns:
+        Dict: Verdict (concordance_globale, problemes_detectes) et statistiques detaillees
     """
-    if not infos_documents:
-        return {"analyse": "Aucun document a analyser"}
+    caracteristiques = [_caracteristiques_document(chemin, info) for chemin, info in infos_documents.items()]
 
     stats = {
-        "total_documents": len(infos_documents),
+        "total_documents": len(caracteristiques),
         "documents_avec_nom": 0,
         "documents_avec_prenom": 0,
         "documents_avec_date_naissance": 0,
@@ -318,36 +135,52 @@ def analyser_concordance_detaillee(infos_documents: Dict[str, DocumentInfo]) ->
     }
 
     # Compter les documents avec chaque type d'information
-    for chemin, info in infos_documents.items():
-        if info.nom:
-            stats["documents_avec_nom"] += 1
-        if info.prenom:
-            stats["documents_avec_prenom"] += 1
-        if info.date_naissance:
-            stats["documents_avec_date_naissance"] += 1
-        if info.adresse:
-            stats["documents_avec_adresse"] += 1
-        if getattr(info, 'numero_cin', None):
-            stats["documents_avec_cin"] += 1
-        if getattr(info, 'telephone', None):
-            stats["documents_avec_telephone"] += 1
-        if getattr(info, 'rib', None):
-            stats["documents_avec_rib"] += 1
+    for c in caracteristiques:
+        for cle, compteur in (("nom", "documents_avec_nom"),
+                              ("prenom", "documents_avec_prenom"),
+                              ("date_naissance", "documents_avec_date_naissance"),
+                              ("adresse", "documents_avec_adresse"),
+                              ("numero_cin", "documents_avec_cin"),
+                              ("telephone", "documents_avec_telephone"),
+                              ("rib", "documents_avec_rib")):
+            if c[cle]:
+                stats[compteur] += 1
 
         # Compter les types de documents
-        type_doc = info.type_document
-        if type_doc not in stats["types_documents"]:
-            stats["types_documents"][type_doc] = 0
-        stats["types_documents"][type_doc] += 1
-
-    # Verifier la concordance
-    concordance, problemes = verifier_concordance_complete(infos_documents)
-    stats["concordance_globale"] = concordance
+        type_doc = c["type_document"]
+        stats["types_documents"][type_doc] = stats["types_documents"].get(type_doc, 0) + 1
+
+    # Verifier la concordance : (message, severite)
+    discordances = []
+    if len(caracteristiques) >= 2:
+        # 1 a 5. REGLES DECLARATIVES (identite, identifiants, domicile, financier, temporel)
+        discordances_regles, stats["regles"] = evaluer_regles(caracteristiques)
+        discordances.extend(discordances_regles)
+
+        # 6. SALAIRES NETS DES BULLETINS / CREDITS DES RELEVES
+        rapprochement = _rapprocher_salaires_releves(caracteristiques)
+        if rapprochement:
+            stats["rapprochement_salaires"] = rapprochement
+            discordances.extend((probleme, "majeure") for probleme in rapprochement["problemes"])
+
+    # 7. IDENTIFIANTS PARTAGES AVEC D'AUTRES DEMANDES
+    stats["identites"] = _identites_extraites(caracteristiques)
+    if ref_demande:
+        try:
+            alertes = detecter_identites_partagees(ref_demande, stats["identites"], stats["identites"]["nom"])
+            discordances.extend((alerte, "majeure") for alerte in alertes)
+        except Exception as e:
+            safe_print(f"Consultation de l'index des identites impossible: {e}")
+
+    problemes = [message for message, _ in discordances]
+    stats["concordance_globale"] = len(problemes) == 0
     stats["problemes_detectes"] = problemes
+    stats["problemes_par_severite"] = {}
+    for _, severite in discordances:
+        stats["problemes_par_severite"][severite] = stats["problemes_par_severite"].get(severite, 0) + 1
 
     # Calculer un score de confiance
-    score = _calculer_score_confiance(stats, problemes)
-    stats["score_confiance"] = score
+    stats["score_confiance"] = _calculer_score_confiance(stats, problemes)
 
     # Generer des recommandations
     stats["recommandations"] = _generer_recommandations(stats)
@@ -355,12 +188,62 @@ def analyser_concordance_detaillee(infos_documents: Dict[str, DocumentInfo]) ->
     return stats
 
 
+def _identites_extraites(caracteristiques: List[Dict]) -> Dict:
+    """Identifiants extraits des documents, au format de l'index des identites"""
+    identites = {
+        "cin": sorted({c["numero_cin"] for c in caracteristiques if c["numero_cin"]}),
+        "rib": sorted({c["rib"] for c in caracteristiques if c["rib"]}),
+        "telephone": sorted({c["telephone"] for c in caracteristiques if c["telephone"]}),
+        "email": sorted({c["email"] for c in caracteristiques if c["email"]}),
+        "employeur": sorted({c["employeur"] for c in caracteristiques if c["employeur"]}),
+        "nom": None
+    }
+    for c in caracteristiques:
+        if c["nom"]:
+            identites["nom"] = f"{c['nom']} {c['prenom'] or ''}".strip()
+            break
+    return identites
+
+
+def _rapprocher_salaires_releves(caracteristiques: List[Dict]) -> Optional[Dict]:
+    """
+    Rapproche le salaire net de chaque bulletin des operations au credit des releves
+
+    Returns:
+        Optional[Dict]: Resultat de rapprocher_salaires, None sans bulletin ou sans releve exploitable
+    """
+    bulletins = [{"fichier": c["fichier"], "salaire_net": c["salaire_net"], "periode": c["periode"]}
+                 for c in caracteristiques if c["salaire_net"]]
+    lignes = [ligne for c in caracteristiques for ligne in c["operations"]]
+    if not bulletins or not lignes:
+        return None
+
+    operations = construire_operations(lignes)
+    if not operations["montant"]:
+        return None
+    return rapprocher_salaires(bulletins, operations)
+
+
+def analyser_concordance_detaillee(infos_documents: Dict[str, DocumentInfo], ref_demande: str = None) -> Dict[str, any]:
+    """
+    Analyse detaillee de la concordance avec statistiques completes
+    """
+    if not infos_documents:
+        return {"analyse": "Aucun document a analyser"}
+
+    return evaluer_concordance(infos_documents, ref_demande)
+
+
 def _calculer_score_confiance(stats: Dict, problemes: List[str]) -> float:
     """Calcule un score de confiance base sur la concordance et la completude"""
     score_base = 100.0
 
-    # Penalites pour les problemes detectes
-    score_base -= len(problemes) * 15
+    # Penalites pour les problemes detectes, selon leur severite
+    par_severite = stats.get("problemes_par_severite")
+    if par_severite:
+        score_base -= sum(PENALITES_SEVERITE_CONCORDANCE[severite] * nombre for severite, nombre in par_severite.items())
+    else:
+        score_base -= len(problemes) * PENALITES_SEVERITE_CONCORDANCE["majeure"]
 
     # Bonus pour la completude des informations
     if stats["documents_avec_nom"] >= 2:
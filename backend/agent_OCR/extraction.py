@@ -1,13 +1,18 @@
 """
 backend/agent_OCR/extraction.py - Extraction OCR avec OpenAI
 """
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 import os
 import base64
 import re
+import queue
+import threading
+import contextvars
 
+from backend.config import TAILLE_FILE_PIPELINE_OCR, NB_EXTRACTEURS_PIPELINE_OCR
 from backend.agent_OCR.models import DocumentInfo
 from backend.agent_OCR.utils import safe_print, safe_text_handling
+from backend.agent_OCR.metriques import compter
 
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -109,6 +114,7 @@ Si RELEVE_BANCAIRE :
 - solde_initial: [montant en DH]
 - solde_final: [montant en DH]
 - date_emission: [JJ/MM/AAAA]
+- operation: [JJ/MM/AAAA | libelle | montant en DH] (une ligne par operation au CREDIT, repeter le champ)
 
 **ETAPE 3 - GESTION DES CAS DIFFICILES**
 - Si un champ est illisible : marque "ILLISIBLE"
@@ -172,54 +178,171 @@ OBSERVATIONS:
     }
 
 
-def extraire_infos_documents(client, chemins_images: list) -> Dict[str, dict]:
+def extraire_infos_documents(client, chemins_images: list,
+                             resultats_existants: Optional[Dict[str, dict]] = None,
+                             callback_page=None) -> Dict[str, dict]:
     """
     Extrait les informations des documents avec validation de qualite
     Retourne un dictionnaire avec analyses completes
+
+    Args:
+        client: Client OpenAI
+        chemins_images: Chemins des images a analyser
+        resultats_existants: Pages deja extraites (reprise), non renvoyees a l'API
+        callback_page: Appelee avec (chemin, resultat) apres chaque page terminee
     """
     if not chemins_images:
         raise ValueError("Aucun chemin d'image fourni")
 
     resultats = {}
+    resultats_existants = resultats_existants or {}
 
     for chemin in chemins_images:
-        try:
-            # Verifications prealables
-            if not os.path.exists(chemin):
-                safe_print(f"L'image n'existe pas: {chemin}")
-                resultats[chemin] = {
-                    "extraction_brute": "ERREUR: Fichier introuvable",
-                    "qualite": "ERREUR",
-                    "parsed_info": None
-                }
-                continue
+        if chemin in resultats_existants:
+            safe_print(f"Page deja extraite, reprise: {os.path.basename(chemin)}")
+            resultats[chemin] = resultats_existants[chemin]
+            compter("hits_cache")
+            continue
 
-            # Encoder l'image
-            base64_image = encode_image_to_base64(chemin)
-            if not base64_image:
-                safe_print(f"Echec de l'encodage: {chemin}")
-                resultats[chemin] = {
-                    "extraction_brute": "ERREUR: Probleme d'encodage",
-                    "qualite": "ERREUR",
-                    "parsed_info": None
-                }
-                continue
+        compter("pages")
+        resultats[chemin] = _extraire_page(client, chemin)
+
+        if callback_page:
+            callback_page(chemin, resultats[chemin])
 
-            safe_print(f"Traitement de: {os.path.basename(chemin)}")
+    return resultats
 
-            # Tentative d'extraction normale
-            resultat_extraction = _extraire_avec_gestion_qualite(client, base64_image, chemin)
-            resultats[chemin] = resultat_extraction
 
-        except Exception as e:
-            safe_print(f"Erreur generale pour {chemin}: {str(e)}")
-            resultats[chemin] = {
-                "extraction_brute": f"ERREUR: {str(e)}",
+def _extraire_page(client, chemin: str, base64_image: Optional[str] = None) -> dict:
+    """Extrait une page, l'image pouvant avoir ete encodee au prealable"""
+    try:
+        # Verifications prealables
+        if not os.path.exists(chemin):
+            safe_print(f"L'image n'existe pas: {chemin}")
+            return {
+                "extraction_brute": "ERREUR: Fichier introuvable",
                 "qualite": "ERREUR",
-                "parsed_info": _creer_document_info_erreur(str(e))
+                "parsed_info": None
             }
 
-    return resultats
+        # Encoder l'image
+        if base64_image is None:
+            base64_image = encode_image_to_base64(chemin)
+        if not base64_image:
+            safe_print(f"Echec de l'encodage: {chemin}")
+            return {
+                "extraction_brute": "ERREUR: Probleme d'encodage",
+                "qualite": "ERREUR",
+                "parsed_info": None
+            }
+
+        safe_print(f"Traitement de: {os.path.basename(chemin)}")
+
+        # Tentative d'extraction normale
+        return _extraire_avec_gestion_qualite(client, base64_image, chemin)
+
+    except Exception as e:
+        safe_print(f"Erreur generale pour {chemin}: {str(e)}")
+        return {
+            "extraction_brute": f"ERREUR: {str(e)}",
+            "qualite": "ERREUR",
+            "parsed_info": _creer_document_info_erreur(str(e))
+        }
+
+
+def extraire_infos_documents_en_flux(client, pages: Iterable[str],
+                                     resultats_existants: Optional[Dict[str, dict]] = None,
+                                     callback_page=None,
+                                     taille_file: int = TAILLE_FILE_PIPELINE_OCR,
+                                     nb_extracteurs: int = NB_EXTRACTEURS_PIPELINE_OCR) -> Dict[str, dict]:
+    """
+    Variante pipeline de extraire_infos_documents : rendu, encodage et extraction en flux
+
+    Un thread producteur consomme `pages` (generateur de rendu, voir
+    charger_document.iterer_pages_pdf) et encode chaque image ; nb_extracteurs
+    threads envoient les pages a l'API. La file est bornee a taille_file pages :
+    le rendu se met en pause quand l'extraction prend du retard, ce qui borne la
+    memoire occupee par les images encodees.
+
+    Returns:
+        Dict[str, dict]: Resultats par chemin d'image, dans l'ordre de rendu
+    """
+    resultats_existants = resultats_existants or {}
+    file_pages = queue.Queue(maxsize=max(1, taille_file))
+    arret = threading.Event()
+    verrou = threading.Lock()
+    ordre = []
+    resultats = {}
+    erreurs = []
+
+    def deposer(element) -> bool:
+        # Bloque tant que la file est pleine, sauf si l'extraction a ete interrompue
+        while not arret.is_set():
+            try:
+                file_pages.put(element, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produire():
+        try:
+            for chemin in pages:
+                ordre.append(chemin)
+                if chemin in resultats_existants:
+                    safe_print(f"Page deja extraite, reprise: {os.path.basename(chemin)}")
+                    with verrou:
+                        resultats[chemin] = resultats_existants[chemin]
+                    compter("hits_cache")
+                    continue
+
+                base64_image = encode_image_to_base64(chemin) if os.path.exists(chemin) else None
+                if not deposer((chemin, base64_image)):
+                    return
+        except BaseException as e:
+            erreurs.append(e)
+            arret.set()
+        finally:
+            for _ in range(nb_extracteurs):
+                deposer(None)
+
+    def extraire():
+        try:
+            while not arret.is_set():
+                try:
+                    element = file_pages.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if element is None:
+                    return
+
+                chemin, base64_image = element
+                compter("pages")
+                resultat = _extraire_page(client, chemin, base64_image)
+                with verrou:
+                    resultats[chemin] = resultat
+
+                if callback_page:
+                    callback_page(chemin, resultat)
+        except BaseException as e:
+            # Remonter l'erreur au thread appelant et debloquer le producteur
+            erreurs.append(e)
+            arret.set()
+
+    # Chaque thread herite du contexte courant (compteurs du noeud en cours)
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(produire,), daemon=True)]
+    for _ in range(nb_extracteurs):
+        threads.append(threading.Thread(target=contextvars.copy_context().run, args=(extraire,), daemon=True))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if erreurs:
+        raise erreurs[0]
+
+    return {chemin: resultats[chemin] for chemin in ordre if chemin in resultats}
 
 
 def _extraire_avec_gestion_qualite(client, base64_image: str, chemin: str) -> dict:
@@ -228,6 +351,7 @@ def _extraire_avec_gestion_qualite(client, base64_image: str, chemin: str) -> di
     # Premiere tentative avec prompt normal
     try:
         prompt = construire_prompt_ocr()
+        compter("appels_api")
         response = client.chat.completions.create(
             model="gpt-4o",
             messages=[
@@ -279,6 +403,7 @@ def _tentative_recuperation(client, base64_image: str, extraction_normale: str,
     try:
         prompt_recuperation = construire_prompt_recuperation()
 
+        compter("appels_api")
         response = client.chat.completions.create(
             model="gpt-4o",
             messages=[
@@ -359,7 +484,11 @@ def parser_informations_ameliore(texte_document: str) -> dict:
                     champ, valeur = line[2:].split(':', 1)
                     champ_clean = safe_text_handling(champ.strip())
                     valeur_clean = safe_text_handling(valeur.strip())
-                    result["informations"][champ_clean] = valeur_clean
+                    if champ_clean == "operation":
+                        # Lignes d'operations du releve : champ repete
+                        result["informations"].setdefault("operations", []).append(valeur_clean)
+                    else:
+                        result["informations"][champ_clean] = valeur_clean
             elif line.startswith('- ') and current_section == 'obs':
                 result["observations"].append(line[2:])
 
@@ -553,12 +682,21 @@ def analyser_nom_fichier_ameliore(chemin_fichier: str) -> DocumentInfo:
 
 
 # Fonction principale d'extraction OCR uniquement
-def traiter_documents_ocr(client, chemins_images: list) -> Dict[str, any]:
+def traiter_documents_ocr(client, chemins_images,
+                          resultats_existants: Optional[Dict[str, dict]] = None,
+                          callback_page=None,
+                          en_flux: bool = False) -> Dict[str, any]:
     """
     Traitement OCR uniquement - se concentre sur l'extraction
+
+    Avec en_flux=True, chemins_images peut etre un generateur de rendu :
+    les pages sont extraites au fur et a mesure de leur rendu.
     """
     # 1. Extraction OCR
-    resultats_ocr = extraire_infos_documents(client, chemins_images)
+    if en_flux:
+        resultats_ocr = extraire_infos_documents_en_flux(client, chemins_images, resultats_existants, callback_page)
+    else:
+        resultats_ocr = extraire_infos_documents(client, chemins_images, resultats_existants, callback_page)
 
     # 2. Conversion vers DocumentInfo
     infos_documents = {}
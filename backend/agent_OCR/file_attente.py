@@ -0,0 +1,385 @@
+"""
+backend/agent_OCR/file_attente.py - File d'attente persistante des traitements OCR et pool de workers
+"""
+import os
+import time
+import sqlite3
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from backend.config import (
+    FICHIER_FILE_ATTENTE_OCR,
+    NB_WORKERS_OCR,
+    INTERVALLE_SCRUTATION_OCR,
+    DELAI_HEARTBEAT_OCR
+)
+from backend.agent_OCR.utils import configurer_encodage_console
+from backend.utils import mettre_a_jour_statut_traitement
+
+# Etats d'un job
+JOB_EN_ATTENTE = "en_attente"
+JOB_EN_COURS = "en_cours"
+JOB_TERMINE = "termine"
+JOB_ERREUR = "erreur"
+
+
+@contextmanager
+def _base():
+    """Connexion courte sur la file, validee puis fermee en sortie"""
+    os.makedirs(os.path.dirname(FICHIER_FILE_ATTENTE_OCR), exist_ok=True)
+    conn = sqlite3.connect(FICHIER_FILE_ATTENTE_OCR, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs_ocr (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dossier_path TEXT NOT NULL,
+                ref_demande TEXT,
+                reprendre INTEGER NOT NULL DEFAULT 0,
+                statut TEXT NOT NULL,
+                worker TEXT,
+                tentatives INTEGER NOT NULL DEFAULT 0,
+                date_creation TEXT NOT NULL,
+                date_debut TEXT,
+                date_fin TEXT,
+                erreur TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_ocr_statut ON jobs_ocr (statut, id);
+            CREATE INDEX IF NOT EXISTS idx_jobs_ocr_dossier ON jobs_ocr (dossier_path, statut);
+            CREATE TABLE IF NOT EXISTS workers_ocr (
+                worker TEXT PRIMARY KEY,
+                pid INTEGER,
+                heartbeat TEXT NOT NULL
+            );
+        """)
+        yield conn
+    finally:
+        conn.close()
+
+
+def _pid_existe(pid: Optional[int]) -> bool:
+    """Processus encore present (POSIX) ; inconnu ailleurs : seul le heartbeat fait foi"""
+    if not pid or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _job_orphelin(conn: sqlite3.Connection, job, delai: int = DELAI_HEARTBEAT_OCR) -> bool:
+    """
+    Job en cours dont le worker qui l'a reserve est mort
+
+    Le worker est juge sur son propre heartbeat (table workers_ocr, publie
+    par un thread independant du traitement) et sur son pid, quel que soit
+    le statut de traitement_status.json : un rendu ou un appel d'API long
+    ne fait pas passer un worker vivant pour mort, et un worker mort avant
+    d'avoir publie "processing" libere quand meme son job.
+    """
+    if not job["worker"]:
+        return True
+    ligne = conn.execute("SELECT pid, heartbeat FROM workers_ocr WHERE worker = ?", (job["worker"],)).fetchone()
+    if ligne is None:
+        return True
+    limite = (datetime.now() - timedelta(seconds=delai)).isoformat()
+    return ligne["heartbeat"] < limite or not _pid_existe(ligne["pid"])
+
+
+def _remettre_en_file(conn: sqlite3.Connection, job_id: int):
+    conn.execute(
+        "UPDATE jobs_ocr SET statut = ?, reprendre = 1, worker = NULL WHERE id = ? AND statut = ?",
+        (JOB_EN_ATTENTE, job_id, JOB_EN_COURS)
+    )
+
+
+@contextmanager
+def verrouiller_file(dossier_path: str):
+    """
+    Tient la file verrouillee en ecriture (BEGIN IMMEDIATE) le temps d'une operation sur un dossier
+
+    Aucun job ne peut etre ajoute ni reserve tant que le verrou est tenu : un
+    dossier deplace sous ce verrou ne peut pas etre mis en file entre la
+    verification et le renommage.
+
+    Yields:
+        bool: True si un job attend ou traite deja ce dossier
+    """
+    with _base() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn.execute(
+                "SELECT 1 FROM jobs_ocr WHERE dossier_path = ? AND statut IN (?, ?) LIMIT 1",
+                (dossier_path, JOB_EN_ATTENTE, JOB_EN_COURS)
+            ).fetchone() is not None
+        finally:
+            conn.execute("COMMIT")
+
+
+def enfiler_traitement(dossier_path: str, ref_demande: str = None, reprendre: bool = False) -> int:
+    """
+    Ajoute un dossier a la file des traitements OCR
+
+    Si un job est deja en attente ou en cours pour ce dossier, il est reutilise
+    (remis en file, en mode reprise, si le worker qui le traitait est mort).
+
+    Args:
+        dossier_path (str): Chemin du dossier client
+        ref_demande (str): Reference de la demande
+        reprendre (bool): Reprendre depuis le dernier checkpoint
+
+    Returns:
+        int: Identifiant du job
+
+    Raises:
+        FileNotFoundError: Le dossier n'existe plus (deplace par la migration des dossiers)
+    """
+    maintenant = datetime.now().isoformat()
+
+    with _base() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        existant = conn.execute(
+            "SELECT id, statut, worker FROM jobs_ocr WHERE dossier_path = ? AND statut IN (?, ?) ORDER BY id LIMIT 1",
+            (dossier_path, JOB_EN_ATTENTE, JOB_EN_COURS)
+        ).fetchone()
+
+        if existant:
+            relance = existant["statut"] == JOB_EN_COURS and _job_orphelin(conn, existant)
+            if relance:
+                _remettre_en_file(conn, existant["id"])
+            elif existant["statut"] == JOB_EN_ATTENTE:
+                conn.execute("UPDATE jobs_ocr SET reprendre = ? WHERE id = ?", (int(reprendre), existant["id"]))
+            conn.execute("COMMIT")
+            if relance:
+                mettre_a_jour_statut_traitement(dossier_path, status="queued")
+            return existant["id"]
+
+        # Verifie sous le verrou de la file, que la migration des dossiers tient pendant un renommage
+        if not os.path.isdir(dossier_path):
+            conn.execute("ROLLBACK")
+            raise FileNotFoundError(f"Dossier introuvable (deplace ?): {dossier_path}")
+
+        curseur = conn.execute(
+            "INSERT INTO jobs_ocr (dossier_path, ref_demande, reprendre, statut, date_creation) VALUES (?, ?, ?, ?, ?)",
+            (dossier_path, ref_demande, int(reprendre), JOB_EN_ATTENTE, maintenant)
+        )
+        conn.execute("COMMIT")
+        job_id = curseur.lastrowid
+
+    champs = {"status": "queued", "job_id": job_id, "ref_demande": ref_demande, "queued_time": maintenant}
+    if not reprendre:
+        champs.update({"etape": None, "pages_traitees": 0, "error": None})
+    mettre_a_jour_statut_traitement(dossier_path, **champs)
+
+    return job_id
+
+
+def prendre_prochain_job(worker: str) -> Optional[Dict]:
+    """
+    Reserve atomiquement le plus ancien job en attente pour un worker
+
+    Returns:
+        Optional[Dict]: Job reserve ou None si la file est vide
+    """
+    with _base() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        ligne = conn.execute(
+            "SELECT * FROM jobs_ocr WHERE statut = ? ORDER BY id LIMIT 1", (JOB_EN_ATTENTE,)
+        ).fetchone()
+
+        if ligne is None:
+            conn.execute("COMMIT")
+            return None
+
+        conn.execute(
+            "UPDATE jobs_ocr SET statut = ?, worker = ?, tentatives = tentatives + 1, date_debut = ? WHERE id = ?",
+            (JOB_EN_COURS, worker, datetime.now().isoformat(), ligne["id"])
+        )
+        conn.execute("COMMIT")
+
+    return dict(ligne)
+
+
+def terminer_job(job_id: int, succes: bool, erreur: str = None):
+    """Marque un job comme termine ou en erreur"""
+    with _base() as conn:
+        conn.execute(
+            "UPDATE jobs_ocr SET statut = ?, date_fin = ?, erreur = ? WHERE id = ?",
+            (JOB_TERMINE if succes else JOB_ERREUR, datetime.now().isoformat(), erreur, job_id)
+        )
+
+
+def lister_jobs(statuts: List[str] = None, limite: int = 100) -> List[Dict]:
+    """Liste les jobs les plus recents, eventuellement filtres par statut"""
+    with _base() as conn:
+        if statuts:
+            marqueurs = ", ".join("?" for _ in statuts)
+            lignes = conn.execute(
+                f"SELECT * FROM jobs_ocr WHERE statut IN ({marqueurs}) ORDER BY id DESC LIMIT ?",
+                (*statuts, limite)
+            ).fetchall()
+        else:
+            lignes = conn.execute("SELECT * FROM jobs_ocr ORDER BY id DESC LIMIT ?", (limite,)).fetchall()
+    return [dict(ligne) for ligne in lignes]
+
+
+def job_dossier(dossier_path: str) -> Optional[Dict]:
+    """
+    Job en attente ou en cours pour un dossier
+
+    Returns:
+        Optional[Dict]: Job, avec "orphelin" (worker mort, voir _job_orphelin), None sans job actif
+    """
+    with _base() as conn:
+        ligne = conn.execute(
+            "SELECT * FROM jobs_ocr WHERE dossier_path = ? AND statut IN (?, ?) ORDER BY id LIMIT 1",
+            (dossier_path, JOB_EN_ATTENTE, JOB_EN_COURS)
+        ).fetchone()
+        if ligne is None:
+            return None
+        job = dict(ligne)
+        job["orphelin"] = job["statut"] == JOB_EN_COURS and _job_orphelin(conn, ligne)
+    return job
+
+
+def compter_workers_actifs(delai: int = DELAI_HEARTBEAT_OCR) -> int:
+    """Nombre de workers ayant donne signe de vie recemment"""
+    limite = (datetime.now() - timedelta(seconds=delai)).isoformat()
+    with _base() as conn:
+        return conn.execute("SELECT COUNT(*) FROM workers_ocr WHERE heartbeat >= ?", (limite,)).fetchone()[0]
+
+
+def recuperer_jobs_orphelins() -> int:
+    """
+    Remet en file, en mode reprise, les jobs en cours dont le worker est mort
+
+    Un job est orphelin quand le worker qui l'a reserve n'a plus de heartbeat
+    recent dans workers_ocr ou que son processus n'existe plus (_job_orphelin).
+
+    Returns:
+        int: Nombre de jobs remis en file
+    """
+    with _base() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        jobs = conn.execute(
+            "SELECT id, dossier_path, worker FROM jobs_ocr WHERE statut = ?", (JOB_EN_COURS,)
+        ).fetchall()
+        orphelins = [job for job in jobs if _job_orphelin(conn, job)]
+        for job in orphelins:
+            _remettre_en_file(conn, job["id"])
+        # Workers morts sans job en cours : leur ligne ne sert plus
+        limite = (datetime.now() - timedelta(seconds=DELAI_HEARTBEAT_OCR)).isoformat()
+        conn.execute(
+            "DELETE FROM workers_ocr WHERE heartbeat < ? AND worker NOT IN "
+            "(SELECT worker FROM jobs_ocr WHERE statut = ? AND worker IS NOT NULL)",
+            (limite, JOB_EN_COURS)
+        )
+        conn.execute("COMMIT")
+
+    for job in orphelins:
+        mettre_a_jour_statut_traitement(job["dossier_path"], status="queued")
+    return len(orphelins)
+
+
+def executer_job(job: Dict, worker: str) -> bool:
+    """Execute un job OCR et publie sa progression dans traitement_status.json"""
+    # Import differe : seuls les workers chargent la pile OCR complete
+    from backend.agent_OCR.main import traiter_et_publier_statut
+
+    resultat = traiter_et_publier_statut(
+        job["dossier_path"],
+        reprendre=bool(job["reprendre"]),
+        worker=worker,
+        job_id=job["id"]
+    )
+
+    if resultat:
+        terminer_job(job["id"], True)
+        return True
+
+    terminer_job(job["id"], False, "Echec du traitement")
+    return False
+
+
+def _publier_heartbeat(worker: str):
+    try:
+        with _base() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers_ocr (worker, pid, heartbeat) VALUES (?, ?, ?)",
+                (worker, os.getpid(), datetime.now().isoformat())
+            )
+    except sqlite3.Error:
+        pass
+
+
+def _battre_coeur(worker: str, arret: threading.Event):
+    """Publie le heartbeat du worker meme pendant un job long"""
+    while not arret.wait(DELAI_HEARTBEAT_OCR / 4):
+        _publier_heartbeat(worker)
+
+
+def boucle_worker(worker: str, intervalle: float = INTERVALLE_SCRUTATION_OCR):
+    """
+    Boucle d'un worker : reserve et execute les jobs jusqu'a interruption
+
+    Le pid est ajoute au nom du worker : un worker relance a la place d'un
+    worker mort n'herite pas de son heartbeat, ni donc de ses jobs.
+    """
+    worker = f"{worker}:{os.getpid()}"
+    arret = threading.Event()
+    _publier_heartbeat(worker)  # Avant la premiere reservation : un job n'a jamais de worker inconnu
+    threading.Thread(target=_battre_coeur, args=(worker, arret), daemon=True).start()
+
+    try:
+        while True:
+            job = prendre_prochain_job(worker)
+            if job is None:
+                time.sleep(intervalle)
+                continue
+            executer_job(job, worker)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        arret.set()
+        with _base() as conn:
+            conn.execute("DELETE FROM workers_ocr WHERE worker = ?", (worker,))
+
+
+def lancer_pool_workers(nb_workers: int = NB_WORKERS_OCR):
+    """
+    Lance un pool de processus workers et surveille les jobs orphelins
+
+    Bloquant jusqu'a Ctrl+C. Un worker mort est relance automatiquement.
+    """
+    configurer_encodage_console()
+    print(f"Demarrage de {nb_workers} worker(s) OCR - file: {FICHIER_FILE_ATTENTE_OCR}")
+
+    recuperes = recuperer_jobs_orphelins()
+    if recuperes:
+        print(f"{recuperes} job(s) interrompu(s) remis en file")
+
+    processus = {}
+    try:
+        while True:
+            for i in range(nb_workers):
+                nom = f"worker-{os.getpid()}-{i + 1}"
+                if nom not in processus or not processus[nom].is_alive():
+                    p = multiprocessing.Process(target=boucle_worker, args=(nom,), daemon=True)
+                    p.start()
+                    processus[nom] = p
+
+            time.sleep(DELAI_HEARTBEAT_OCR / 4)
+            recuperer_jobs_orphelins()
+    except KeyboardInterrupt:
+        print("Arret des workers OCR...")
+        for p in processus.values():
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
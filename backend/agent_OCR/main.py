@@ -3,17 +3,55 @@ backend/agent_OCR/main.py - Point d'entree principal pour le traitement OCR
 """
 import os
 import sys
+import json
+import time
+import argparse
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import List, Optional
 
+from backend.config import TYPES_CREDIT
 from backend.agent_OCR.models import State
 from backend.agent_OCR.workflow import construire_workflow
-from backend.agent_OCR.utils import safe_print
+from backend.agent_OCR.reprise import (
+    obtenir_checkpointer,
+    config_thread,
+    point_reprise_disponible,
+    effacer_points_reprise
+)
+from backend.agent_OCR.metriques import publier_metriques
+from backend.agent_OCR.utils import safe_print, configurer_encodage_console
+from backend.services.dates import date_demande
+from backend.utils import (
+    charger_toutes_demandes,
+    lire_statut_traitement,
+    mettre_a_jour_statut_traitement,
+    traitement_est_interrompu
+)
 
 
-def traiter_dossier_documents(dossier_path: str):
+def _executer_workflow(workflow, entree, dossier_path: str):
+    """
+    Execute le workflow noeud par noeud en rafraichissant le heartbeat du
+    statut de traitement apres chaque checkpoint
+    """
+    resultat = None
+    for valeurs in workflow.stream(entree, config_thread(dossier_path), stream_mode="values"):
+        resultat = valeurs
+        etape = valeurs.get("workflow_status") if isinstance(valeurs, dict) else valeurs.workflow_status
+        mettre_a_jour_statut_traitement(dossier_path, etape=etape)
+    return resultat
+
+
+def traiter_dossier_documents(dossier_path: str, reprendre: bool = False):
     """
     Fonction principale qui traite tous les documents d'un dossier
     et verifie la concordance des informations
+
+    Args:
+        dossier_path: Chemin du dossier client
+        reprendre: Continuer depuis le dernier checkpoint au lieu de tout relancer
     """
     safe_print(f"Traitement du dossier: {dossier_path}")
 
@@ -22,15 +60,21 @@ def traiter_dossier_documents(dossier_path: str):
         safe_print(f"Le dossier n'existe pas: {dossier_path}")
         return None
 
-    # Initialiser le workflow
-    workflow = construire_workflow()
+    # Initialiser le workflow avec checkpoint apres chaque noeud
+    workflow = construire_workflow(obtenir_checkpointer())
 
-    # Preparer l'etat initial
-    initial_state = State(dossier_path=dossier_path)
+    if reprendre and point_reprise_disponible(workflow, dossier_path):
+        # Entree None : LangGraph repart du dernier checkpoint du dossier
+        safe_print("Reprise depuis le dernier checkpoint")
+        entree = None
+    else:
+        if not reprendre:
+            effacer_points_reprise(dossier_path)
+        entree = State(dossier_path=dossier_path)
 
     # Executer le workflow
     try:
-        result = workflow.invoke(initial_state)
+        result = _executer_workflow(workflow, entree, dossier_path)
 
         # Afficher les resultats
         safe_print("\n=== RESUME DES RESULTATS ===")
@@ -39,6 +83,9 @@ def traiter_dossier_documents(dossier_path: str):
         if hasattr(result, "infos_documents"):
             # Le resultat est deja un etat
             final_state = result
+        elif isinstance(result, dict) and "infos_documents" in result:
+            # Le resultat est le dictionnaire des valeurs de l'etat
+            final_state = State(**result)
         elif isinstance(result, dict) and "verifier_concordance" in result:
             # Le resultat est un dictionnaire avec l'etat dans la cle du dernier noeud
             final_state = result["verifier_concordance"]
@@ -88,6 +135,13 @@ def traiter_dossier_documents(dossier_path: str):
             safe_print(f"Attributs disponibles: {dir(final_state)}")
             safe_print(f"Contenu brut: {final_state}")
 
+        # Duree et compteurs par noeud : rapport JSON + fichier de metriques
+        if isinstance(final_state, State):
+            publier_metriques(final_state)
+
+        # Execution terminee : les points de reprise ne sont plus utiles
+        effacer_points_reprise(dossier_path)
+
         return final_state
     except Exception as e:
         safe_print(f"Erreur lors de l'execution du workflow: {str(e)}")
@@ -96,11 +150,255 @@ def traiter_dossier_documents(dossier_path: str):
         return None
 
 
-if __name__ == "__main__":
-    # Afficher l'encodage utilise
-    safe_print(f"Encodage systeme: {sys.getdefaultencoding()}")
+def reprendre_dossier_documents(dossier_path: str):
+    """
+    Reprend un traitement interrompu depuis son dernier checkpoint
+    (noeud termine ou page extraite). Sans checkpoint, relance un traitement complet
+    en reutilisant les pages deja extraites.
+    """
+    return traiter_dossier_documents(dossier_path, reprendre=True)
+
+
+def traiter_et_publier_statut(dossier_path: str, reprendre: bool = False, **champs_statut):
+    """
+    Traite un dossier en publiant son cycle de vie dans traitement_status.json
+    (processing -> completed / error)
+
+    Args:
+        dossier_path: Chemin du dossier client
+        reprendre: Continuer depuis le dernier checkpoint
+        **champs_statut: Champs supplementaires du statut (worker, job_id...)
+
+    Returns:
+        State final ou None en cas d'echec
+    """
+    champs = {"status": "processing", "etape": "DEMARRAGE", **champs_statut}
+    if not reprendre:
+        champs.update({"start_time": datetime.now().isoformat(), "pages_traitees": 0, "error": None})
+    mettre_a_jour_statut_traitement(dossier_path, **champs)
+
+    try:
+        resultat = traiter_dossier_documents(dossier_path, reprendre=reprendre)
+    except Exception as e:
+        safe_print(f"Erreur lors du traitement de {dossier_path}: {e}")
+        resultat = None
+
+    if resultat:
+        mettre_a_jour_statut_traitement(
+            dossier_path,
+            status="completed",
+            etape="TERMINE",
+            end_time=datetime.now().isoformat(),
+            concordance=resultat.concordance,
+            nb_documents=resultat.nb_documents_analyses,
+            nb_problemes=len(resultat.problemes_concordance)
+        )
+    else:
+        mettre_a_jour_statut_traitement(dossier_path, status="error", error="Echec du traitement")
+
+    return resultat
+
+
+###################
+# TRAITEMENT PAR LOT (LIGNE DE COMMANDE)
+###################
+
+def _statut_ocr(chemin_dossier: str) -> str:
+    """Statut OCR d'un dossier: aucun, queued, processing, interrompu, completed ou error"""
+    statut = lire_statut_traitement(chemin_dossier)
+    if not statut:
+        return "aucun"
+    if traitement_est_interrompu(statut):
+        return "interrompu"
+    return statut.get("status", "aucun")
+
+
+def selectionner_dossiers(types_credit: List[str] = None,
+                          statuts_ocr: List[str] = None,
+                          statuts_demande: List[str] = None,
+                          depuis: date = None,
+                          jusqua: date = None) -> List[dict]:
+    """
+    Parcourt data/demandes_clients et selectionne les dossiers a traiter
+
+    Args:
+        types_credit: Types retenus (auto, immo, conso, decouvert), tous si None
+        statuts_ocr: Statuts OCR retenus (voir _statut_ocr), tous si None
+        statuts_demande: Statuts metier des demandes retenus, tous si None
+        depuis / jusqua: Bornes incluses sur la date de la demande
+
+    Returns:
+        List[dict]: Demandes selectionnees, enrichies de "statut_ocr"
+    """
+    selection = []
+
+    for demande in charger_toutes_demandes():
+        if types_credit and demande.get("type_credit") not in types_credit:
+            continue
+        if statuts_demande and demande.get("statut") not in statuts_demande:
+            continue
+
+        if depuis or jusqua:
+            date_soumission = date_demande(demande)
+            if date_soumission is None:
+                continue
+            if depuis and date_soumission < depuis:
+                continue
+            if jusqua and date_soumission > jusqua:
+                continue
+
+        statut_ocr = _statut_ocr(demande["chemin_dossier"])
+        if statuts_ocr and statut_ocr not in statuts_ocr:
+            continue
 
-    # Exemple d'utilisation
-    # dossier_path = "C:/chemin/vers/dossier/documents"
-    # resultat = traiter_dossier_documents(dossier_path)
-    pass
+        demande["statut_ocr"] = statut_ocr
+        selection.append(demande)
+
+    return selection
+
+
+def _traiter_dossier_lot(chemin_dossier: str, reprendre: bool) -> dict:
+    """Traite un dossier du lot et retourne sa ligne de resume"""
+    debut = time.perf_counter()
+    resultat = traiter_et_publier_statut(chemin_dossier, reprendre=reprendre, worker=f"cli-{os.getpid()}")
+    duree = time.perf_counter() - debut
+
+    return {
+        "dossier": os.path.basename(chemin_dossier),
+        "chemin": chemin_dossier,
+        "succes": resultat is not None,
+        "duree_s": round(duree, 3),
+        "nb_documents": resultat.nb_documents_analyses if resultat else 0,
+        "concordance": resultat.concordance if resultat else None,
+        "nb_problemes": len(resultat.problemes_concordance) if resultat else 0,
+        "erreurs": resultat.erreurs_rencontrees if resultat else ["Echec du traitement"]
+    }
+
+
+def _percentile(valeurs: List[float], p: float) -> float:
+    """Percentile par interpolation lineaire sur des valeurs triees"""
+    if not valeurs:
+        return 0.0
+    valeurs = sorted(valeurs)
+    rang = (len(valeurs) - 1) * p / 100
+    bas = int(rang)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (rang - bas)
+
+
+def traiter_lot(chemins_dossiers: List[str], parallelisme: int = 2, reprendre: bool = False,
+                afficher=print) -> dict:
+    """
+    Traite un lot de dossiers en parallele (un processus par dossier en cours)
+
+    Args:
+        chemins_dossiers: Dossiers a traiter
+        parallelisme: Nombre de dossiers traites simultanement
+        reprendre: Reprendre chaque dossier depuis son dernier checkpoint
+        afficher: Fonction recevant une ligne de progression par dossier termine
+
+    Returns:
+        dict: Resume machine du lot (debit, percentiles de latence, details)
+    """
+    debut = time.perf_counter()
+    details = []
+    total = len(chemins_dossiers)
+
+    with ProcessPoolExecutor(max_workers=max(1, parallelisme)) as executor:
+        futures = {executor.submit(_traiter_dossier_lot, chemin, reprendre): chemin for chemin in chemins_dossiers}
+
+        for future in as_completed(futures):
+            try:
+                ligne = future.result()
+            except Exception as e:
+                chemin = futures[future]
+                ligne = {"dossier": os.path.basename(chemin), "chemin": chemin, "succes": False,
+                         "duree_s": 0.0, "nb_documents": 0, "concordance": None, "nb_problemes": 0,
+                         "erreurs": [str(e)]}
+            details.append(ligne)
+
+            etat = "OK " if ligne["succes"] else "ERR"
+            concordance = {True: "OUI", False: "NON", None: "-"}[ligne["concordance"]]
+            afficher(f"[{len(details)}/{total}] {etat} {ligne['dossier']} - {ligne['duree_s']:.1f}s - "
+                     f"{ligne['nb_documents']} docs - concordance {concordance}")
+
+    duree_totale = time.perf_counter() - debut
+    latences = [ligne["duree_s"] for ligne in details if ligne["succes"]]
+
+    return {
+        "nb_dossiers": total,
+        "nb_succes": len(latences),
+        "nb_echecs": total - len(latences),
+        "parallelisme": parallelisme,
+        "duree_totale_s": round(duree_totale, 3),
+        "debit_dossiers_par_minute": round(total / duree_totale * 60, 2) if duree_totale > 0 else 0.0,
+        "latence_s": {
+            "p50": round(_percentile(latences, 50), 3),
+            "p90": round(_percentile(latences, 90), 3),
+            "p99": round(_percentile(latences, 99), 3),
+            "max": round(max(latences), 3) if latences else 0.0
+        },
+        "details": details
+    }
+
+
+def _date_argument(valeur: str) -> date:
+    """Convertit un argument AAAA-MM-JJ en date"""
+    try:
+        return datetime.strptime(valeur, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Date invalide (attendu AAAA-MM-JJ): {valeur}")
+
+
+def main_cli(argv: List[str] = None) -> int:
+    """Point d'entree en ligne de commande du traitement OCR par lot"""
+    configurer_encodage_console()
+
+    parser = argparse.ArgumentParser(
+        description="Traitement OCR par lot des dossiers de data/demandes_clients"
+    )
+    parser.add_argument("--type", dest="types", nargs="+", choices=TYPES_CREDIT,
+                        help="Types de credit a traiter (defaut: tous)")
+    parser.add_argument("--statut-ocr", nargs="+",
+                        choices=["aucun", "queued", "processing", "interrompu", "completed", "error"],
+                        default=["aucun", "interrompu", "error"],
+                        help="Statuts OCR a selectionner (defaut: aucun interrompu error)")
+    parser.add_argument("--statut", nargs="+", help="Statuts de demande a selectionner (ex: \"En attente\")")
+    parser.add_argument("--depuis", type=_date_argument, help="Date de demande minimale (AAAA-MM-JJ)")
+    parser.add_argument("--jusqua", type=_date_argument, help="Date de demande maximale (AAAA-MM-JJ)")
+    parser.add_argument("-j", "--parallele", type=int, default=2, help="Dossiers traites en parallele")
+    parser.add_argument("--reprendre", action="store_true",
+                        help="Reprendre les dossiers depuis leur dernier checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Lister la selection sans la traiter")
+    parser.add_argument("--resume-json", help="Fichier de sortie du resume machine (JSON)")
+    args = parser.parse_args(argv)
+
+    selection = selectionner_dossiers(args.types, args.statut_ocr, args.statut, args.depuis, args.jusqua)
+    print(f"{len(selection)} dossier(s) selectionne(s)")
+
+    if args.dry_run:
+        for demande in selection:
+            print(f"  {demande['type_credit']:<10} {demande['statut_ocr']:<11} {demande['nom_dossier']}")
+        return 0
+
+    if not selection:
+        return 0
+
+    resume = traiter_lot([d["chemin_dossier"] for d in selection], args.parallele, args.reprendre)
+
+    latence = resume["latence_s"]
+    print(f"\nTermine: {resume['nb_succes']}/{resume['nb_dossiers']} en {resume['duree_totale_s']:.1f}s "
+          f"- {resume['debit_dossiers_par_minute']} dossiers/min")
+    print(f"Latence: p50 {latence['p50']:.1f}s - p90 {latence['p90']:.1f}s - "
+          f"p99 {latence['p99']:.1f}s - max {latence['max']:.1f}s")
+
+    if args.resume_json:
+        with open(args.resume_json, "w", encoding="utf-8") as f:
+            json.dump(resume, f, ensure_ascii=False, indent=2)
+        print(f"Resume JSON: {args.resume_json}")
+
+    return 0 if resume["nb_echecs"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,123 @@
+"""
+backend/agent_OCR/metriques.py - Chronometrage et compteurs par noeud du workflow OCR
+"""
+import os
+import json
+import time
+import functools
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Optional
+
+from backend.config import FICHIER_METRIQUES_OCR, TAILLE_MAX_METRIQUES_OCR
+from backend.agent_OCR.utils import safe_print
+
+# Compteurs relevés pour chaque noeud ("pages" : pages extraites, "pages_rendues" : pages converties en image)
+COMPTEURS = ("pages", "pages_rendues", "octets_rendus", "appels_api", "hits_cache")
+
+_compteurs_noeud: ContextVar[Optional[Dict[str, int]]] = ContextVar("compteurs_noeud", default=None)
+_verrou = threading.Lock()
+
+
+def compter(nom: str, valeur: int = 1):
+    """Incremente un compteur du noeud en cours d'execution (sans effet hors workflow)"""
+    compteurs = _compteurs_noeud.get()
+    if compteurs is not None:
+        with _verrou:
+            compteurs[nom] = compteurs.get(nom, 0) + valeur
+
+
+def mesurer_noeud(nom_noeud: str):
+    """
+    Decorateur de noeud LangGraph : chronometre le noeud, collecte ses compteurs
+    et les range dans state.metriques[nom_noeud]. temps_execution devient la somme
+    des durees des noeuds executes.
+    """
+    def decorateur(noeud):
+        @functools.wraps(noeud)
+        def wrapper(state):
+            compteurs = {nom: 0 for nom in COMPTEURS}
+            jeton = _compteurs_noeud.set(compteurs)
+            debut = time.perf_counter()
+            try:
+                resultat = noeud(state)
+            finally:
+                duree = time.perf_counter() - debut
+                _compteurs_noeud.reset(jeton)
+
+            resultat.metriques[nom_noeud] = {"duree_s": round(duree, 4), **compteurs}
+            resultat.temps_execution = round(sum(m["duree_s"] for m in resultat.metriques.values()), 4)
+            return resultat
+        return wrapper
+    return decorateur
+
+
+def _ajouter_lignes_metriques(lignes: list):
+    """Ajoute des lignes JSON au fichier de metriques, avec rotation par taille"""
+    os.makedirs(os.path.dirname(FICHIER_METRIQUES_OCR), exist_ok=True)
+
+    with _verrou:
+        try:
+            if os.path.getsize(FICHIER_METRIQUES_OCR) > TAILLE_MAX_METRIQUES_OCR:
+                os.replace(FICHIER_METRIQUES_OCR, f"{FICHIER_METRIQUES_OCR}.1")
+        except OSError:
+            pass
+
+        with open(FICHIER_METRIQUES_OCR, "a", encoding="utf-8") as f:
+            for ligne in lignes:
+                f.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+
+
+def publier_metriques(state) -> bool:
+    """
+    Publie les metriques d'une execution terminee
+
+    - ajoute une ligne JSON par noeud (plus une ligne "total") au fichier
+      de metriques roulant, lisible par les tableaux de bord
+    - recopie les metriques dans rapport_analyse.json
+
+    Returns:
+        bool: True si les metriques ont ete ecrites
+    """
+    if not state.metriques:
+        return False
+
+    horodatage = datetime.now().isoformat()
+    dossier = os.path.basename(state.dossier_path.rstrip("/\\"))
+
+    lignes = []
+    for noeud, mesures in state.metriques.items():
+        lignes.append({"ts": horodatage, "dossier": dossier, "noeud": noeud, **mesures})
+
+    total = {nom: sum(m.get(nom, 0) for m in state.metriques.values()) for nom in COMPTEURS}
+    lignes.append({
+        "ts": horodatage,
+        "dossier": dossier,
+        "noeud": "total",
+        "duree_s": state.temps_execution,
+        "statut": state.workflow_status,
+        "nb_erreurs": len(state.erreurs_rencontrees),
+        **total
+    })
+
+    try:
+        _ajouter_lignes_metriques(lignes)
+    except OSError as e:
+        safe_print(f"Ecriture des metriques impossible: {e}")
+        return False
+
+    # Meme ecriture atomique que le rapport : un lecteur ne voit jamais un JSON tronque
+    from backend.agent_OCR.rapport import NOM_RAPPORT_JSON, ecrire_json
+
+    chemin_json = os.path.join(state.dossier_path, NOM_RAPPORT_JSON)
+    if os.path.exists(chemin_json):
+        try:
+            with open(chemin_json, "r", encoding="utf-8") as f:
+                rapport = json.load(f)
+            rapport["metriques"] = {"temps_execution": state.temps_execution, "noeuds": state.metriques}
+            ecrire_json(rapport, chemin_json)
+        except (OSError, ValueError) as e:
+            safe_print(f"Ajout des metriques au rapport JSON impossible: {e}")
+
+    return True
@@ -18,6 +18,20 @@ class DocumentInfo(BaseModel):
     autres_infos: Dict = Field(description="Autres informations specifiques au document", default_factory=dict)
 
 
+class RegleConcordance(BaseModel):
+    """Specification declarative d'une regle de concordance entre documents"""
+    nom: str = Field(description="Identifiant de la regle (statistiques, rapport)")
+    famille: str = Field(description="Famille de verification (identite, identifiants, domicile...)")
+    champ: str = Field(description="Champ compare entre les documents")
+    libelle: str = Field(description="Libelle du champ dans les messages")
+    normaliseur: str = Field(description="Normalisation appliquee avant comparaison (texte, numero, mots, date)", default="texte")
+    comparateur: str = Field(description="Comparaison des valeurs (egalite, similarite, jaccard, ecart_jours)", default="egalite")
+    tolerance: Optional[float] = Field(description="Seuil de similarite ou ecart maximal selon le comparateur", default=None)
+    severite: str = Field(description="Severite d'une discordance (critique, majeure, mineure)", default="majeure")
+    types_documents: Optional[List[str]] = Field(description="Types de documents concernes (tous si absent)", default=None)
+    message: Optional[str] = Field(description="Modele du message de discordance", default=None)
+
+
 class State(BaseModel):
     """Etat du workflow enrichi"""
     # Chemins et dossiers
@@ -33,6 +47,7 @@ class State(BaseModel):
     # Resultats de concordance
     concordance: Optional[bool] = None
     problemes_concordance: List[str] = Field(default_factory=list)
+    analyse_concordance_detaillee: Dict = Field(default_factory=dict)
 
     # Rapports et archivage
     rapport_path: Optional[str] = Field(default=None)
@@ -49,3 +64,4 @@ class State(BaseModel):
     workflow_status: str = Field(default="INITIALISE")
     erreurs_rencontrees: List[str] = Field(default_factory=list)
     temps_execution: Optional[float] = Field(default=None)
+    metriques: Dict[str, Dict] = Field(default_factory=dict)  # Duree et compteurs par noeud
@@ -3,12 +3,17 @@ backend/agent_OCR/rapport.py - Generation de rapports
 """
 import os
 import json
-from typing import Dict, List
+import hashlib
+import threading
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, TextIO
 from datetime import datetime
 import io
 
 from backend.agent_OCR.models import DocumentInfo, State
 from backend.agent_OCR.utils import safe_print
+from backend.config import RAPPORT_PDF_DIFFERE
 
 # Imports pour le PDF
 from reportlab.lib.pagesizes import A4
@@ -18,37 +23,45 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
+NOM_RAPPORT_TXT = "rapport_ocr.txt"
+NOM_RAPPORT_JSON = "rapport_analyse.json"
+NOM_RAPPORT_PDF = "rapport_ocr.pdf"
 
-def generer_rapport_complet(infos_documents: Dict[str, DocumentInfo],
-                           concordance: bool,
-                           problemes_concordance: List[str],
-                           state: State = None,
-                           analyse_detaillee: Dict = None) -> str:
+
+def ecrire_rapport_texte(sortie: TextIO,
+                        infos_documents: Dict[str, DocumentInfo],
+                        concordance: bool,
+                        problemes_concordance: List[str],
+                        state: State = None,
+                        analyse_detaillee: Dict = None):
     """
-    Genere un rapport complet des resultats d'analyse
+    Ecrit le rapport texte au fil de l'eau dans un flux (fichier ouvert, StringIO)
 
     Args:
+        sortie: Flux texte de destination
         infos_documents: Dict des DocumentInfo (compatible nouveau systeme)
         concordance: Boolean de concordance
         problemes_concordance: Liste des problemes
         state: Etat du workflow (optionnel)
         analyse_detaillee: Analyse detaillee de concordance (nouveau)
     """
-    rapport = "RAPPORT D'ANALYSE DE DOCUMENTS\n"
-    rapport += "============================\n\n"
+    ecrire = sortie.write
+
+    ecrire("RAPPORT D'ANALYSE DE DOCUMENTS\n")
+    ecrire("============================\n\n")
 
     # 1. Resume executif
-    rapport += "RESUME EXECUTIF\n"
-    rapport += "-" * 15 + "\n"
-    rapport += f"Nombre de documents analyses: {len(infos_documents)}\n"
-    rapport += f"Concordance des informations: {'OUI' if concordance else 'NON'}\n"
+    ecrire("RESUME EXECUTIF\n")
+    ecrire("-" * 15 + "\n")
+    ecrire(f"Nombre de documents analyses: {len(infos_documents)}\n")
+    ecrire(f"Concordance des informations: {'OUI' if concordance else 'NON'}\n")
 
     if not concordance:
-        rapport += f"Nombre de problemes detectes: {len(problemes_concordance)}\n"
+        ecrire(f"Nombre de problemes detectes: {len(problemes_concordance)}\n")
 
     # Informations detaillees sur l'analyse (nouveau)
     if analyse_detaillee:
-        rapport += f"Score de confiance: {analyse_detaillee.get('score_confiance', 0):.1f}/100\n"
+        ecrire(f"Score de confiance: {analyse_detaillee.get('score_confiance', 0):.1f}/100\n")
 
         # Statistiques par type d'information
         stats = [
@@ -58,42 +71,42 @@ def generer_rapport_complet(infos_documents: Dict[str, DocumentInfo],
             ("Documents avec CIN", analyse_detaillee.get('documents_avec_cin', 0))
         ]
 
-        rapport += "\nStatistiques d'extraction:\n"
+        ecrire("\nStatistiques d'extraction:\n")
         for desc, count in stats:
-            rapport += f"- {desc}: {count}\n"
+            ecrire(f"- {desc}: {count}\n")
 
     # Ajouter les statistiques du workflow si disponibles
     if state:
-        rapport += f"PDFs traites: {state.nb_pdfs_traites}\n"
-        rapport += f"PDFs rejetes: {state.nb_pdfs_rejetes}\n"
-        rapport += f"Images generees: {state.nb_images_generees}\n"
+        ecrire(f"PDFs traites: {state.nb_pdfs_traites}\n")
+        ecrire(f"PDFs rejetes: {state.nb_pdfs_rejetes}\n")
+        ecrire(f"Images generees: {state.nb_images_generees}\n")
         if state.temps_execution:
-            rapport += f"Temps d'execution: {state.temps_execution:.2f} secondes\n"
+            ecrire(f"Temps d'execution: {state.temps_execution:.2f} secondes\n")
 
-    rapport += "\n"
+    ecrire("\n")
 
     # 2. Details des documents
-    rapport += "DETAILS DES DOCUMENTS\n"
-    rapport += "-" * 20 + "\n"
+    ecrire("DETAILS DES DOCUMENTS\n")
+    ecrire("-" * 20 + "\n")
 
     for chemin, info in infos_documents.items():
-        rapport += f"\nDocument: {os.path.basename(chemin)}\n"
-        rapport += f"   Type: {info.type_document}\n"
+        ecrire(f"\nDocument: {os.path.basename(chemin)}\n")
+        ecrire(f"   Type: {info.type_document}\n")
 
         if info.nom:
-            rapport += f"   Nom: {info.nom}\n"
+            ecrire(f"   Nom: {info.nom}\n")
         if info.prenom:
-            rapport += f"   Prenom: {info.prenom}\n"
+            ecrire(f"   Prenom: {info.prenom}\n")
         if info.date_naissance:
-            rapport += f"   Date de naissance: {info.date_naissance}\n"
+            ecrire(f"   Date de naissance: {info.date_naissance}\n")
         if info.adresse:
-            rapport += f"   Adresse: {info.adresse}\n"
+            ecrire(f"   Adresse: {info.adresse}\n")
         if info.numero_document:
-            rapport += f"   Numero: {info.numero_document}\n"
+            ecrire(f"   Numero: {info.numero_document}\n")
         if info.date_emission:
-            rapport += f"   Date d'emission: {info.date_emission}\n"
+            ecrire(f"   Date d'emission: {info.date_emission}\n")
         if info.date_expiration:
-            rapport += f"   Date d'expiration: {info.date_expiration}\n"
+            ecrire(f"   Date d'expiration: {info.date_expiration}\n")
 
         # Informations de qualite d'extraction (nouveau)
         if info.autres_infos:
@@ -101,75 +114,208 @@ def generer_rapport_complet(infos_documents: Dict[str, DocumentInfo],
             confiance_classification = info.autres_infos.get("confiance_classification")
 
             if qualite_image or confiance_classification:
-                rapport += "   Qualite d'extraction:\n"
+                ecrire("   Qualite d'extraction:\n")
                 if qualite_image:
-                    rapport += f"     - Qualite image: {qualite_image}\n"
+                    ecrire(f"     - Qualite image: {qualite_image}\n")
                 if confiance_classification:
-                    rapport += f"     - Confiance classification: {confiance_classification}\n"
+                    ecrire(f"     - Confiance classification: {confiance_classification}\n")
 
             # Autres informations
             autres_infos_filtrees = {k: v for k, v in info.autres_infos.items()
-                                   if k not in ["qualite_image", "confiance_classification", "observations"]}
+                                   if k not in ["qualite_image", "confiance_classification", "observations", "operations"]}
 
             if autres_infos_filtrees:
-                rapport += "   Autres informations:\n"
+                ecrire("   Autres informations:\n")
                 for cle, valeur in autres_infos_filtrees.items():
-                    rapport += f"     - {cle}: {valeur}\n"
+                    ecrire(f"     - {cle}: {valeur}\n")
 
     # 3. Analyse de concordance detaillee
-    rapport += f"\nANALYSE DE CONCORDANCE\n"
-    rapport += "-" * 20 + "\n"
+    ecrire(f"\nANALYSE DE CONCORDANCE\n")
+    ecrire("-" * 20 + "\n")
 
     if concordance:
-        rapport += "Toutes les informations concordent entre les documents.\n"
-        rapport += "Les donnees personnelles sont coherentes a travers tous les documents analyses.\n"
+        ecrire("Toutes les informations concordent entre les documents.\n")
+        ecrire("Les donnees personnelles sont coherentes a travers tous les documents analyses.\n")
     else:
-        rapport += "Des problemes de concordance ont ete detectes:\n\n"
+        ecrire("Des problemes de concordance ont ete detectes:\n\n")
         for i, probleme in enumerate(problemes_concordance, 1):
-            rapport += f"{i}. {probleme}\n"
+            ecrire(f"{i}. {probleme}\n")
+
+    # Rapprochement salaires / releves bancaires
+    rapprochement = analyse_detaillee.get('rapprochement_salaires') if analyse_detaillee else None
+    if rapprochement:
+        ecrire(f"\nRapprochement salaires / releves bancaires ({rapprochement['nb_rapproches']}/{rapprochement['nb_bulletins']} bulletins, {rapprochement['taux_rapprochement']}%):\n")
+        for bulletin in rapprochement['bulletins']:
+            libelle = bulletin['periode'] or bulletin['fichier']
+            if bulletin['statut'] == "RAPPROCHE":
+                operation = bulletin['operation']
+                ecrire(f"- {libelle}: {bulletin['salaire_net']:,.2f} DH -> credit du {operation['date']} ({operation['montant']:,.2f} DH)\n")
+            elif bulletin['statut'] == "HORS_PERIODE":
+                ecrire(f"- {libelle}: {bulletin['salaire_net']:,.2f} DH -> hors de la periode des releves\n")
+            else:
+                ecrire(f"- {libelle}: {bulletin['salaire_net']:,.2f} DH -> aucun credit correspondant\n")
 
     # Analyse detaillee (nouveau)
     if analyse_detaillee and analyse_detaillee.get('recommandations'):
-        rapport += f"\nRecommandations d'amelioration:\n"
+        ecrire(f"\nRecommandations d'amelioration:\n")
         for recommandation in analyse_detaillee['recommandations']:
-            rapport += f"- {recommandation}\n"
+            ecrire(f"- {recommandation}\n")
 
     # 4. Recommandations
-    rapport += f"\nRECOMMANDATIONS\n"
-    rapport += "-" * 15 + "\n"
+    ecrire(f"\nRECOMMANDATIONS\n")
+    ecrire("-" * 15 + "\n")
 
     if concordance:
         score = analyse_detaillee.get('score_confiance', 100) if analyse_detaillee else 100
 
         if score >= 90:
-            rapport += "DOSSIER EXCELLENT\n"
-            rapport += "Le dossier est de tres haute qualite. Traitement automatique recommande.\n"
+            ecrire("DOSSIER EXCELLENT\n")
+            ecrire("Le dossier est de tres haute qualite. Traitement automatique recommande.\n")
         elif score >= 70:
-            rapport += "DOSSIER VALIDE\n"
-            rapport += "Le dossier est complet et coherent. Tous les documents peuvent etre utilises en confiance.\n"
+            ecrire("DOSSIER VALIDE\n")
+            ecrire("Le dossier est complet et coherent. Tous les documents peuvent etre utilises en confiance.\n")
         else:
-            rapport += "DOSSIER VALIDE AVEC RESERVES\n"
-            rapport += "Le dossier est coherent mais la qualite d'extraction peut etre amelioree.\n"
+            ecrire("DOSSIER VALIDE AVEC RESERVES\n")
+            ecrire("Le dossier est coherent mais la qualite d'extraction peut etre amelioree.\n")
     else:
-        rapport += "VERIFICATION MANUELLE REQUISE\n"
-        rapport += "Des incoherences ont ete detectees. Il est recommande de:\n"
-        rapport += "- Verifier manuellement les documents presentant des discordances\n"
-        rapport += "- Demander des documents de remplacement si necessaire\n"
-        rapport += "- Contacter le demandeur pour clarification\n"
+        ecrire("VERIFICATION MANUELLE REQUISE\n")
+        ecrire("Des incoherences ont ete detectees. Il est recommande de:\n")
+        ecrire("- Verifier manuellement les documents presentant des discordances\n")
+        ecrire("- Demander des documents de remplacement si necessaire\n")
+        ecrire("- Contacter le demandeur pour clarification\n")
 
     # 5. Erreurs rencontrees (si state disponible)
     if state and state.erreurs_rencontrees:
-        rapport += f"\nERREURS TECHNIQUES RENCONTREES\n"
-        rapport += "-" * 30 + "\n"
+        ecrire(f"\nERREURS TECHNIQUES RENCONTREES\n")
+        ecrire("-" * 30 + "\n")
         for erreur in state.erreurs_rencontrees:
-            rapport += f"- {erreur}\n"
+            ecrire(f"- {erreur}\n")
 
     # 6. Pied de page
-    rapport += f"\n" + "="*50 + "\n"
-    rapport += "Rapport genere automatiquement par le systeme d'analyse de documents\n"
-    rapport += f"Date de generation: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    ecrire(f"\n" + "="*50 + "\n")
+    ecrire("Rapport genere automatiquement par le systeme d'analyse de documents\n")
+    ecrire(f"Date de generation: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+
+def generer_rapport_complet(infos_documents: Dict[str, DocumentInfo],
+                           concordance: bool,
+                           problemes_concordance: List[str],
+                           state: State = None,
+                           analyse_detaillee: Dict = None) -> str:
+    """
+    Genere un rapport complet des resultats d'analyse
+
+    Args:
+        infos_documents: Dict des DocumentInfo (compatible nouveau systeme)
+        concordance: Boolean de concordance
+        problemes_concordance: Liste des problemes
+        state: Etat du workflow (optionnel)
+        analyse_detaillee: Analyse detaillee de concordance (nouveau)
+    """
+    sortie = io.StringIO()
+    ecrire_rapport_texte(sortie, infos_documents, concordance, problemes_concordance, state, analyse_detaillee)
+    return sortie.getvalue()
+
+
+def construire_donnees_json(infos_documents: Dict[str, DocumentInfo],
+                            concordance: bool,
+                            problemes_concordance: List[str],
+                            analyse_detaillee: Dict = None,
+                            resultats_ocr: Dict = None,
+                            state: State = None,
+                            ref_demande: str = None) -> Dict:
+    """
+    Construit le contenu du rapport JSON
+
+    Le JSON contient tout ce qu'il faut pour regenerer le rapport PDF
+    (reference de la demande, statistiques du workflow).
+    """
+    donnees_json = {
+        "resume": {
+            "nombre_documents": len(infos_documents),
+            "concordance": concordance,
+            "nombre_problemes": len(problemes_concordance),
+            "score_confiance": analyse_detaillee.get('score_confiance', 0) if analyse_detaillee else 0
+        },
+        "documents": {},
+        "problemes_concordance": problemes_concordance,
+        "analyse_detaillee": analyse_detaillee or {},
+        "timestamp": datetime.now().isoformat()
+    }
+
+    if ref_demande:
+        donnees_json["ref_demande"] = ref_demande
+
+    if state:
+        donnees_json["workflow"] = {
+            "nb_pdfs_traites": state.nb_pdfs_traites,
+            "nb_pdfs_rejetes": state.nb_pdfs_rejetes,
+            "nb_images_generees": state.nb_images_generees,
+            "temps_execution": state.temps_execution,
+            "erreurs_rencontrees": list(state.erreurs_rencontrees)
+        }
+
+    # Ajouter les resultats OCR detailles (nouveau)
+    if resultats_ocr:
+        donnees_json["details_extraction"] = {}
+        for chemin, resultat in resultats_ocr.items():
+            nom_fichier = os.path.basename(chemin)
+            donnees_json["details_extraction"][nom_fichier] = {
+                "mode_extraction": resultat.get("mode", "NORMAL"),
+                "qualite": resultat.get("qualite", {}),
+                "extraction_brute": resultat.get("extraction_brute", "")
+            }
+
+    for chemin, info in infos_documents.items():
+        nom_fichier = os.path.basename(chemin)
+        donnees_json["documents"][nom_fichier] = {
+            "type_document": info.type_document,
+            "nom": info.nom,
+            "prenom": info.prenom,
+            "date_naissance": info.date_naissance,
+            "numero_document": info.numero_document,
+            "adresse": info.adresse,
+            "date_emission": info.date_emission,
+            "date_expiration": info.date_expiration,
+            "autres_infos": info.autres_infos
+        }
+
+    return donnees_json
 
-    return rapport
+
+def _chemin_temporaire(chemin: str) -> str:
+    """Fichier temporaire propre au processus et au thread : deux ecrivains ne se tronquent jamais"""
+    return f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _ecrire_atomique(chemin: str, contenu: bytes):
+    """Ecrit un fichier dans un temporaire unique renomme a la fin"""
+    chemin_tmp = _chemin_temporaire(chemin)
+    try:
+        with open(chemin_tmp, "wb") as f:
+            f.write(contenu)
+        os.replace(chemin_tmp, chemin)
+    finally:
+        if os.path.exists(chemin_tmp):
+            os.remove(chemin_tmp)
+
+
+def ecrire_json(donnees: Dict, output_path: str):
+    """
+    Ecrit un JSON compact par morceaux (encodeur C, sans indentation)
+    dans un fichier temporaire renomme a la fin : un lecteur ne voit
+    jamais un fichier a moitie ecrit
+    """
+    encodeur = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+    chemin_tmp = _chemin_temporaire(output_path)
+    try:
+        with open(chemin_tmp, "w", encoding="utf-8") as f:
+            for morceau in encodeur.iterencode(donnees):
+                f.write(morceau)
+        os.replace(chemin_tmp, output_path)
+    finally:
+        if os.path.exists(chemin_tmp):
+            os.remove(chemin_tmp)
 
 
 def sauvegarder_rapport_json(infos_documents: Dict[str, DocumentInfo],
@@ -177,7 +323,9 @@ def sauvegarder_rapport_json(infos_documents: Dict[str, DocumentInfo],
                             problemes_concordance: List[str],
                             output_path: str,
                             analyse_detaillee: Dict = None,
-                            resultats_ocr: Dict = None):
+                            resultats_ocr: Dict = None,
+                            state: State = None,
+                            ref_demande: str = None):
     """
     Sauvegarde les resultats en format JSON
 
@@ -188,49 +336,15 @@ def sauvegarder_rapport_json(infos_documents: Dict[str, DocumentInfo],
         output_path: Chemin de sortie
         analyse_detaillee: Analyse detaillee (nouveau)
         resultats_ocr: Resultats bruts OCR (nouveau)
+        state: Etat du workflow (statistiques reprises dans le PDF differe)
+        ref_demande: Reference de la demande
     """
     try:
-        # Convertir les informations en format JSON-compatible
-        donnees_json = {
-            "resume": {
-                "nombre_documents": len(infos_documents),
-                "concordance": concordance,
-                "nombre_problemes": len(problemes_concordance),
-                "score_confiance": analyse_detaillee.get('score_confiance', 0) if analyse_detaillee else 0
-            },
-            "documents": {},
-            "problemes_concordance": problemes_concordance,
-            "analyse_detaillee": analyse_detaillee or {},
-            "timestamp": datetime.now().isoformat()
-        }
-
-        # Ajouter les resultats OCR detailles (nouveau)
-        if resultats_ocr:
-            donnees_json["details_extraction"] = {}
-            for chemin, resultat in resultats_ocr.items():
-                nom_fichier = os.path.basename(chemin)
-                donnees_json["details_extraction"][nom_fichier] = {
-                    "mode_extraction": resultat.get("mode", "NORMAL"),
-                    "qualite": resultat.get("qualite", {}),
-                    "extraction_brute": resultat.get("extraction_brute", "")
-                }
-
-        for chemin, info in infos_documents.items():
-            nom_fichier = os.path.basename(chemin)
-            donnees_json["documents"][nom_fichier] = {
-                "type_document": info.type_document,
-                "nom": info.nom,
-                "prenom": info.prenom,
-                "date_naissance": info.date_naissance,
-                "numero_document": info.numero_document,
-                "adresse": info.adresse,
-                "date_emission": info.date_emission,
-                "date_expiration": info.date_expiration,
-                "autres_infos": info.autres_infos
-            }
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(donnees_json, f, ensure_ascii=False, indent=2)
+        donnees_json = construire_donnees_json(
+            infos_documents, concordance, problemes_concordance,
+            analyse_detaillee, resultats_ocr, state, ref_demande
+        )
+        ecrire_json(donnees_json, output_path)
 
         safe_print(f"Rapport JSON sauvegarde: {output_path}")
         return True
@@ -240,14 +354,117 @@ def sauvegarder_rapport_json(infos_documents: Dict[str, DocumentInfo],
         return False
 
 
+@functools.lru_cache(maxsize=None)
+def gabarit_pdf() -> Dict:
+    """
+    Styles du rapport PDF, construits une seule fois par processus
+
+    Le gain mesure par --benchmark est dans le bruit (la mise en page de
+    reportlab domine) : le cache sert surtout a partager les memes objets
+    de style entre les fabriques de flowables.
+
+    Returns:
+        Dict: Styles de paragraphes et de tableaux partages par tous les rapports
+    """
+    styles = getSampleStyleSheet()
+
+    return {
+        "normal": styles['Normal'],
+        "titre_document": styles['Heading3'],
+        "sous_section": styles['Heading4'],
+        "titre": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            spaceAfter=30,
+            textColor=colors.darkblue,
+            alignment=TA_CENTER
+        ),
+        "section": ParagraphStyle(
+            'SectionHeader',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceBefore=20,
+            spaceAfter=10,
+            textColor=colors.darkgreen
+        ),
+        "tableau_resume": TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]),
+        "tableau_document": TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+    }
+
+
+# Fabriques de flowables
+
+def _paragraphe(texte: str, style: str = "normal") -> Paragraph:
+    """Paragraphe au style du gabarit"""
+    return Paragraph(texte, gabarit_pdf()[style])
+
+
+def _tableau_resume(lignes: List[List[str]]) -> Table:
+    """Tableau metrique / valeur avec ligne d'en-tete"""
+    tableau = Table(lignes, colWidths=[2*inch, 2*inch])
+    tableau.setStyle(gabarit_pdf()["tableau_resume"])
+    return tableau
+
+
+def _tableau_document(info: DocumentInfo) -> Optional[Table]:
+    """Tableau des informations extraites d'un document (None si vide)"""
+    lignes = [[libelle, valeur] for libelle, valeur in (
+        ('Type:', info.type_document),
+        ('Nom:', info.nom),
+        ('Prenom:', info.prenom),
+        ('Date naissance:', info.date_naissance),
+        ('Numero:', info.numero_document),
+        ('Adresse:', info.adresse),
+        ('Date emission:', info.date_emission),
+        ('Date expiration:', info.date_expiration)
+    ) if valeur]
+
+    # Ajouter informations de qualite (nouveau)
+    if info.autres_infos:
+        qualite_image = info.autres_infos.get("qualite_image")
+        confiance = info.autres_infos.get("confiance_classification")
+
+        if qualite_image:
+            lignes.append(['Qualite image:', qualite_image])
+        if confiance:
+            lignes.append(['Confiance:', confiance])
+
+    if not lignes:
+        return None
+    tableau = Table(lignes, colWidths=[1.5*inch, 3*inch])
+    tableau.setStyle(gabarit_pdf()["tableau_document"])
+    return tableau
+
+
 def generer_rapport_pdf(infos_documents: Dict[str, DocumentInfo],
                        concordance: bool,
                        problemes_concordance: List[str],
                        state: State = None,
                        ref_demande: str = "N/A",
-                       analyse_detaillee: Dict = None) -> bytes:
+                       analyse_detaillee: Dict = None,
+                       date_analyse: str = None) -> bytes:
     """
     Genere un rapport PDF professionnel
+
+    date_analyse (ISO, "timestamp" de rapport_analyse.json) date le rapport :
+    un PDF genere a la demande porte la date de l'analyse, pas celle du
+    telechargement.
     """
     try:
         # Creer un buffer en memoire
@@ -263,39 +480,21 @@ def generer_rapport_pdf(infos_documents: Dict[str, DocumentInfo],
             bottomMargin=50
         )
 
-        # Styles
-        styles = getSampleStyleSheet()
-
-        # Styles personnalises
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=20,
-            spaceAfter=30,
-            textColor=colors.darkblue,
-            alignment=TA_CENTER
-        )
-
-        section_style = ParagraphStyle(
-            'SectionHeader',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceBefore=20,
-            spaceAfter=10,
-            textColor=colors.darkgreen
-        )
-
         # Contenu du rapport
         story = []
 
         # En-tete principal
-        story.append(Paragraph("RAPPORT D'ANALYSE OCR", title_style))
-        story.append(Paragraph(f"Demande: {ref_demande}", styles['Normal']))
-        story.append(Paragraph(f"Date: {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
+        story.append(_paragraphe("RAPPORT D'ANALYSE OCR", "titre"))
+        story.append(_paragraphe(f"Demande: {ref_demande}"))
+        try:
+            date_rapport = datetime.fromisoformat(date_analyse) if date_analyse else datetime.now()
+        except (TypeError, ValueError):
+            date_rapport = datetime.now()
+        story.append(_paragraphe(f"Date: {date_rapport.strftime('%d/%m/%Y')}"))
         story.append(Spacer(1, 30))
 
         # === RESUME EXECUTIF ===
-        story.append(Paragraph("RESUME EXECUTIF", section_style))
+        story.append(_paragraphe("RESUME EXECUTIF", "section"))
 
         data_resume = [
             ['Metrique', 'Valeur'],
@@ -319,126 +518,77 @@ def generer_rapport_pdf(infos_documents: Dict[str, DocumentInfo],
             if state.temps_execution:
                 data_resume.append(['Temps d\'execution', f"{state.temps_execution:.2f}s"])
 
-        table_resume = Table(data_resume, colWidths=[2*inch, 2*inch])
-        table_resume.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-
-        story.append(table_resume)
+        story.append(_tableau_resume(data_resume))
         story.append(Spacer(1, 20))
 
         # === DOCUMENTS ANALYSES ===
         if infos_documents:
-            story.append(Paragraph("DOCUMENTS ANALYSES", section_style))
+            story.append(_paragraphe("DOCUMENTS ANALYSES", "section"))
 
             for chemin, info in infos_documents.items():
-                nom_fichier = os.path.basename(chemin)
-                story.append(Paragraph(f"{nom_fichier}", styles['Heading3']))
-
-                # Creer tableau des informations du document
-                data_doc = []
-                if info.type_document:
-                    data_doc.append(['Type:', info.type_document])
-                if info.nom:
-                    data_doc.append(['Nom:', info.nom])
-                if info.prenom:
-                    data_doc.append(['Prenom:', info.prenom])
-                if info.date_naissance:
-                    data_doc.append(['Date naissance:', info.date_naissance])
-                if info.numero_document:
-                    data_doc.append(['Numero:', info.numero_document])
-                if info.adresse:
-                    data_doc.append(['Adresse:', info.adresse])
-                if info.date_emission:
-                    data_doc.append(['Date emission:', info.date_emission])
-                if info.date_expiration:
-                    data_doc.append(['Date expiration:', info.date_expiration])
-
-                # Ajouter informations de qualite (nouveau)
-                if info.autres_infos:
-                    qualite_image = info.autres_infos.get("qualite_image")
-                    confiance = info.autres_infos.get("confiance_classification")
-
-                    if qualite_image:
-                        data_doc.append(['Qualite image:', qualite_image])
-                    if confiance:
-                        data_doc.append(['Confiance:', confiance])
-
-                if data_doc:
-                    table_doc = Table(data_doc, colWidths=[1.5*inch, 3*inch])
-                    table_doc.setStyle(TableStyle([
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 9),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ]))
-                    story.append(table_doc)
+                story.append(_paragraphe(os.path.basename(chemin), "titre_document"))
+
+                tableau = _tableau_document(info)
+                if tableau is not None:
+                    story.append(tableau)
 
                 story.append(Spacer(1, 15))
 
         # === ANALYSE DE CONCORDANCE ===
-        story.append(Paragraph("ANALYSE DE CONCORDANCE", section_style))
+        story.append(_paragraphe("ANALYSE DE CONCORDANCE", "section"))
 
         if concordance:
-            story.append(Paragraph("Toutes les informations concordent entre les documents.", styles['Normal']))
-            story.append(Paragraph("Les donnees personnelles sont coherentes a travers tous les documents analyses.", styles['Normal']))
+            story.append(_paragraphe("Toutes les informations concordent entre les documents."))
+            story.append(_paragraphe("Les donnees personnelles sont coherentes a travers tous les documents analyses."))
         else:
-            story.append(Paragraph("Des problemes de concordance ont ete detectes:", styles['Normal']))
+            story.append(_paragraphe("Des problemes de concordance ont ete detectes:"))
             story.append(Spacer(1, 10))
             for i, probleme in enumerate(problemes_concordance, 1):
-                story.append(Paragraph(f"{i}. {probleme}", styles['Normal']))
+                story.append(_paragraphe(f"{i}. {probleme}"))
 
         # Recommandations d'analyse detaillee (nouveau)
         if analyse_detaillee and analyse_detaillee.get('recommandations'):
             story.append(Spacer(1, 10))
-            story.append(Paragraph("Recommandations d'amelioration:", styles['Heading4']))
+            story.append(_paragraphe("Recommandations d'amelioration:", "sous_section"))
             for recommandation in analyse_detaillee['recommandations']:
-                story.append(Paragraph(f"- {recommandation}", styles['Normal']))
+                story.append(_paragraphe(f"- {recommandation}"))
 
         story.append(Spacer(1, 20))
 
         # === RECOMMANDATIONS ===
-        story.append(Paragraph("RECOMMANDATIONS", section_style))
+        story.append(_paragraphe("RECOMMANDATIONS", "section"))
 
         if concordance:
             score = analyse_detaillee.get('score_confiance', 100) if analyse_detaillee else 100
 
             if score >= 90:
-                story.append(Paragraph("DOSSIER EXCELLENT", styles['Heading3']))
-                story.append(Paragraph("Le dossier est de tres haute qualite. Traitement automatique recommande.", styles['Normal']))
+                story.append(_paragraphe("DOSSIER EXCELLENT", "titre_document"))
+                story.append(_paragraphe("Le dossier est de tres haute qualite. Traitement automatique recommande."))
             elif score >= 70:
-                story.append(Paragraph("DOSSIER VALIDE", styles['Heading3']))
-                story.append(Paragraph("Le dossier est complet et coherent. Tous les documents peuvent etre utilises en confiance.", styles['Normal']))
+                story.append(_paragraphe("DOSSIER VALIDE", "titre_document"))
+                story.append(_paragraphe("Le dossier est complet et coherent. Tous les documents peuvent etre utilises en confiance."))
             else:
-                story.append(Paragraph("DOSSIER VALIDE AVEC RESERVES", styles['Heading3']))
-                story.append(Paragraph("Le dossier est coherent mais la qualite d'extraction peut etre amelioree.", styles['Normal']))
+                story.append(_paragraphe("DOSSIER VALIDE AVEC RESERVES", "titre_document"))
+                story.append(_paragraphe("Le dossier est coherent mais la qualite d'extraction peut etre amelioree."))
         else:
-            story.append(Paragraph("VERIFICATION MANUELLE REQUISE", styles['Heading3']))
-            story.append(Paragraph("Des incoherences ont ete detectees. Il est recommande de:", styles['Normal']))
-            story.append(Paragraph("- Verifier manuellement les documents presentant des discordances", styles['Normal']))
-            story.append(Paragraph("- Demander des documents de remplacement si necessaire", styles['Normal']))
-            story.append(Paragraph("- Contacter le demandeur pour clarification", styles['Normal']))
+            story.append(_paragraphe("VERIFICATION MANUELLE REQUISE", "titre_document"))
+            story.append(_paragraphe("Des incoherences ont ete detectees. Il est recommande de:"))
+            story.append(_paragraphe("- Verifier manuellement les documents presentant des discordances"))
+            story.append(_paragraphe("- Demander des documents de remplacement si necessaire"))
+            story.append(_paragraphe("- Contacter le demandeur pour clarification"))
 
         # === ERREURS TECHNIQUES ===
         if state and state.erreurs_rencontrees:
             story.append(Spacer(1, 20))
-            story.append(Paragraph("ERREURS TECHNIQUES RENCONTREES", section_style))
+            story.append(_paragraphe("ERREURS TECHNIQUES RENCONTREES", "section"))
             for erreur in state.erreurs_rencontrees:
-                story.append(Paragraph(f"- {erreur}", styles['Normal']))
+                story.append(_paragraphe(f"- {erreur}"))
 
         # === PIED DE PAGE ===
         story.append(Spacer(1, 30))
-        story.append(Paragraph("_" * 60, styles['Normal']))
-        story.append(Paragraph(f"Rapport genere le {datetime.now().strftime('%d/%m/%Y a %H:%M')}", styles['Normal']))
-        story.append(Paragraph("Systeme d'analyse OCR automatique v2.0", styles['Normal']))
+        story.append(_paragraphe("_" * 60))
+        story.append(_paragraphe(f"Rapport genere le {datetime.now().strftime('%d/%m/%Y a %H:%M')}"))
+        story.append(_paragraphe("Systeme d'analyse OCR automatique v2.0"))
 
         # Generer le PDF
         doc.build(story)
@@ -454,6 +604,137 @@ def generer_rapport_pdf(infos_documents: Dict[str, DocumentInfo],
         return None
 
 
+def empreinte_rapport(donnees_json: Dict) -> str:
+    """
+    Empreinte SHA-256 du contenu d'un rapport JSON
+
+    Les metriques, ajoutees au JSON apres la generation des rapports, sont
+    exclues : elles ne figurent pas dans le PDF.
+    """
+    contenu = {cle: valeur for cle, valeur in donnees_json.items() if cle != "metriques"}
+    canonique = json.dumps(contenu, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonique.encode("utf-8")).hexdigest()
+
+
+def generer_rapport_pdf_depuis_json(donnees_json: Dict, dossier_path: str = "") -> Optional[bytes]:
+    """
+    Genere le rapport PDF a partir du contenu de rapport_analyse.json
+
+    Returns:
+        Optional[bytes]: PDF, ou None en cas d'erreur
+    """
+    infos_documents = {
+        nom_fichier: DocumentInfo(**info)
+        for nom_fichier, info in donnees_json.get("documents", {}).items()
+    }
+
+    state = None
+    if donnees_json.get("workflow"):
+        state = State(dossier_path=dossier_path, **donnees_json["workflow"])
+
+    return generer_rapport_pdf(
+        infos_documents,
+        donnees_json.get("resume", {}).get("concordance", False),
+        donnees_json.get("problemes_concordance", []),
+        state,
+        donnees_json.get("ref_demande") or os.path.basename(dossier_path.rstrip("/\\")) or "N/A",
+        donnees_json.get("analyse_detaillee") or None,
+        donnees_json.get("timestamp")
+    )
+
+
+def _enregistrer_pdf(output_dir: str, pdf_data: bytes, empreinte: str):
+    """
+    Ecrit rapport_ocr.pdf puis l'empreinte du JSON dont il est issu, chacun
+    par un temporaire unique renomme : deux sessions qui generent le meme
+    PDF en meme temps ne laissent jamais un fichier tronque en cache
+    """
+    chemin_pdf = os.path.join(output_dir, NOM_RAPPORT_PDF)
+    _ecrire_atomique(chemin_pdf, pdf_data)
+    _ecrire_atomique(f"{chemin_pdf}.sha256", empreinte.encode("utf-8"))
+
+
+def obtenir_rapport_pdf(dossier_path: str, forcer: bool = False) -> Optional[bytes]:
+    """
+    Rapport PDF d'un dossier, genere a la demande
+
+    Le PDF en cache est servi tel quel s'il a ete produit a partir du
+    rapport_analyse.json actuel (meme empreinte) ; sinon il est regenere
+    depuis le JSON puis mis en cache.
+
+    Args:
+        dossier_path: Dossier de la demande
+        forcer: Regenerer le PDF meme si le cache est a jour
+
+    Returns:
+        Optional[bytes]: Contenu du PDF, None si aucun rapport n'existe
+    """
+    chemin_pdf = os.path.join(dossier_path, NOM_RAPPORT_PDF)
+    chemin_json = os.path.join(dossier_path, NOM_RAPPORT_JSON)
+
+    if not os.path.exists(chemin_json):
+        # Dossier traite avant l'existence du JSON : PDF existant eventuel
+        if os.path.exists(chemin_pdf):
+            with open(chemin_pdf, "rb") as f:
+                return f.read()
+        return None
+
+    with open(chemin_json, "r", encoding="utf-8") as f:
+        donnees_json = json.load(f)
+    empreinte = empreinte_rapport(donnees_json)
+
+    try:
+        with open(f"{chemin_pdf}.sha256", "r", encoding="utf-8") as f:
+            empreinte_cache = f.read().strip()
+        if empreinte_cache == empreinte and not forcer:
+            with open(chemin_pdf, "rb") as f:
+                return f.read()
+    except OSError:
+        pass
+
+    pdf_data = generer_rapport_pdf_depuis_json(donnees_json, dossier_path)
+    if pdf_data:
+        try:
+            _enregistrer_pdf(dossier_path, pdf_data, empreinte)
+        except OSError as e:
+            safe_print(f"Mise en cache du rapport PDF impossible: {e}")
+    return pdf_data
+
+
+def _generer_pdf_dossier(dossier_path: str, forcer: bool = False) -> Optional[str]:
+    """Genere le PDF d'un dossier pour le traitement par lot (retourne l'erreur eventuelle)"""
+    try:
+        if obtenir_rapport_pdf(dossier_path, forcer) is None:
+            return "Aucun rapport d'analyse"
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def generer_rapports_pdf_lot(dossiers: List[str], nb_processus: int = 1, forcer: bool = False) -> Dict[str, Optional[str]]:
+    """
+    Genere les rapports PDF de plusieurs dossiers en une fois
+
+    Chaque processus construit le gabarit une seule fois et l'utilise
+    pour tous les dossiers qui lui sont confies.
+
+    Args:
+        dossiers: Dossiers de demandes (contenant rapport_analyse.json)
+        nb_processus: Processus de rendu en parallele (1 = dans le processus courant)
+        forcer: Regenerer les PDF meme si le cache est a jour
+
+    Returns:
+        Dict[str, Optional[str]]: Erreur par dossier (None si le PDF a ete produit)
+    """
+    if nb_processus <= 1 or len(dossiers) <= 1:
+        return {dossier: _generer_pdf_dossier(dossier, forcer) for dossier in dossiers}
+
+    taille_lot = max(1, len(dossiers) // (nb_processus * 4))
+    with ProcessPoolExecutor(max_workers=nb_processus) as executeur:
+        erreurs = executeur.map(_generer_pdf_dossier, dossiers, [forcer] * len(dossiers), chunksize=taille_lot)
+        return dict(zip(dossiers, erreurs))
+
+
 def sauvegarder_rapport_complet(infos_documents: Dict[str, DocumentInfo],
                                concordance: bool,
                                problemes_concordance: List[str],
@@ -461,10 +742,15 @@ def sauvegarder_rapport_complet(infos_documents: Dict[str, DocumentInfo],
                                state: State = None,
                                ref_demande: str = "N/A",
                                analyse_detaillee: Dict = None,
-                               resultats_ocr: Dict = None):
+                               resultats_ocr: Dict = None,
+                               pdf_differe: bool = RAPPORT_PDF_DIFFERE):
     """
     Sauvegarde le rapport sous tous les formats
 
+    Les rapports TXT et JSON sont ecrits en flux et, avec le PDF, produits
+    en parallele. En mode differe, le PDF n'est genere qu'au premier
+    telechargement (obtenir_rapport_pdf).
+
     Args:
         infos_documents: Dictionnaire des informations
         concordance: Boolean de concordance
@@ -474,37 +760,126 @@ def sauvegarder_rapport_complet(infos_documents: Dict[str, DocumentInfo],
         ref_demande: Reference de la demande
         analyse_detaillee: Analyse detaillee de concordance (nouveau)
         resultats_ocr: Resultats bruts OCR (nouveau)
+        pdf_differe: Generer le PDF a la demande plutot que maintenant
     """
     try:
-        # 1. Rapport texte
-        rapport_texte = generer_rapport_complet(
-            infos_documents, concordance, problemes_concordance, state, analyse_detaillee
-        )
-        chemin_txt = os.path.join(output_dir, "rapport_ocr.txt")
-        with open(chemin_txt, "w", encoding='utf-8') as f:
-            f.write(rapport_texte)
-        safe_print(f"Rapport TXT sauvegarde: {chemin_txt}")
-
-        # 2. Rapport JSON
-        chemin_json = os.path.join(output_dir, "rapport_analyse.json")
-        sauvegarder_rapport_json(
+        donnees_json = construire_donnees_json(
             infos_documents, concordance, problemes_concordance,
-            chemin_json, analyse_detaillee, resultats_ocr
+            analyse_detaillee, resultats_ocr, state, ref_demande
         )
+        chemin_txt = os.path.join(output_dir, NOM_RAPPORT_TXT)
+        chemin_json = os.path.join(output_dir, NOM_RAPPORT_JSON)
+        chemin_pdf = os.path.join(output_dir, NOM_RAPPORT_PDF)
+
+        def ecrire_txt():
+            # 1. Rapport texte
+            with open(chemin_txt, "w", encoding='utf-8') as f:
+                ecrire_rapport_texte(f, infos_documents, concordance, problemes_concordance, state, analyse_detaillee)
+            safe_print(f"Rapport TXT sauvegarde: {chemin_txt}")
+
+        def ecrire_rapport_json():
+            # 2. Rapport JSON
+            ecrire_json(donnees_json, chemin_json)
+            safe_print(f"Rapport JSON sauvegarde: {chemin_json}")
+
+        def ecrire_pdf():
+            # 3. Rapport PDF
+            rapport_pdf = generer_rapport_pdf(
+                infos_documents, concordance, problemes_concordance,
+                state, ref_demande, analyse_detaillee, donnees_json["timestamp"]
+            )
+            if rapport_pdf:
+                _enregistrer_pdf(output_dir, rapport_pdf, empreinte_rapport(donnees_json))
+                safe_print(f"Rapport PDF sauvegarde: {chemin_pdf}")
+
+        taches = [ecrire_txt, ecrire_rapport_json]
+        if pdf_differe:
+            # Un PDF d'une execution precedente ne correspond plus au JSON
+            for chemin in (chemin_pdf, f"{chemin_pdf}.sha256"):
+                if os.path.exists(chemin):
+                    os.remove(chemin)
+        else:
+            taches.append(ecrire_pdf)
 
-        # 3. Rapport PDF
-        rapport_pdf = generer_rapport_pdf(
-            infos_documents, concordance, problemes_concordance,
-            state, ref_demande, analyse_detaillee
-        )
-        if rapport_pdf:
-            chemin_pdf = os.path.join(output_dir, "rapport_ocr.pdf")
-            with open(chemin_pdf, "wb") as f:
-                f.write(rapport_pdf)
-            safe_print(f"Rapport PDF sauvegarde: {chemin_pdf}")
+        with ThreadPoolExecutor(max_workers=len(taches)) as executeur:
+            for future in [executeur.submit(tache) for tache in taches]:
+                future.result()
 
         return True
 
     except Exception as e:
         safe_print(f"Erreur lors de la sauvegarde complete: {str(e)}")
         return False
+
+
+if __name__ == "__main__":
+    # python -m backend.agent_OCR.rapport DOSSIER... [--processus N] [--forcer]
+    # python -m backend.agent_OCR.rapport --benchmark 200 [--processus N] [--repetitions R]
+    import argparse
+    import shutil
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Generation par lot des rapports PDF OCR")
+    parser.add_argument("dossiers", nargs="*", help="Dossiers de demandes contenant rapport_analyse.json")
+    parser.add_argument("--processus", type=int, default=os.cpu_count() or 1, help="Processus de rendu en parallele")
+    parser.add_argument("--forcer", action="store_true", help="Regenerer les PDF meme si le cache est a jour")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Mesurer le debit sur N dossiers synthetiques")
+    parser.add_argument("--repetitions", type=int, default=3, help="Tours de mesure (le meilleur debit est retenu)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        documents = {
+            f"doc_{i}.png": DocumentInfo(
+                type_document=type_document, nom="BENANI", prenom="Karim", date_naissance="01/02/1985",
+                numero_document=f"BK{123456 + i}", adresse="12 rue des Lilas, Casablanca",
+                date_emission="01/03/2025", autres_infos={"qualite_image": "BONNE", "confiance_classification": "HAUTE"}
+            )
+            for i, type_document in enumerate(["CIN", "BULLETIN_SALAIRE", "BULLETIN_SALAIRE", "RELEVE_BANCAIRE", "FACTURE_ELECTRICITE"])
+        }
+        donnees = construire_donnees_json(documents, False, ["Discordance des adresses"], {"score_confiance": 72.0,
+                                          "recommandations": ["Verifier les adresses"]}, ref_demande="AUTO-250101-BENCH")
+
+        racine = tempfile.mkdtemp(prefix="bench_rapports_")
+        try:
+            dossiers = []
+            for i in range(args.benchmark):
+                dossier = os.path.join(racine, f"dossier_{i}")
+                os.makedirs(dossier)
+                ecrire_json(donnees, os.path.join(dossier, NOM_RAPPORT_JSON))
+                dossiers.append(dossier)
+
+            def styles_reconstruits():
+                # Comportement precedent : styles recrees pour chaque rapport
+                for dossier in dossiers:
+                    gabarit_pdf.cache_clear()
+                    _generer_pdf_dossier(dossier, forcer=True)
+
+            mesures = [("styles reconstruits a chaque rapport", styles_reconstruits),
+                       ("gabarit partage, 1 processus", lambda: generer_rapports_pdf_lot(dossiers, 1, forcer=True))]
+            if args.processus > 1:
+                mesures.append((f"gabarit partage, {args.processus} processus",
+                                lambda: generer_rapports_pdf_lot(dossiers, args.processus, forcer=True)))
+            mesures.append(("cache (empreinte du JSON inchangee)", lambda: generer_rapports_pdf_lot(dossiers, 1)))
+
+            # Tours entrelaces, meilleure duree par mesure : un ecart de quelques
+            # pour cent entre deux lignes reste du bruit sur une machine partagee
+            _generer_pdf_dossier(dossiers[0], forcer=True)  # Chargement de reportlab et des polices
+            durees = {libelle: float("inf") for libelle, _ in mesures}
+            for _ in range(max(1, args.repetitions)):
+                for libelle, fonction in mesures:
+                    debut = time.perf_counter()
+                    fonction()
+                    durees[libelle] = min(durees[libelle], time.perf_counter() - debut)
+            print(f"{len(dossiers)} dossiers, {os.cpu_count()} CPU, meilleur de {max(1, args.repetitions)} tours")
+            for libelle, duree in durees.items():
+                print(f"{libelle:<42} {len(dossiers) / duree:8.1f} PDF/s  ({duree * 1000 / len(dossiers):6.2f} ms/PDF)")
+        finally:
+            shutil.rmtree(racine, ignore_errors=True)
+
+    elif args.dossiers:
+        resultats = generer_rapports_pdf_lot(args.dossiers, args.processus, args.forcer)
+        for dossier, erreur in resultats.items():
+            print(f"{'ERREUR' if erreur else 'OK':<7} {dossier}{'  ' + erreur if erreur else ''}")
+    else:
+        parser.print_help()
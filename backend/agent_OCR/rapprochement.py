@@ -0,0 +1,249 @@
+"""
+backend/agent_OCR/rapprochement.py - Rapprochement des salaires des bulletins avec les credits des releves bancaires
+"""
+import re
+import calendar
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from backend.services.dates import parser_date
+from backend.config import TOLERANCE_MONTANT_SALAIRE, DELAI_VIREMENT_SALAIRE_JOURS
+
+_MOTIF_MONTANT = re.compile(r'-?\d[\d\s.,  ]*')
+_MOTIF_PERIODE = re.compile(r'(\d{1,2})\s*[/\-.]\s*(\d{4})')
+
+
+def parser_montant(texte) -> Optional[float]:
+    """
+    Convertit un montant OCR en nombre ("12 345,50 DH", "12.345,50", "INCERTAIN: 8000 MAD")
+
+    Returns:
+        Optional[float]: Montant ou None si illisible
+    """
+    if texte is None:
+        return None
+    if isinstance(texte, (int, float)):
+        return float(texte)
+
+    correspondance = _MOTIF_MONTANT.search(str(texte))
+    if not correspondance:
+        return None
+
+    brut = re.sub(r'[\s  ]', '', correspondance.group()).rstrip('.,')
+    # Le dernier separateur suivi de 1 ou 2 chiffres est le separateur decimal
+    decimal = re.search(r'[.,](\d{1,2})$', brut)
+    if decimal:
+        entier = re.sub(r'[.,]', '', brut[:decimal.start()])
+        brut = f"{entier}.{decimal.group(1)}"
+    else:
+        brut = re.sub(r'[.,]', '', brut)
+
+    try:
+        return float(brut)
+    except ValueError:
+        return None
+
+
+def parser_periode(texte) -> Optional[date]:
+    """Premier jour de la periode de paie MM/AAAA"""
+    correspondance = _MOTIF_PERIODE.search(str(texte or ""))
+    if not correspondance:
+        return None
+    mois, annee = int(correspondance.group(1)), int(correspondance.group(2))
+    if not 1 <= mois <= 12:
+        return None
+    return date(annee, mois, 1)
+
+
+def construire_operations(lignes: List[str]) -> Dict:
+    """
+    Range les operations au credit des releves dans une structure en colonnes
+
+    Chaque ligne a la forme "JJ/MM/AAAA | libelle | montant". Les colonnes
+    sont triees par montant pour permettre une recherche dichotomique.
+
+    Returns:
+        Dict: Colonnes "montant" (array de float), "jour" (array d'ordinaux) et "libelle"
+    """
+    operations = []
+    for ligne in lignes or []:
+        parties = [p.strip() for p in str(ligne).split('|')]
+        if len(parties) < 2:
+            continue
+        jour = parser_date(parties[0])
+        montant = parser_montant(parties[-1])
+        if jour is None or montant is None or montant <= 0:
+            continue
+        libelle = ' | '.join(parties[1:-1]) if len(parties) > 2 else ""
+        operations.append((montant, jour.toordinal(), libelle))
+
+    operations.sort()
+    return {
+        "montant": array('d', (o[0] for o in operations)),
+        "jour": array('l', (o[1] for o in operations)),
+        "libelle": [o[2] for o in operations]
+    }
+
+
+def _grouper_par_montant(montants: array, jours: array) -> tuple:
+    """
+    Regroupe les credits par montant exact (les operations sont triees par montant puis date)
+
+    Returns:
+        tuple: (montants distincts croissants, [(jours croissants, indices des operations)] par montant)
+    """
+    valeurs, groupes = [], []
+    for i, montant in enumerate(montants):
+        if not valeurs or valeurs[-1] != montant:
+            valeurs.append(montant)
+            groupes.append(([], []))
+        groupes[-1][0].append(jours[i])
+        groupes[-1][1].append(i)
+    return valeurs, groupes
+
+
+def _jour_le_plus_proche(jours_groupe: List[int], jour_min, jour_max, cible) -> Optional[int]:
+    """Position du credit du groupe le plus proche de cible dans [jour_min, jour_max] (le plus ancien a egalite)"""
+    if not jours_groupe:
+        return None
+    if jour_min is None:
+        return 0
+    debut = bisect_left(jours_groupe, jour_min)
+    fin = bisect_right(jours_groupe, jour_max)
+    if debut == fin:
+        return None
+    k = bisect_left(jours_groupe, cible, debut, fin)
+    if k > debut and (k == fin or cible - jours_groupe[k - 1] <= jours_groupe[k] - cible):
+        k = bisect_left(jours_groupe, jours_groupe[k - 1], debut, fin)
+    return k
+
+
+def _credit_le_plus_proche(valeurs: List[float], groupes: List[tuple], salaire: float, borne_min: float,
+                           borne_max: float, jour_min, jour_max, cible) -> Optional[tuple]:
+    """
+    Credit libre le plus proche du salaire en montant, puis en date
+
+    Les montants distincts sont parcourus du plus proche au plus eloigne du
+    salaire, et le parcours s'arrete des qu'un montant plus eloigne que le
+    meilleur candidat est atteint.
+
+    Returns:
+        Optional[tuple]: (position du montant, position dans son groupe), None sans candidat
+    """
+    meilleur = None
+    haut = bisect_left(valeurs, salaire)
+    bas = haut - 1
+    while True:
+        ecart_bas = salaire - valeurs[bas] if bas >= 0 and valeurs[bas] >= borne_min else None
+        ecart_haut = valeurs[haut] - salaire if haut < len(valeurs) and valeurs[haut] <= borne_max else None
+        if ecart_bas is None and ecart_haut is None:
+            break
+        if ecart_haut is None or (ecart_bas is not None and ecart_bas <= ecart_haut):
+            m, ecart = bas, ecart_bas
+            bas -= 1
+        else:
+            m, ecart = haut, ecart_haut
+            haut += 1
+        if meilleur is not None and ecart > meilleur[0][0]:
+            break
+
+        jours_groupe, indices = groupes[m]
+        k = _jour_le_plus_proche(jours_groupe, jour_min, jour_max, cible)
+        if k is not None:
+            # L'indice de l'operation departage les egalites (montant puis date les plus bas)
+            cle = (ecart, abs(jours_groupe[k] - cible) if cible else 0, indices[k])
+            if meilleur is None or cle < meilleur[0]:
+                meilleur = (cle, m, k)
+    return meilleur[1:] if meilleur else None
+
+
+def rapprocher_salaires(bulletins: List[Dict], operations: Dict,
+                        tolerance: float = TOLERANCE_MONTANT_SALAIRE,
+                        delai_jours: int = DELAI_VIREMENT_SALAIRE_JOURS) -> Dict:
+    """
+    Associe chaque salaire net de bulletin a un credit du releve
+
+    Un credit correspond si son montant est a +/- tolerance du salaire net et
+    s'il est date entre le debut du mois de paie et delai_jours apres sa fin.
+    Un bulletin dont cette fenetre ne recoupe pas les dates des releves est
+    marque HORS_PERIODE sans etre signale.
+    Les credits sont groupes par montant exact, chaque groupe trie par date :
+    un bulletin parcourt les montants distincts de sa tolerance du plus
+    proche au plus eloigne et cherche la date par dichotomie, et un credit
+    attribue est retire de son groupe. Les virements recurrents d'un meme
+    montant ne sont donc jamais reparcourus : O(n log n + b (d + log n)),
+    d etant le nombre de montants distincts visites (quelques-uns en
+    pratique). Chaque credit n'est attribue qu'a un seul bulletin, le plus
+    proche en montant puis en date.
+
+    Args:
+        bulletins (List[Dict]): {"fichier", "salaire_net", "periode"} par bulletin
+        operations (Dict): Colonnes produites par construire_operations
+
+    Returns:
+        Dict: Detail par bulletin, taux de rapprochement et problemes detectes
+    """
+    montants, jours, libelles = operations["montant"], operations["jour"], operations["libelle"]
+    premier_jour, dernier_jour_releve = (min(jours), max(jours)) if jours else (0, 0)
+    valeurs, groupes = _grouper_par_montant(montants, jours)
+    resultats = []
+
+    for bulletin in sorted(bulletins, key=lambda b: (b.get("periode") or date.min, b["salaire_net"])):
+        salaire = bulletin["salaire_net"]
+        periode = bulletin.get("periode")
+        resultat = {
+            "fichier": bulletin.get("fichier"),
+            "periode": periode.strftime("%m/%Y") if periode else None,
+            "salaire_net": salaire,
+            "statut": "NON_TROUVE",
+            "operation": None
+        }
+
+        if periode:
+            dernier_jour = calendar.monthrange(periode.year, periode.month)[1]
+            jour_min = periode.toordinal()
+            jour_max = (periode + timedelta(days=dernier_jour - 1 + delai_jours)).toordinal()
+            cible = jour_max - delai_jours
+        else:
+            jour_min, jour_max, cible = None, None, None
+
+        if jour_min is not None and (jour_max < premier_jour or jour_min > dernier_jour_releve):
+            resultat["statut"] = "HORS_PERIODE"
+            resultats.append(resultat)
+            continue
+
+        meilleur = _credit_le_plus_proche(valeurs, groupes, salaire, salaire * (1 - tolerance),
+                                          salaire * (1 + tolerance), jour_min, jour_max, cible)
+        if meilleur is not None:
+            m, k = meilleur
+            jours_groupe, indices = groupes[m]
+            i = indices[k]
+            del jours_groupe[k], indices[k]  # Credit attribue : retire des candidats
+            resultat["statut"] = "RAPPROCHE"
+            resultat["operation"] = {
+                "date": date.fromordinal(jours[i]).strftime("%d/%m/%Y"),
+                "libelle": libelles[i],
+                "montant": montants[i]
+            }
+            resultat["ecart_montant"] = round(montants[i] - salaire, 2)
+
+        resultats.append(resultat)
+
+    nb_rapproches = sum(1 for r in resultats if r["statut"] == "RAPPROCHE")
+    nb_verifiables = sum(1 for r in resultats if r["statut"] != "HORS_PERIODE")
+    problemes = [
+        f"Salaire net du bulletin {r['periode'] or r['fichier']} ({r['salaire_net']:,.2f} DH) "
+        f"sans credit correspondant sur les releves bancaires"
+        for r in resultats if r["statut"] == "NON_TROUVE"
+    ]
+
+    return {
+        "bulletins": resultats,
+        "nb_operations_credit": len(montants),
+        "nb_bulletins": len(resultats),
+        "nb_rapproches": nb_rapproches,
+        "taux_rapprochement": round(nb_rapproches / nb_verifiables * 100, 1) if nb_verifiables else 0.0,
+        "problemes": problemes
+    }
@@ -0,0 +1,246 @@
+"""
+backend/agent_OCR/regles.py - Moteur declaratif des regles de concordance
+"""
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.agent_OCR.models import RegleConcordance
+from backend.services.normalisation import normaliser_texte, normaliser_numero
+from backend.services.similarite import grouper_valeurs_similaires
+from backend.services.dates import parser_date
+from backend.config import SEUILS_SIMILARITE_OCR, PENALITES_SEVERITE_CONCORDANCE
+
+# Regles de concordance, dans l'ordre de presentation des discordances.
+# Ajouter un champ compare = ajouter une entree ici.
+REGLES_CONCORDANCE = [
+    # 1. Identite personnelle
+    {"nom": "noms", "famille": "identite", "champ": "nom", "libelle": "noms",
+     "normaliseur": "texte", "comparateur": "similarite"},
+    {"nom": "prenoms", "famille": "identite", "champ": "prenom", "libelle": "prenoms",
+     "normaliseur": "texte", "comparateur": "similarite"},
+    {"nom": "dates_naissance", "famille": "identite", "champ": "date_naissance", "libelle": "dates de naissance",
+     "normaliseur": "numero", "comparateur": "egalite"},
+
+    # 2. Identifiants officiels
+    {"nom": "numeros_cin", "famille": "identifiants", "champ": "numero_cin", "libelle": "numeros CIN",
+     "normaliseur": "numero", "comparateur": "egalite"},
+    {"nom": "numeros_securite_sociale", "famille": "identifiants", "champ": "numero_securite_sociale",
+     "libelle": "numeros de securite sociale", "normaliseur": "numero", "comparateur": "egalite"},
+
+    # 3. Domicile et contact
+    {"nom": "adresses", "famille": "domicile", "champ": "adresse", "libelle": "adresses",
+     "normaliseur": "mots", "comparateur": "jaccard"},
+    {"nom": "telephones", "famille": "domicile", "champ": "telephone", "libelle": "numeros de telephone",
+     "normaliseur": "numero", "comparateur": "egalite"},
+
+    # 4. Informations financieres
+    {"nom": "rib", "famille": "financier", "champ": "rib", "libelle": "RIB/IBAN",
+     "normaliseur": "numero", "comparateur": "egalite"},
+    {"nom": "employeurs", "famille": "financier", "champ": "employeur", "libelle": "employeurs",
+     "normaliseur": "texte", "comparateur": "similarite"},
+
+    # 5. Coherence temporelle (plus de 6 mois entre les dates d'emission)
+    {"nom": "dates_emission", "famille": "temporel", "champ": "date_emission",
+     "libelle": "dates d'emission des documents", "normaliseur": "date", "comparateur": "ecart_jours",
+     "tolerance": 180}
+]
+
+# Messages par defaut selon le comparateur
+MESSAGES_COMPARATEURS = {
+    "egalite": "Discordance des {libelle}: {valeurs}",
+    "similarite": "Discordance des {libelle}: {valeurs}",
+    "jaccard": "Possible discordance des {libelle} detectee entre {nb_groupes} groupes differents",
+    "ecart_jours": "Ecart important entre les {libelle}: {ecart} jours"
+}
+
+
+def _mots(texte: str) -> Optional[frozenset]:
+    """Ensemble des mots normalises d'un texte"""
+    return frozenset(normaliser_texte(texte).split()) or None
+
+
+def _similarite_mots(mots1: frozenset, mots2: frozenset) -> float:
+    """Indice de Jaccard entre deux ensembles de mots normalises"""
+    if not mots1 or not mots2:
+        return 0.0
+    if mots1 == mots2:
+        return 1.0
+    return len(mots1 & mots2) / len(mots1 | mots2)
+
+
+NORMALISEURS: Dict[str, Callable] = {
+    "texte": normaliser_texte,
+    "numero": normaliser_numero,
+    "mots": _mots,
+    "date": parser_date
+}
+
+
+def _comparer_egalite(valeurs: list, regle: Dict) -> Optional[Dict]:
+    """Discordance si les valeurs normalisees ne sont pas toutes identiques"""
+    nb_groupes = len(set(valeurs))
+    return {"nb_groupes": nb_groupes} if nb_groupes > 1 else None
+
+
+def _comparer_similarite(valeurs: list, regle: Dict) -> Optional[Dict]:
+    """Discordance si les valeurs forment plusieurs groupes malgre la tolerance OCR"""
+    nb_groupes = len(grouper_valeurs_similaires(valeurs, regle["champ"], regle["tolerance"]))
+    return {"nb_groupes": nb_groupes} if nb_groupes > 1 else None
+
+
+def _comparer_jaccard(valeurs: list, regle: Dict) -> Optional[Dict]:
+    """Discordance si les ensembles de mots forment plusieurs groupes (mots communs >= tolerance)"""
+    groupes = []
+    for mots in valeurs:
+        if not any(_similarite_mots(mots, representant) >= regle["tolerance"] for representant in groupes):
+            groupes.append(mots)
+    return {"nb_groupes": len(groupes)} if len(groupes) > 1 else None
+
+
+def _comparer_ecart_jours(valeurs: list, regle: Dict) -> Optional[Dict]:
+    """Discordance si l'ecart entre la date la plus ancienne et la plus recente depasse la tolerance"""
+    ecart = (max(valeurs) - min(valeurs)).days
+    return {"ecart": ecart} if ecart > regle["tolerance"] else None
+
+
+COMPARATEURS: Dict[str, Callable] = {
+    "egalite": _comparer_egalite,
+    "similarite": _comparer_similarite,
+    "jaccard": _comparer_jaccard,
+    "ecart_jours": _comparer_ecart_jours
+}
+
+
+def compiler_regles(regles: List[Dict]) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+    """
+    Valide et compile les specifications de regles
+
+    Normaliseurs et comparateurs sont resolus, les seuils par defaut
+    appliques et les colonnes (champ, normaliseur) a calculer dedupliquees.
+
+    Args:
+        regles (List[Dict]): Specifications au format RegleConcordance
+
+    Returns:
+        Tuple[List[Dict], List[Tuple[str, str]]]: Regles compilees et colonnes de la matrice des champs
+
+    Raises:
+        ValueError: Normaliseur, comparateur ou severite inconnu, ou nom de regle en double
+    """
+    compilees = []
+    colonnes = []
+    for spec in regles:
+        regle = RegleConcordance(**spec)
+        if regle.normaliseur not in NORMALISEURS:
+            raise ValueError(f"Regle {regle.nom}: normaliseur inconnu '{regle.normaliseur}'")
+        if regle.comparateur not in COMPARATEURS:
+            raise ValueError(f"Regle {regle.nom}: comparateur inconnu '{regle.comparateur}'")
+        if regle.severite not in PENALITES_SEVERITE_CONCORDANCE:
+            raise ValueError(f"Regle {regle.nom}: severite inconnue '{regle.severite}'")
+        if any(r["nom"] == regle.nom for r in compilees):
+            raise ValueError(f"Regle {regle.nom} definie deux fois")
+
+        tolerance = regle.tolerance
+        if tolerance is None and regle.comparateur in ("similarite", "jaccard"):
+            tolerance = SEUILS_SIMILARITE_OCR.get(regle.champ)
+
+        colonne = (regle.champ, regle.normaliseur)
+        if colonne not in colonnes:
+            colonnes.append(colonne)
+
+        compilees.append({
+            **regle.model_dump(),
+            "tolerance": tolerance,
+            "colonne": colonne,
+            "comparer": COMPARATEURS[regle.comparateur],
+            "modele_message": regle.message or MESSAGES_COMPARATEURS[regle.comparateur],
+            "types": frozenset(t.upper() for t in regle.types_documents) if regle.types_documents else None
+        })
+
+    return compilees, colonnes
+
+
+# Compilation unique a l'import
+REGLES_COMPILEES, COLONNES_REGLES = compiler_regles(REGLES_CONCORDANCE)
+
+# Statistiques cumulees depuis le demarrage du processus, par regle
+_statistiques = {}
+_verrou = threading.Lock()
+
+
+def evaluer_regles(caracteristiques: List[Dict]) -> Tuple[List[Tuple[str, str]], Dict[str, Dict]]:
+    """
+    Evalue toutes les regles sur les caracteristiques des documents
+
+    La matrice des champs est construite en un seul balayage : chaque
+    colonne (champ, normaliseur) est normalisee une fois, puis chaque regle
+    compare sa colonne restreinte aux types de documents concernes.
+
+    Args:
+        caracteristiques (List[Dict]): Valeurs brutes par document ("fichier", "type_document", champs)
+
+    Returns:
+        Tuple: Discordances [(message, severite)] et mesures par regle {nom: {duree_ms, declenchee}}
+    """
+    debut = time.perf_counter()
+    types = [(c.get("type_document") or "").upper() for c in caracteristiques]
+    matrice = {}
+    for champ, normaliseur in COLONNES_REGLES:
+        normaliser = NORMALISEURS[normaliseur]
+        matrice[(champ, normaliseur)] = [
+            normaliser(str(c[champ])) if c.get(champ) else None for c in caracteristiques
+        ]
+    duree_normalisation = time.perf_counter() - debut
+
+    discordances = []
+    mesures = {"normalisation": {"duree_ms": round(duree_normalisation * 1000, 3)}}
+    for regle in REGLES_COMPILEES:
+        debut = time.perf_counter()
+        colonne = matrice[regle["colonne"]]
+        indices = [i for i, valeur in enumerate(colonne)
+                   if valeur is not None and (regle["types"] is None or types[i] in regle["types"])]
+
+        resultat = None
+        if len(indices) >= 2:
+            resultat = regle["comparer"]([colonne[i] for i in indices], regle)
+            if resultat is not None:
+                valeurs = ', '.join(f"{caracteristiques[i][regle['champ']]} ({caracteristiques[i]['fichier']})"
+                                    for i in indices)
+                message = regle["modele_message"].format(libelle=regle["libelle"], valeurs=valeurs, **resultat)
+                discordances.append((message, regle["severite"]))
+
+        duree = time.perf_counter() - debut
+        mesures[regle["nom"]] = {"duree_ms": round(duree * 1000, 3), "declenchee": resultat is not None}
+
+    _cumuler_statistiques(mesures)
+    return discordances, mesures
+
+
+def _cumuler_statistiques(mesures: Dict[str, Dict]):
+    """Ajoute les mesures d'une evaluation aux statistiques du processus"""
+    with _verrou:
+        for nom, mesure in mesures.items():
+            cumul = _statistiques.setdefault(nom, {"evaluations": 0, "declenchements": 0, "duree_totale_ms": 0.0})
+            cumul["evaluations"] += 1
+            cumul["declenchements"] += int(mesure.get("declenchee", False))
+            cumul["duree_totale_ms"] += mesure["duree_ms"]
+
+
+def statistiques_regles() -> Dict[str, Dict]:
+    """
+    Statistiques cumulees par regle depuis le demarrage : nombre d'evaluations,
+    de declenchements, duree totale et moyenne (pour arbitrer cout et utilite)
+    """
+    with _verrou:
+        return {
+            nom: {**cumul, "duree_moyenne_ms": round(cumul["duree_totale_ms"] / cumul["evaluations"], 3),
+                  "taux_declenchement": round(cumul["declenchements"] / cumul["evaluations"] * 100, 1)}
+            for nom, cumul in _statistiques.items()
+        }
+
+
+def reinitialiser_statistiques_regles():
+    """Remet a zero les statistiques cumulees"""
+    with _verrou:
+        _statistiques.clear()
@@ -0,0 +1,148 @@
+"""
+backend/agent_OCR/reprise.py - Points de reprise SQLite pour les traitements OCR longs
+"""
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+from backend.config import FICHIER_CHECKPOINTS_OCR
+from backend.agent_OCR.utils import safe_print
+
+# Checkpointer LangGraph (optionnel - si langgraph-checkpoint-sqlite est installe)
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    CHECKPOINTER_DISPONIBLE = True
+except ImportError:
+    CHECKPOINTER_DISPONIBLE = False
+
+_checkpointer = None
+_verrou = threading.Lock()
+
+
+def identifiant_thread(dossier_path: str) -> str:
+    """Identifiant stable d'un dossier dans la base de points de reprise"""
+    return os.path.normcase(os.path.abspath(dossier_path)).replace('\\', '/')
+
+
+def config_thread(dossier_path: str) -> Dict:
+    """Configuration LangGraph associant une execution a son dossier"""
+    return {"configurable": {"thread_id": identifiant_thread(dossier_path)}}
+
+
+def _connexion() -> sqlite3.Connection:
+    """Ouvre une connexion sur la base de points de reprise"""
+    os.makedirs(os.path.dirname(FICHIER_CHECKPOINTS_OCR), exist_ok=True)
+    conn = sqlite3.connect(FICHIER_CHECKPOINTS_OCR, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+@contextmanager
+def _table_pages():
+    """Connexion courte sur la table des pages, validee puis fermee en sortie"""
+    conn = _connexion()
+    try:
+        with conn:
+            _initialiser_table_pages(conn)
+            yield conn
+    finally:
+        conn.close()
+
+
+def obtenir_checkpointer():
+    """
+    Retourne le checkpointer SQLite partage par le processus
+
+    Returns:
+        SqliteSaver ou None si la dependance n'est pas installee
+    """
+    global _checkpointer
+
+    if not CHECKPOINTER_DISPONIBLE:
+        return None
+
+    with _verrou:
+        if _checkpointer is None:
+            _checkpointer = SqliteSaver(_connexion())
+        return _checkpointer
+
+
+def _initialiser_table_pages(conn: sqlite3.Connection):
+    """Cree la table des pages deja extraites si necessaire"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages_ocr (
+            thread_id TEXT NOT NULL,
+            chemin_image TEXT NOT NULL,
+            resultat TEXT NOT NULL,
+            PRIMARY KEY (thread_id, chemin_image)
+        )
+    """)
+
+
+def charger_pages_extraites(dossier_path: str) -> Dict[str, dict]:
+    """
+    Charge les resultats OCR des pages deja terminees pour un dossier
+
+    Returns:
+        Dict[str, dict]: Resultat d'extraction par chemin d'image
+    """
+    try:
+        with _table_pages() as conn:
+            lignes = conn.execute(
+                "SELECT chemin_image, resultat FROM pages_ocr WHERE thread_id = ?",
+                (identifiant_thread(dossier_path),)
+            ).fetchall()
+        return {chemin: json.loads(resultat) for chemin, resultat in lignes}
+    except (sqlite3.Error, ValueError) as e:
+        safe_print(f"Lecture des pages extraites impossible: {e}")
+        return {}
+
+
+def enregistrer_page_extraite(dossier_path: str, chemin_image: str, resultat: dict):
+    """
+    Enregistre le resultat OCR d'une page des qu'il est disponible
+
+    Les pages en erreur ne sont pas conservees afin d'etre retentees a la reprise.
+    """
+    if resultat.get("mode") == "ERREUR" or not isinstance(resultat.get("parsed_info"), dict):
+        return
+
+    try:
+        with _table_pages() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages_ocr (thread_id, chemin_image, resultat) VALUES (?, ?, ?)",
+                (identifiant_thread(dossier_path), chemin_image, json.dumps(resultat, default=str, ensure_ascii=False))
+            )
+    except sqlite3.Error as e:
+        safe_print(f"Sauvegarde de la page {chemin_image} impossible: {e}")
+
+
+def effacer_points_reprise(dossier_path: str):
+    """Supprime les points de reprise et les pages extraites d'un dossier"""
+    thread_id = identifiant_thread(dossier_path)
+
+    checkpointer = obtenir_checkpointer()
+    if checkpointer is not None:
+        try:
+            checkpointer.delete_thread(thread_id)
+        except Exception as e:
+            safe_print(f"Suppression des checkpoints impossible: {e}")
+
+    try:
+        with _table_pages() as conn:
+            conn.execute("DELETE FROM pages_ocr WHERE thread_id = ?", (thread_id,))
+    except sqlite3.Error as e:
+        safe_print(f"Suppression des pages extraites impossible: {e}")
+
+
+def point_reprise_disponible(workflow, dossier_path: str) -> bool:
+    """Indique si une execution interrompue peut reprendre depuis un checkpoint"""
+    try:
+        snapshot = workflow.get_state(config_thread(dossier_path))
+    except Exception:
+        return False
+    return bool(snapshot and snapshot.values and snapshot.next)
+
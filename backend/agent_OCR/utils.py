@@ -5,13 +5,20 @@ import os
 import sys
 import io
 
-# Configuration de l'encodage pour eviter les problemes
-try:
-    if not hasattr(sys.stdout, 'buffer') or not sys.stdout.__class__.__name__ == 'OutStream':
-        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='backslashreplace')
-        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='backslashreplace')
-except Exception:
-    pass
+
+def configurer_encodage_console():
+    """
+    Force l'UTF-8 sur stdout/stderr pour eviter les problemes d'encodage
+
+    A appeler depuis les points d'entree en ligne de commande uniquement :
+    Streamlit gere ses propres flux.
+    """
+    try:
+        if not hasattr(sys.stdout, 'buffer') or not sys.stdout.__class__.__name__ == 'OutStream':
+            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='backslashreplace')
+            sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='backslashreplace')
+    except Exception:
+        pass
 
 
 def safe_print(text):
@@ -3,20 +3,34 @@ backend/agent_OCR/workflow.py - Workflow LangGraph pour l'OCR
 """
 import os
 import time
+import threading
 from langgraph.graph import END, StateGraph, START
 
+from backend.config import PIPELINE_OCR, RAPPORT_PDF_DIFFERE
 from backend.agent_OCR.models import State, DocumentInfo
 from backend.agent_OCR.utils import safe_print
-from backend.agent_OCR.charger_document import charger_documents, verifier_pdf, convertir_pdf_en_images
+from backend.agent_OCR.charger_document import (
+    charger_documents,
+    verifier_pdf,
+    convertir_pdf_en_images,
+    iterer_pages_pdf,
+    compter_pages_pdf
+)
 from backend.agent_OCR.extraction import init_client, traiter_documents_ocr, analyser_nom_fichier_ameliore
-from backend.agent_OCR.concordance import verifier_concordance_complete, analyser_concordance_detaillee
+from backend.agent_OCR.concordance import analyser_concordance_detaillee
 from backend.agent_OCR.rapport import sauvegarder_rapport_complet
+from backend.agent_OCR.reprise import charger_pages_extraites, enregistrer_page_extraite
+from backend.agent_OCR.metriques import mesurer_noeud
+from backend.services.index_identites import indexer_identites
+from backend.services.chemins_dossiers import reference_dossier, type_credit_dossier
+from backend.utils import mettre_a_jour_statut_traitement
 
 
 ###################
 # NOEUDS DU WORKFLOW
 ###################
 
+@mesurer_noeud("charger_documents")
 def charger_documents_node(state: State) -> State:
     """Noeud pour charger les documents PDF du dossier"""
     safe_print("\n=== CHARGEMENT DES DOCUMENTS ===")
@@ -48,6 +62,7 @@ def charger_documents_node(state: State) -> State:
     return State(**state_dict)
 
 
+@mesurer_noeud("valider_pdfs")
 def valider_pdfs_node(state: State) -> State:
     """Noeud pour valider les PDFs avant traitement"""
     safe_print("\n=== VALIDATION DES PDFs ===")
@@ -79,6 +94,7 @@ def valider_pdfs_node(state: State) -> State:
     return State(**state_dict)
 
 
+@mesurer_noeud("convertir_en_images")
 def convertir_en_images_node(state: State) -> State:
     """Noeud pour convertir les PDFs en images"""
     safe_print("\n=== CONVERSION EN IMAGES ===")
@@ -116,6 +132,70 @@ def convertir_en_images_node(state: State) -> State:
     return State(**state_dict)
 
 
+def _suivi_pages(dossier_path: str, pages_extraites: dict, pages_total: int):
+    """
+    Callback appele apres chaque page extraite : checkpoint par page et
+    heartbeat du statut de traitement (thread-safe pour le mode pipeline)
+    """
+    pages_terminees = set(pages_extraites)
+    verrou = threading.Lock()
+
+    def page_terminee(chemin, resultat):
+        enregistrer_page_extraite(dossier_path, chemin, resultat)
+        with verrou:
+            pages_terminees.add(chemin)
+            mettre_a_jour_statut_traitement(
+                dossier_path,
+                etape="EXTRACTION_ET_PARSING",
+                pages_traitees=len(pages_terminees),
+                pages_total=pages_total
+            )
+
+    return page_terminee
+
+
+def _ranger_resultats_extraction(state_dict: dict, resultats_complets: dict):
+    """Range le resultat de traiter_documents_ocr dans le state"""
+    # Extraire les differentes parties du resultat
+    resultats_ocr = resultats_complets.get("resultats_ocr", {})
+    infos_documents = resultats_complets.get("infos_documents", {})
+    resume_extraction = resultats_complets.get("resume_extraction", {})
+
+    # Stocker dans le state
+    state_dict['infos_documents'] = {}
+    state_dict['documents_texte'] = {}
+    state_dict['resultats_ocr_detailles'] = resultats_ocr
+
+    # Convertir les DocumentInfo en dict pour le stockage et garder les textes
+    for chemin, info_doc in infos_documents.items():
+        # Stocker l'objet DocumentInfo converti en dict
+        if hasattr(info_doc, 'dict'):
+            state_dict['infos_documents'][chemin] = info_doc.dict()
+        else:
+            state_dict['infos_documents'][chemin] = info_doc
+
+        # Recuperer le texte brut de l'extraction si disponible
+        if chemin in resultats_ocr:
+            extraction_brute = resultats_ocr[chemin].get("extraction_brute", "")
+            state_dict['documents_texte'][chemin] = extraction_brute
+
+    state_dict['nb_documents_analyses'] = len(infos_documents)
+
+    # Afficher les statistiques d'extraction
+    safe_print(f"Documents traites: {resume_extraction.get('total_documents', 0)}")
+    safe_print(f"Documents avec succes: {resume_extraction.get('documents_traites_ok', 0)}")
+    safe_print(f"Taux de succes: {resume_extraction.get('taux_succes_global', '0%')}")
+
+    # Afficher le detail par document
+    for chemin, info_doc in infos_documents.items():
+        type_doc = info_doc.type_document if hasattr(info_doc, 'type_document') else 'INCONNU'
+        safe_print(f"Document analyse: {os.path.basename(chemin)} -> {type_doc}")
+
+    if not infos_documents:
+        state_dict['erreurs_rencontrees'].append("Aucune information extraite des images")
+
+
+@mesurer_noeud("extraire_et_parser_infos")
 def extraire_et_parser_infos_node(state: State) -> State:
     """
     NOEUD UNIFIE: Extraction OCR ET parsing avec le nouveau systeme
@@ -134,61 +214,92 @@ def extraire_et_parser_infos_node(state: State) -> State:
         return State(**state_dict)
 
     try:
+        # Reprendre les pages deja extraites lors d'une execution interrompue
+        pages_extraites = charger_pages_extraites(state.dossier_path)
+        page_terminee = _suivi_pages(state.dossier_path, pages_extraites, len(state.images_paths))
+
         # Utiliser le nouveau systeme d'extraction ameliore
         client = init_client()
-        resultats_complets = traiter_documents_ocr(client, state.images_paths)
+        resultats_complets = traiter_documents_ocr(
+            client, state.images_paths, pages_extraites, page_terminee
+        )
 
-        # Extraire les differentes parties du resultat
-        resultats_ocr = resultats_complets.get("resultats_ocr", {})
-        infos_documents = resultats_complets.get("infos_documents", {})
-        resume_extraction = resultats_complets.get("resume_extraction", {})
+        _ranger_resultats_extraction(state_dict, resultats_complets)
 
-        # Stocker dans le state
+    except Exception as e:
+        error_msg = f"Erreur lors de l'extraction et parsing: {str(e)}"
+        safe_print(error_msg)
+        state_dict['erreurs_rencontrees'].append(error_msg)
         state_dict['infos_documents'] = {}
         state_dict['documents_texte'] = {}
-        state_dict['resultats_ocr_detailles'] = resultats_ocr
+        state_dict['nb_documents_analyses'] = 0
 
-        # Convertir les DocumentInfo en dict pour le stockage et garder les textes
-        for chemin, info_doc in infos_documents.items():
-            # Stocker l'objet DocumentInfo converti en dict
-            if hasattr(info_doc, 'dict'):
-                state_dict['infos_documents'][chemin] = info_doc.dict()
-            else:
-                state_dict['infos_documents'][chemin] = info_doc
+    safe_print("=== FIN EXTRACTION ET PARSING ===\n")
 
-            # Recuperer le texte brut de l'extraction si disponible
-            if chemin in resultats_ocr:
-                extraction_brute = resultats_ocr[chemin].get("extraction_brute", "")
-                state_dict['documents_texte'][chemin] = extraction_brute
+    return State(**state_dict)
 
-        state_dict['nb_documents_analyses'] = len(infos_documents)
 
-        # Afficher les statistiques d'extraction
-        safe_print(f"Documents traites: {resume_extraction.get('total_documents', 0)}")
-        safe_print(f"Documents avec succes: {resume_extraction.get('documents_traites_ok', 0)}")
-        safe_print(f"Taux de succes: {resume_extraction.get('taux_succes_global', '0%')}")
+@mesurer_noeud("rendre_et_extraire")
+def rendre_et_extraire_node(state: State) -> State:
+    """
+    NOEUD PIPELINE: rendu des pages et extraction OCR en flux
 
-        # Afficher le detail par document
-        for chemin, info_doc in infos_documents.items():
-            type_doc = info_doc.type_document if hasattr(info_doc, 'type_document') else 'INCONNU'
-            safe_print(f"Document analyse: {os.path.basename(chemin)} -> {type_doc}")
+    Remplace convertir_en_images + extraire_et_parser_infos quand PIPELINE_OCR
+    est actif : chaque page part a l'extraction des qu'elle est rendue.
+    """
+    safe_print("\n=== RENDU ET EXTRACTION EN FLUX ===")
 
-        if not infos_documents:
-            state_dict['erreurs_rencontrees'].append("Aucune information extraite des images")
+    state_dict = state.dict()
+    state_dict['workflow_status'] = "EXTRACTION_ET_PARSING"
+
+    if not state.pdf_paths:
+        safe_print("Aucun PDF a convertir")
+        state_dict['images_paths'] = []
+        state_dict['nb_images_generees'] = 0
+        state_dict['infos_documents'] = {}
+        state_dict['documents_texte'] = {}
+        state_dict['nb_documents_analyses'] = 0
+        safe_print("=== FIN RENDU ET EXTRACTION ===\n")
+        return State(**state_dict)
+
+    try:
+        output_dir = os.path.join(state.dossier_path, "images_temp")
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Les pages deja extraites ne sont ni rendues ni renvoyees a l'API
+        pages_extraites = charger_pages_extraites(state.dossier_path)
+        page_terminee = _suivi_pages(state.dossier_path, pages_extraites, compter_pages_pdf(state.pdf_paths))
+
+        client = init_client()
+        pages = iterer_pages_pdf(state.pdf_paths, output_dir, pages_ignorees=set(pages_extraites))
+        resultats_complets = traiter_documents_ocr(
+            client, pages, pages_extraites, page_terminee, en_flux=True
+        )
+
+        images_paths = list(resultats_complets.get("resultats_ocr", {}))
+        state_dict['images_paths'] = images_paths
+        state_dict['nb_images_generees'] = len(images_paths)
+
+        if not images_paths:
+            state_dict['erreurs_rencontrees'].append("Aucune image generee a partir des PDFs")
+
+        _ranger_resultats_extraction(state_dict, resultats_complets)
 
     except Exception as e:
-        error_msg = f"Erreur lors de l'extraction et parsing: {str(e)}"
+        error_msg = f"Erreur lors du rendu et de l'extraction: {str(e)}"
         safe_print(error_msg)
         state_dict['erreurs_rencontrees'].append(error_msg)
         state_dict['infos_documents'] = {}
         state_dict['documents_texte'] = {}
         state_dict['nb_documents_analyses'] = 0
 
-    safe_print("=== FIN EXTRACTION ET PARSING ===\n")
+    safe_print("=== FIN RENDU ET EXTRACTION ===\n")
 
     return State(**state_dict)
 
 
+
+@mesurer_noeud("verifier_concordance")
 def verifier_concordance_node(state: State) -> State:
     """
     NOEUD AMELIORE: Verification de concordance avec analyse detaillee
@@ -215,11 +326,19 @@ def verifier_concordance_node(state: State) -> State:
             else:
                 infos_documents_obj[chemin] = info
 
-        # Verification de base
-        concordance, problemes = verifier_concordance_complete(infos_documents_obj)
+        # Verdict et analyse detaillee en une seule passe
+        ref_demande = reference_dossier(state.dossier_path)
+        analyse_detaillee = analyser_concordance_detaillee(infos_documents_obj, ref_demande)
+        concordance = analyse_detaillee["concordance_globale"]
+        problemes = analyse_detaillee["problemes_detectes"]
 
-        # Analyse detaillee (nouvelle fonction)
-        analyse_detaillee = analyser_concordance_detaillee(infos_documents_obj)
+        # Rendre les identifiants extraits visibles des prochaines demandes
+        identites = analyse_detaillee.get("identites", {})
+        try:
+            indexer_identites(ref_demande, identites, identites.get("nom"),
+                              type_credit_dossier(state.dossier_path), source="ocr")
+        except Exception as e:
+            safe_print(f"Mise a jour de l'index des identites impossible: {e}")
 
         # Stocker tous les resultats
         state_dict['concordance'] = concordance
@@ -257,6 +376,7 @@ def verifier_concordance_node(state: State) -> State:
     return State(**state_dict)
 
 
+@mesurer_noeud("generer_rapport")
 def generer_rapport_node(state: State) -> State:
     """
     NOEUD AMELIORE: Generation de rapport complet avec nouvelles fonctionnalites
@@ -307,7 +427,7 @@ def generer_rapport_node(state: State) -> State:
             safe_print("Rapport complet genere et sauvegarde")
             safe_print("   - Rapport TXT: rapport_ocr.txt")
             safe_print("   - Rapport JSON: rapport_analyse.json")
-            safe_print("   - Rapport PDF: rapport_ocr.pdf")
+            safe_print("   - Rapport PDF: rapport_ocr.pdf" + (" (au premier telechargement)" if RAPPORT_PDF_DIFFERE else ""))
         else:
             safe_print("Probleme lors de la generation du rapport")
             state_dict['erreurs_rencontrees'].append("Erreur lors de la generation du rapport")
@@ -326,15 +446,26 @@ def generer_rapport_node(state: State) -> State:
 # CONSTRUCTION DU WORKFLOW OPTIMISE
 ###################
 
-def construire_workflow():
-    """Construit et retourne le workflow LangGraph optimise avec nouveaux modules"""
+def construire_workflow(checkpointer=None, pipeline: bool = PIPELINE_OCR):
+    """
+    Construit et retourne le workflow LangGraph optimise avec nouveaux modules
+
+    Args:
+        checkpointer: Checkpointer LangGraph (voir reprise.obtenir_checkpointer).
+            Un checkpoint est alors pris apres chaque noeud.
+        pipeline: Rendu et extraction en flux dans un seul noeud
+            (rendre_et_extraire) au lieu de deux noeuds successifs
+    """
     workflow = StateGraph(State)
 
     # Ajouter tous les noeuds - WORKFLOW SIMPLIFIE
     workflow.add_node("charger_documents", charger_documents_node)
     workflow.add_node("valider_pdfs", valider_pdfs_node)
-    workflow.add_node("convertir_en_images", convertir_en_images_node)
-    workflow.add_node("extraire_et_parser_infos", extraire_et_parser_infos_node)
+    if pipeline:
+        workflow.add_node("rendre_et_extraire", rendre_et_extraire_node)
+    else:
+        workflow.add_node("convertir_en_images", convertir_en_images_node)
+        workflow.add_node("extraire_et_parser_infos", extraire_et_parser_infos_node)
     workflow.add_node("verifier_concordance", verifier_concordance_node)
     workflow.add_node("generer_rapport", generer_rapport_node)
 
@@ -343,13 +474,17 @@ def construire_workflow():
 
     # Definir le flux principal - SIMPLIFIE
     workflow.add_edge("charger_documents", "valider_pdfs")
-    workflow.add_edge("valider_pdfs", "convertir_en_images")
-    workflow.add_edge("convertir_en_images", "extraire_et_parser_infos")
-    workflow.add_edge("extraire_et_parser_infos", "verifier_concordance")
+    if pipeline:
+        workflow.add_edge("valider_pdfs", "rendre_et_extraire")
+        workflow.add_edge("rendre_et_extraire", "verifier_concordance")
+    else:
+        workflow.add_edge("valider_pdfs", "convertir_en_images")
+        workflow.add_edge("convertir_en_images", "extraire_et_parser_infos")
+        workflow.add_edge("extraire_et_parser_infos", "verifier_concordance")
     workflow.add_edge("verifier_concordance", "generer_rapport")
     workflow.add_edge("generer_rapport", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
 
 ###################
@@ -17,6 +17,7 @@ DOSSIER_AUTO = os.path.join(DOSSIER_DEMANDES, "auto")
 DOSSIER_IMMO = os.path.join(DOSSIER_DEMANDES, "immo")
 DOSSIER_CONSO = os.path.join(DOSSIER_DEMANDES, "conso")
 DOSSIER_DECOUVERT = os.path.join(DOSSIER_DEMANDES, "decouvert")
+TYPES_CREDIT = ["auto", "immo", "conso", "decouvert"]
 
 # Configuration des crédits auto
 AUTO_MONTANT_MIN = 5000
@@ -47,6 +48,65 @@ DECOUVERT_MONTANT_MIN = 1000
 DECOUVERT_MONTANT_MAX = 50000
 DECOUVERT_TAUX_DEFAUT = 12.0
 
+# Configuration du traitement OCR
+FICHIER_STATUT_TRAITEMENT = "traitement_status.json"
+FICHIER_CHECKPOINTS_OCR = os.path.join(DATA_DIR, "ocr_checkpoints.sqlite")
+DELAI_HEARTBEAT_OCR = 120  # Secondes sans heartbeat avant de considerer un traitement interrompu
+FICHIER_FILE_ATTENTE_OCR = os.path.join(DATA_DIR, "ocr_jobs.sqlite")
+NB_WORKERS_OCR = 2  # Processus workers lances par run_workers_ocr.py
+INTERVALLE_SCRUTATION_OCR = 2  # Secondes entre deux scrutations de la file par un worker inactif
+FICHIER_METRIQUES_OCR = os.path.join(DATA_DIR, "metriques_ocr.jsonl")
+TAILLE_MAX_METRIQUES_OCR = 10 * 1024 * 1024  # Rotation du fichier de metriques au-dela (octets)
+PIPELINE_OCR = True  # Rendu des pages et extraction en flux plutot que l'un apres l'autre
+TAILLE_FILE_PIPELINE_OCR = 4  # Pages rendues en avance au maximum (contre-pression sur le rendu)
+NB_EXTRACTEURS_PIPELINE_OCR = 1  # Appels API simultanes par dossier en mode pipeline
+RAPPORT_PDF_DIFFERE = True  # rapport_ocr.pdf genere au premier telechargement (et mis en cache) plutot qu'a chaque analyse
+NB_THREADS_PORTEFEUILLE = 8  # Lectures de dossiers en parallele pour le rapport de portefeuille
+NB_THREADS_SCAN_DOSSIERS = 16  # Parcours des dossiers de demandes : scandir/stat simultanes (volumes reseau)
+SHARD_SANS_DATE = "sans_date"  # Sous-dossier des references sans date AAMMJJ (<type>/<AAMM>/<REF> sinon)
+DELAI_STABILITE_MIGRATION_S = 60  # Un dossier modifie plus recemment n'est pas deplace par la migration
+TAILLE_FLUX_DEMANDES = 10000  # Changements conserves dans le flux de l'index des demandes
+DELAI_REGROUPEMENT_SURVEILLANCE_MS = 200  # Evenements du systeme de fichiers regroupes avant mise a jour du cache
+INTERVALLE_FLUX_ADMIN_S = 5  # Scrutation du flux des changements par les pages admin
+
+# Tolerance aux erreurs OCR dans la concordance : similarite minimale (0-1) par champ
+# (noms, prenoms, employeurs : mots tries + distance d'edition ; adresses : mots communs)
+SEUILS_SIMILARITE_OCR = {
+    "nom": 0.8,
+    "prenom": 0.8,
+    "employeur": 0.8,
+    "adresse": 0.7
+}
+SEUIL_SIMILARITE_DEFAUT = 0.85
+
+# Penalite sur le score de confiance par discordance, selon la severite de la regle
+PENALITES_SEVERITE_CONCORDANCE = {
+    "critique": 25,
+    "majeure": 15,
+    "mineure": 5
+}
+
+# Rapprochement salaire net des bulletins / credits des releves bancaires
+TOLERANCE_MONTANT_SALAIRE = 0.02  # Ecart relatif toléré entre salaire net et virement
+DELAI_VIREMENT_SALAIRE_JOURS = 10  # Jours après la fin du mois de paie pour recevoir le virement
+
+# Index des identifiants clients (CIN, RIB, telephone, email, employeur) entre dossiers
+FICHIER_INDEX_IDENTITES = os.path.join(DATA_DIR, "index_identites.sqlite")
+
+# Index des demandes (listes et tableaux de bord de l'administration)
+FICHIER_INDEX_DEMANDES = os.path.join(DATA_DIR, "index_demandes.sqlite")
+DELAI_VERIFICATION_CACHE_DEMANDES = 5  # Secondes entre deux controles des _data.json (modifications hors application)
+PAR_PAGE_DEMANDES = 20  # Demandes affichees par page dans la gestion des credits
+
+# Instantane en colonnes des demandes (Dashboard, Clients) : une partition Arrow IPC par type et par mois
+DOSSIER_INSTANTANE_DEMANDES = os.path.join(DATA_DIR, "instantane_demandes")
+INTERVALLE_INSTANTANE_DEMANDES_S = 5  # Secondes entre deux mises a jour de l'instantane par les pages d'analyse
+
+# Journal des changements de statut, conseiller et commentaire ({ref}_journal.jsonl, a cote de {ref}_data.json)
+SUFFIXE_JOURNAL_DEMANDE = "_journal.jsonl"
+TAILLE_COMPACTION_JOURNAL_KO = 32  # Au-dela, le journal est replie dans _data.json (ecriture atomique)
+DELAI_GROUPE_FSYNC_MS = 5  # Fenetre de regroupement des ecritures concurrentes en un seul fsync
+
 # Configuration des documents
 DOCUMENTS_EXTENSIONS = ["pdf", "png", "jpg", "jpeg"]
 TAILLE_MAX_DOCUMENT_MB = 10
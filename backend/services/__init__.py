@@ -21,6 +21,21 @@ from backend.services.validations import (
     nettoyer_texte
 )
 
+from backend.services.normalisation import (
+    normaliser_texte,
+    normaliser_numero,
+    replier_accents,
+    texte_contient
+)
+
+from backend.services.dates import (
+    parser_date,
+    date_reference,
+    date_demande,
+    parser_dates_serie,
+    dates_demandes_serie
+)
+
 from backend.services.fichiers import (
     sauvegarder_fichier,
     get_binary_file_downloader_html,
@@ -0,0 +1,328 @@
+"""
+backend/services/cache_demandes.py - Cache incremental des demandes, partage par toutes les sessions admin
+"""
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from backend.config import DOSSIER_DEMANDES, TYPES_CREDIT, DELAI_VERIFICATION_CACHE_DEMANDES
+from backend.services.index_demandes import (
+    appliquer_modifications,
+    lignes_index,
+    lire_demande,
+    lire_dossiers_demandes,
+    reconcilier_index
+)
+from backend.services.journal_demandes import signature_demande
+from backend.services.scanner_dossiers import lister_conteneur, signatures_paralleles
+
+
+def _trouver_fichier_demande(chemin_dossier: str) -> Optional[str]:
+    """Chemin du *_data.json d'un dossier, None s'il n'existe pas (encore)"""
+    try:
+        with os.scandir(chemin_dossier) as fichiers:
+            return next((f.path for f in fichiers if f.name.endswith("_data.json")), None)
+    except OSError:
+        return None
+
+
+class CacheDemandes:
+    """
+    Demandes en memoire, tenues a jour par des stat() plutot que par des relectures
+
+    A chaque appel, seuls les dossiers de type et leur sous-dossier du mois
+    courant (ou arrivent les nouvelles demandes) sont re-stat : un mtime
+    change signale un dossier de demande cree, supprime ou deplace. Les
+    autres sous-dossiers mensuels et les *_data.json (et leur journal) sont
+    re-stat au plus toutes les delai_verification secondes et seules les
+    demandes dont (taille, mtime_ns) a change sont relues. Les ecritures de
+    l'application passent par invalider() et sont visibles des l'appel suivant.
+    """
+
+    def __init__(self, racine: str = DOSSIER_DEMANDES,
+                 delai_verification: float = DELAI_VERIFICATION_CACHE_DEMANDES):
+        self.racine = racine
+        self.delai_verification = delai_verification
+        self._verrou = threading.Lock()
+        self._charge = False
+        # Dossiers de type et mensuels : chemin -> {type_credit, parent (None pour un type), mtime}
+        self._conteneurs = {}
+        # chemin du dossier -> {type_credit, mtime_dossier, chemin_json, signature, demande}
+        self._dossiers = {}
+        self._liste = []  # Demandes triees, reconstruite apres chaque changement
+        self._liste_perimee = False  # Changement applique par actualiser(), liste a reconstruire
+        self._a_relire = set()
+        self._conteneurs_a_relister = set()
+        self._derniere_verification = 0.0
+        self._statistiques = {
+            "appels": 0, "hits": 0, "miss": 0, "rescans_conteneurs": 0, "verifications_fichiers": 0,
+            "fichiers_relus": 0, "dossiers_supprimes": 0, "duree_totale_ms": 0.0, "duree_miss_ms": 0.0,
+            "duree_dernier_appel_ms": 0.0, "amorcage_ms": None
+        }
+
+    ###################
+    # API
+    ###################
+
+    def obtenir(self) -> List[Dict]:
+        """
+        Demandes a jour (copies : les appelants peuvent les modifier)
+
+        Returns:
+            List[Dict]: Demandes, triees par type puis par dossier
+        """
+        with self._verrou:
+            debut = time.perf_counter()
+            if not self._charge:
+                self._amorcer()
+                changement = True
+            else:
+                changement = self._rafraichir()
+
+            duree = (time.perf_counter() - debut) * 1000
+            stats = self._statistiques
+            stats["appels"] += 1
+            stats["duree_totale_ms"] += duree
+            stats["duree_dernier_appel_ms"] = round(duree, 3)
+            if changement:
+                stats["miss"] += 1
+                stats["duree_miss_ms"] += duree
+            else:
+                stats["hits"] += 1
+            if changement or self._liste_perimee:
+                self._liste = [self._dossiers[chemin]["demande"] for chemin in sorted(self._dossiers)
+                               if self._dossiers[chemin]["demande"] is not None]
+                self._liste.sort(key=lambda d: TYPES_CREDIT.index(d["type_credit"])
+                                 if d["type_credit"] in TYPES_CREDIT else len(TYPES_CREDIT))
+                self._liste_perimee = False
+            liste = self._liste
+
+        return [dict(demande) for demande in liste]
+
+    def actualiser(self) -> bool:
+        """
+        Applique les changements (et les reporte dans l'index) sans copier les demandes
+
+        Returns:
+            bool: True si au moins une demande a change
+        """
+        with self._verrou:
+            if not self._charge:
+                self._amorcer()
+                changement = True
+            else:
+                changement = self._rafraichir()
+            self._liste_perimee = self._liste_perimee or changement
+            return changement
+
+    def invalider(self, chemin_dossier: str = None):
+        """
+        Force la relecture d'un dossier (ou de tous) a l'appel suivant
+
+        Un dossier encore inconnu (cree ou deplace) fait relister le dossier
+        de type ou mensuel qui le contient.
+
+        Args:
+            chemin_dossier (str): Dossier ecrit par l'application ou signale par
+                                  la surveillance du disque, None pour tout recontroler
+        """
+        with self._verrou:
+            if chemin_dossier is None:
+                for conteneur in self._conteneurs.values():
+                    conteneur["mtime"] = None
+                self._derniere_verification = 0.0
+            elif chemin_dossier in self._conteneurs:
+                self._conteneurs_a_relister.add(chemin_dossier)
+            elif chemin_dossier in self._dossiers or os.path.dirname(chemin_dossier) not in self._conteneurs:
+                self._a_relire.add(chemin_dossier)
+            else:
+                self._conteneurs_a_relister.add(os.path.dirname(chemin_dossier))
+
+    def statistiques(self) -> Dict:
+        """Compteurs hit/miss, nombre de fichiers relus et durees (ms)"""
+        with self._verrou:
+            stats = dict(self._statistiques)
+        stats["nb_demandes"] = len(self._liste)
+        stats["duree_moyenne_ms"] = round(stats["duree_totale_ms"] / stats["appels"], 3) if stats["appels"] else 0.0
+        stats["duree_totale_ms"] = round(stats["duree_totale_ms"], 1)
+        stats["duree_miss_ms"] = round(stats["duree_miss_ms"], 1)
+        return stats
+
+    ###################
+    # MISE A JOUR
+    ###################
+
+    @staticmethod
+    def _mtime(chemin: str) -> Optional[int]:
+        try:
+            return os.stat(chemin).st_mtime_ns
+        except OSError:
+            return None
+
+    def _amorcer(self):
+        """
+        Premier chargement : depuis l'index SQLite reconcilie (aucun JSON relu
+        s'il est a jour), ou par lecture des dossiers si l'index est indisponible
+        """
+        debut = time.perf_counter()
+        self._conteneurs = {}
+        self._dossiers = {}
+        try:
+            reconcilier_index(self.racine)
+            lignes = list(lignes_index())
+        except sqlite3.Error:
+            lignes = lire_dossiers_demandes(self.racine)
+
+        for type_credit, chemin_dossier, chemin_json, signature, demande in lignes:
+            self._dossiers[chemin_dossier] = {
+                "type_credit": type_credit, "mtime_dossier": None, "chemin_json": chemin_json,
+                "signature": signature, "demande": demande
+            }
+
+        # Dossiers de type et mensuels ; dossiers sans _data.json (soumission en cours) surveilles par leur mtime
+        for type_credit in TYPES_CREDIT:
+            chemin_type = os.path.join(self.racine, type_credit)
+            self._conteneurs[chemin_type] = {"type_credit": type_credit, "parent": None, "mtime": None}
+            self._rescanner_conteneur(chemin_type, [], [])
+
+        self._derniere_verification = time.monotonic()
+        self._charge = True
+        self._statistiques["amorcage_ms"] = round((time.perf_counter() - debut) * 1000, 1)
+
+    def _rescanner_conteneur(self, chemin: str, modifiees: list, supprimees: list):
+        """
+        Detecte les dossiers de demande crees, supprimes ou deplaces dans un
+        dossier de type (et ses sous-dossiers mensuels) ou dans un dossier mensuel
+        """
+        conteneur = self._conteneurs[chemin]
+        type_credit = conteneur["type_credit"]
+        conteneur["mtime"], dossiers, shards = lister_conteneur(chemin)
+        presents = set(dossiers)
+
+        for chemin_dossier in presents - self._dossiers.keys():
+            self._dossiers[chemin_dossier] = {
+                "type_credit": type_credit, "mtime_dossier": None, "chemin_json": None,
+                "signature": None, "demande": None
+            }
+            self._verifier_dossier(chemin_dossier, modifiees, supprimees)
+
+        for chemin_dossier in [c for c in self._dossiers
+                               if os.path.dirname(c) == chemin and c not in presents]:
+            self._retirer(chemin_dossier, supprimees)
+
+        if conteneur["parent"] is not None:
+            return
+
+        # Dossier de type : sous-dossiers mensuels apparus, disparus ou modifies
+        for chemin_shard in [c for c, s in self._conteneurs.items() if s["parent"] == chemin and c not in shards]:
+            del self._conteneurs[chemin_shard]
+            for chemin_dossier in [c for c in self._dossiers if os.path.dirname(c) == chemin_shard]:
+                self._retirer(chemin_dossier, supprimees)
+        for chemin_shard in shards:
+            if chemin_shard not in self._conteneurs:
+                self._conteneurs[chemin_shard] = {"type_credit": type_credit, "parent": chemin, "mtime": None}
+            if self._mtime(chemin_shard) != self._conteneurs[chemin_shard]["mtime"]:
+                self._rescanner_conteneur(chemin_shard, modifiees, supprimees)
+
+    def _retirer(self, chemin_dossier: str, supprimees: list):
+        entree = self._dossiers.pop(chemin_dossier)
+        if entree["chemin_json"]:
+            supprimees.append(entree["chemin_json"])
+        self._statistiques["dossiers_supprimes"] += 1
+
+    def _verifier_dossier(self, chemin_dossier: str, modifiees: list, supprimees: list):
+        """Relit la demande d'un dossier si sa signature (_data.json et journal) a change"""
+        entree = self._dossiers[chemin_dossier]
+        signature = None
+        if entree["chemin_json"]:
+            try:
+                signature = signature_demande(entree["chemin_json"])
+            except OSError:
+                supprimees.append(entree["chemin_json"])
+                entree.update(chemin_json=None, signature=None, demande=None, mtime_dossier=None)
+
+        if signature is None:
+            # Pas (ou plus) de _data.json : ne relister le dossier que si son mtime a change
+            try:
+                mtime_dossier = os.stat(chemin_dossier).st_mtime_ns
+            except OSError:
+                self._retirer(chemin_dossier, supprimees)
+                return
+            if mtime_dossier == entree["mtime_dossier"]:
+                return
+            entree["mtime_dossier"] = mtime_dossier
+            chemin_json = _trouver_fichier_demande(chemin_dossier)
+            if chemin_json is None:
+                return
+            try:
+                signature = signature_demande(chemin_json)
+            except OSError:
+                return
+            entree["chemin_json"] = chemin_json
+
+        if signature == entree["signature"]:
+            return
+
+        demande = lire_demande(entree["chemin_json"], entree["type_credit"], chemin_dossier)
+        entree["signature"] = signature
+        entree["demande"] = demande
+        self._statistiques["fichiers_relus"] += 1
+        if demande is not None:
+            modifiees.append((demande, entree["chemin_json"], signature))
+        else:
+            supprimees.append(entree["chemin_json"])  # Illisible (ecriture en cours ?) : relu au prochain changement
+
+    def _rafraichir(self) -> bool:
+        """
+        Applique les changements intervenus depuis l'appel precedent
+
+        Returns:
+            bool: True si au moins une demande a change
+        """
+        modifiees, supprimees = [], []
+        nb_dossiers = len(self._dossiers)
+
+        maintenant = time.monotonic()
+        complet = maintenant - self._derniere_verification >= self.delai_verification
+
+        # Dossiers de type et du mois courant a chaque appel, tous les dossiers mensuels a chaque verification
+        mois = datetime.now().strftime("%y%m")
+        a_controler = [c for c, s in self._conteneurs.items()
+                       if complet or s["parent"] is None or os.path.basename(c) == mois]
+        for chemin in a_controler:
+            if chemin in self._conteneurs and self._mtime(chemin) != self._conteneurs[chemin]["mtime"]:
+                self._conteneurs_a_relister.add(chemin)
+        for chemin in sorted(self._conteneurs_a_relister):
+            if chemin in self._conteneurs:
+                self._statistiques["rescans_conteneurs"] += 1
+                self._rescanner_conteneur(chemin, modifiees, supprimees)
+        self._conteneurs_a_relister.clear()
+
+        if complet:
+            # Stat de tous les _data.json en parallele : seuls les dossiers changes sont verifies
+            self._statistiques["verifications_fichiers"] += 1
+            signatures = signatures_paralleles(e["chemin_json"] for e in self._dossiers.values() if e["chemin_json"])
+            a_verifier = [c for c, e in self._dossiers.items()
+                          if e["chemin_json"] is None or signatures.get(e["chemin_json"]) != e["signature"]]
+            a_verifier += [c for c in self._a_relire if c in self._dossiers]
+            self._derniere_verification = maintenant
+        else:
+            # Dossiers ecrits par l'application et dossiers encore sans _data.json
+            a_verifier = [c for c in self._a_relire if c in self._dossiers]
+            a_verifier += [c for c, e in self._dossiers.items() if e["chemin_json"] is None]
+        self._a_relire.clear()
+
+        for chemin_dossier in a_verifier:
+            if chemin_dossier in self._dossiers:
+                self._verifier_dossier(chemin_dossier, modifiees, supprimees)
+
+        if modifiees or supprimees:
+            try:
+                appliquer_modifications(modifiees, supprimees)
+            except sqlite3.Error:
+                pass  # L'index sera realigne par sa reconciliation au prochain amorcage
+
+        return bool(modifiees or supprimees) or len(self._dossiers) != nb_dossiers
@@ -0,0 +1,101 @@
+"""
+backend/services/chemins_dossiers.py - Emplacement des dossiers de demandes (arborescence <type>/<AAMM>/<REF>/)
+"""
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from backend.config import DOSSIER_DEMANDES, TYPES_CREDIT, SHARD_SANS_DATE
+
+# References generees par les formulaires : PREFIXE-AAMMJJ-XXXX (ex. AUTO-250612-3F2A)
+MOTIF_REFERENCE = re.compile(r"^[A-Z]+-(\d{4})\d{2}-[0-9A-Z]+$")
+
+# Sous-dossier mensuel d'un dossier de type : AAMM (ou SHARD_SANS_DATE)
+MOTIF_SHARD = re.compile(r"^\d{4}$")
+
+
+def generer_reference(prefixe: str) -> str:
+    """Nouvelle reference de demande PREFIXE-AAMMJJ-XXXX"""
+    return f"{prefixe}-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
+
+
+def shard_reference(ref_demande: str) -> str:
+    """Sous-dossier mensuel (AAMM) d'une reference, SHARD_SANS_DATE si elle ne suit pas le format"""
+    correspondance = MOTIF_REFERENCE.match(ref_demande or "")
+    return correspondance.group(1) if correspondance else SHARD_SANS_DATE
+
+
+def est_shard(nom: str) -> bool:
+    """Distingue un sous-dossier mensuel d'un dossier de demande (ancienne arborescence "Nom - REF")"""
+    return bool(MOTIF_SHARD.match(nom)) or nom == SHARD_SANS_DATE
+
+
+def reference_valide(ref_demande: str) -> bool:
+    """Reference utilisable comme nom de dossier (pas de separateur ni de chemin relatif)"""
+    return bool(ref_demande) and not ref_demande.startswith(".") and "/" not in ref_demande and "\\" not in ref_demande
+
+
+def chemin_dossier_demande(type_credit: str, ref_demande: str, racine: str = DOSSIER_DEMANDES) -> str:
+    """
+    Chemin d'un dossier de demande : <racine>/<type>/<AAMM>/<REF>
+
+    Raises:
+        ValueError: Reference inutilisable comme nom de dossier
+    """
+    if not reference_valide(ref_demande):
+        raise ValueError(f"Reference de demande invalide: {ref_demande!r}")
+    return os.path.join(racine, type_credit, shard_reference(ref_demande), ref_demande)
+
+
+def creer_dossier_demande(type_credit: str, ref_demande: str, racine: str = DOSSIER_DEMANDES) -> str:
+    """Cree (si besoin) le dossier d'une nouvelle demande et renvoie son chemin"""
+    chemin_dossier = chemin_dossier_demande(type_credit, ref_demande, racine)
+    os.makedirs(chemin_dossier, exist_ok=True)
+    return chemin_dossier
+
+
+def nom_dossier_historique(nom_complet: str, ref_demande: str) -> str:
+    """Nom d'un dossier de l'ancienne arborescence plate : "Nom Prenom - REF" """
+    if not nom_complet or not ref_demande:
+        return f"Client - {ref_demande}" if ref_demande else "Client"
+    return f"{nom_complet.strip()} - {ref_demande}"
+
+
+def resoudre_dossier(type_credit: str, ref_demande: str, nom_complet: str = None,
+                     racine: str = DOSSIER_DEMANDES) -> Optional[str]:
+    """
+    Dossier existant d'une demande, sans parcourir le dossier du type
+
+    L'emplacement <type>/<AAMM>/<REF> est essaye d'abord, puis, tant que la
+    migration n'est pas terminee, l'ancien emplacement <type>/<Nom - REF>.
+
+    Returns:
+        Optional[str]: Chemin du dossier, None si aucun des deux n'existe
+    """
+    if not reference_valide(ref_demande):
+        return None
+
+    chemin = chemin_dossier_demande(type_credit, ref_demande, racine)
+    if os.path.isdir(chemin):
+        return chemin
+
+    chemin_historique = os.path.join(racine, type_credit, nom_dossier_historique(nom_complet, ref_demande))
+    if os.path.isdir(chemin_historique):
+        return chemin_historique
+    return None
+
+
+def reference_dossier(chemin_dossier: str) -> str:
+    """Reference d'un dossier, dans les deux arborescences (<REF> ou "Nom - REF")"""
+    return os.path.basename(os.path.normpath(chemin_dossier)).rsplit(" - ", 1)[-1]
+
+
+def type_credit_dossier(chemin_dossier: str) -> Optional[str]:
+    """Type de credit d'un dossier range sous <type>/<AAMM>/ ou, anciennement, directement sous <type>/"""
+    parent = os.path.dirname(os.path.normpath(chemin_dossier))
+    if est_shard(os.path.basename(parent)):
+        parent = os.path.dirname(parent)
+    type_credit = os.path.basename(parent)
+    return type_credit if type_credit in TYPES_CREDIT else None
@@ -0,0 +1,156 @@
+"""
+backend/services/dates.py - Analyse de dates partagee (OCR, tableau de bord, traitement par lot)
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+TAILLE_CACHE_DATES = 16384
+
+# Une seule expression pour tous les formats acceptes :
+#   JJ/MM/AAAA, JJ-MM-AAAA, JJ.MM.AAAA (annee sur 2 ou 4 chiffres)
+#   AAAA-MM-JJ, AAAA/MM/JJ, AAAA.MM.JJ (suivi eventuellement d'une heure ISO)
+MOTIF_DATE = re.compile(
+    r'^(?:(?P<jour>\d{1,2})(?P<sep>[/.-])(?P<mois>\d{1,2})(?P=sep)(?P<annee>\d{4}|\d{2})'
+    r'|(?P<annee_iso>\d{4})(?P<sep_iso>[/.-])(?P<mois_iso>\d{1,2})(?P=sep_iso)(?P<jour_iso>\d{1,2})'
+    r'(?:[T ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?)$'
+)
+
+# Reference de demande TYPE-AAMMJJ-XXXX
+MOTIF_REFERENCE = re.compile(r'^[^-]*-(\d{2})(\d{2})(\d{2})(?:-|$)')
+
+
+def _annee_complete(annee: int, nb_chiffres: int) -> int:
+    """Annee sur 2 chiffres -> 4 chiffres (pivot de strptime %y : 69-99 -> 19xx, 00-68 -> 20xx)"""
+    if nb_chiffres == 2:
+        return annee + (1900 if annee >= 69 else 2000)
+    return annee
+
+
+def _construire_date(annee: int, mois: int, jour: int) -> Optional[date]:
+    try:
+        return date(annee, mois, jour)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=TAILLE_CACHE_DATES)
+def _parser_date(texte: str) -> Optional[date]:
+    correspondance = MOTIF_DATE.match(texte)
+    if not correspondance:
+        return None
+
+    groupes = correspondance.groupdict()
+    if groupes["jour"] is not None:
+        annee = _annee_complete(int(groupes["annee"]), len(groupes["annee"]))
+        return _construire_date(annee, int(groupes["mois"]), int(groupes["jour"]))
+    return _construire_date(int(groupes["annee_iso"]), int(groupes["mois_iso"]), int(groupes["jour_iso"]))
+
+
+def parser_date(valeur) -> Optional[date]:
+    """
+    Convertit une date en texte dans l'un des formats acceptes
+
+    Formats : JJ/MM/AAAA, JJ-MM-AAAA, JJ.MM.AAAA (annee sur 2 ou 4 chiffres),
+    AAAA-MM-JJ et variantes, ISO 8601 avec heure. Les valeurs deja vues sont
+    servies par un cache LRU.
+
+    Args:
+        valeur: Texte, date ou datetime
+
+    Returns:
+        Optional[date]: Date, ou None si le texte n'est pas une date valide
+    """
+    if not valeur:
+        return None
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    return _parser_date(str(valeur).strip())
+
+
+@lru_cache(maxsize=TAILLE_CACHE_DATES)
+def date_reference(ref_demande: str) -> Optional[date]:
+    """
+    Date encodee dans une reference de demande TYPE-AAMMJJ-XXXX
+
+    Returns:
+        Optional[date]: Date de creation de la reference, None si illisible
+    """
+    correspondance = MOTIF_REFERENCE.match(ref_demande or "")
+    if not correspondance:
+        return None
+    annee, mois, jour = (int(g) for g in correspondance.groups())
+    return _construire_date(2000 + annee, mois, jour)
+
+
+def date_demande(demande: Dict) -> Optional[date]:
+    """
+    Date d'une demande : date de soumission, ou date encodee dans sa reference
+
+    Args:
+        demande (Dict): Donnees de la demande
+
+    Returns:
+        Optional[date]: Date de la demande, None si aucune n'est lisible
+    """
+    return parser_date(demande.get("date_soumission")) or date_reference(demande.get("ref_demande") or "")
+
+
+def parser_dates_serie(valeurs):
+    """
+    Version vectorisee de parser_date pour une colonne pandas
+
+    Les valeurs distinctes sont extraites une seule fois par l'expression
+    de MOTIF_DATE (str.extract), puis converties en bloc.
+
+    Args:
+        valeurs (pd.Series | Iterable): Textes de dates
+
+    Returns:
+        pd.Series: Dates (datetime64), NaT pour les valeurs illisibles
+    """
+    import pandas as pd
+
+    serie = valeurs if isinstance(valeurs, pd.Series) else pd.Series(list(valeurs), dtype="object")
+    codes, distinctes = pd.factorize(serie.astype("string").str.strip(), use_na_sentinel=True)
+    if len(distinctes) == 0:
+        return pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+
+    extraits = pd.Series(distinctes, dtype="object").str.extract(MOTIF_DATE)
+    jour = extraits["jour"].fillna(extraits["jour_iso"]).astype("float64")
+    mois = extraits["mois"].fillna(extraits["mois_iso"]).astype("float64")
+    annee_texte = extraits["annee"].fillna(extraits["annee_iso"])
+
+    annee = annee_texte.astype("float64")
+    deux_chiffres = annee_texte.str.len() == 2
+    annee = annee.mask(deux_chiffres & (annee >= 69), annee + 1900).mask(deux_chiffres & (annee < 69), annee + 2000)
+
+    dates_distinctes = pd.to_datetime(pd.DataFrame({"year": annee, "month": mois, "day": jour}), errors="coerce")
+
+    resultat = pd.Series(dates_distinctes.to_numpy()[codes], index=serie.index)
+    return resultat.where(codes >= 0)
+
+
+def dates_demandes_serie(demandes: Iterable[Dict]):
+    """
+    Version vectorisee de date_demande pour une liste de demandes
+
+    Returns:
+        pd.Series: Dates (datetime64) dans l'ordre des demandes, NaT si illisible
+    """
+    import pandas as pd
+
+    demandes = list(demandes)
+    soumission = parser_dates_serie([d.get("date_soumission") for d in demandes])
+    if soumission.isna().any():
+        references = pd.Series([d.get("ref_demande") or "" for d in demandes], dtype="object")
+        parties = references.str.extract(MOTIF_REFERENCE).astype("float64")
+        depuis_reference = pd.to_datetime(
+            pd.DataFrame({"year": parties[0] + 2000, "month": parties[1], "day": parties[2]}),
+            errors="coerce"
+        )
+        soumission = soumission.fillna(depuis_reference)
+    return soumission
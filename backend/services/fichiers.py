@@ -108,25 +108,26 @@ def lister_fichiers_dossier(chemin_dossier, extensions=None):
     Returns:
         list: Liste des chemins complets des fichiers
     """
-    if not os.path.exists(chemin_dossier):
+    try:
+        entrees = os.scandir(chemin_dossier)
+    except OSError:
         return []
 
     fichiers = []
 
-    for fichier in os.listdir(chemin_dossier):
-        chemin_complet = os.path.join(chemin_dossier, fichier)
-
-        # Vérifier que c'est un fichier (pas un dossier)
-        if not os.path.isfile(chemin_complet):
-            continue
-
-        # Filtrer par extension si demandé
-        if extensions:
-            ext = os.path.splitext(fichier)[1].lower().lstrip('.')
-            if ext not in extensions:
+    with entrees:
+        for entree in entrees:
+            # Vérifier que c'est un fichier (pas un dossier), sans stat supplémentaire
+            if not entree.is_file():
                 continue
 
-        fichiers.append(chemin_complet)
+            # Filtrer par extension si demandé
+            if extensions:
+                ext = os.path.splitext(entree.name)[1].lower().lstrip('.')
+                if ext not in extensions:
+                    continue
+
+            fichiers.append(entree.path)
 
     return fichiers
 
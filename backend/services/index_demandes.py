@@ -0,0 +1,660 @@
+"""
+backend/services/index_demandes.py - Index SQLite des demandes (listes de l'administration sans relire les dossiers)
+"""
+import os
+import re
+import json
+import math
+import time
+import uuid
+import sqlite3
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.config import DOSSIER_DEMANDES, FICHIER_INDEX_DEMANDES, PAR_PAGE_DEMANDES, TAILLE_FLUX_DEMANDES
+from backend.services.chemins_dossiers import reference_dossier, type_credit_dossier
+from backend.services.dates import date_demande
+from backend.services.normalisation import normaliser_texte
+from backend.services.journal_demandes import lire_demande_journalisee, signature_demande
+from backend.services.scanner_dossiers import scanner_dossiers
+
+# Version du schema : un index d'une autre version est recree (il est reconstructible)
+VERSION_SCHEMA = 2
+
+# Colonnes indexees, en plus du contenu complet de {ref}_data.json (colonne donnees)
+COLONNES_DEMANDES = ["ref_demande", "type_credit", "statut", "nom", "prenom", "email", "montant",
+                     "date_demande", "date_mise_a_jour", "conseiller"]
+
+# Filtres acceptes par rechercher_demandes (egalite stricte)
+FILTRES_DEMANDES = ["ref_demande", "type_credit", "statut", "nom", "email", "conseiller"]
+
+# Tris proposes par interroger_demandes (chemin_dossier departage les egalites)
+TRIS_DEMANDES = {
+    "date_desc": "date_demande DESC, chemin_dossier",
+    "date_asc": "date_demande ASC, chemin_dossier",
+    "montant_desc": "montant DESC, chemin_dossier",
+    "montant_asc": "montant ASC, chemin_dossier",
+    "nom": "nom COLLATE NOCASE, chemin_dossier"
+}
+
+MOTIF_CHAMP = re.compile(r'^\w+$')
+
+# Champs couverts par la recherche libre (normalises : minuscules, sans accents)
+CHAMPS_RECHERCHE = ["nom", "prenom", "email", "telephone", "ref_demande"]
+
+# Natures des changements du flux (table changements)
+CHANGEMENT_DEMANDE = "demande"  # Demande ajoutee ou modifiee
+CHANGEMENT_SUPPRESSION = "suppression"
+CHANGEMENT_OCR = "ocr"  # Statut du traitement OCR (detail : queued, processing, completed, error)
+
+# Une reference introuvable declenche au plus une reconciliation par intervalle
+DELAI_MIN_RECONCILIATION_S = 30
+
+_derniere_reconciliation = 0.0
+
+
+@lru_cache(maxsize=None)
+def _initialiser(chemin: str) -> str:
+    """
+    Cree ou met a niveau le schema de l'index, une seule fois par processus et par fichier
+
+    La mise en place se fait dans une transaction BEGIN IMMEDIATE : deux
+    processus qui demarrent ensemble ne recreent pas l'index l'un apres l'autre.
+
+    Returns:
+        str: Chemin de l'index (cle du cache)
+    """
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    conn = sqlite3.connect(chemin, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        recree = conn.execute("PRAGMA user_version").fetchone()[0] != VERSION_SCHEMA
+        if recree:
+            conn.execute("DROP TABLE IF EXISTS demandes")
+            conn.execute("DROP TABLE IF EXISTS changements")
+            conn.execute(f"PRAGMA user_version = {VERSION_SCHEMA}")
+        # Une ligne par fichier {ref}_data.json ; (mtime_ns, taille) permet a
+        # la reconciliation de ne relire que les fichiers modifies
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS demandes (
+                chemin_json TEXT PRIMARY KEY,
+                ref_demande TEXT,
+                type_credit TEXT NOT NULL,
+                statut TEXT,
+                nom TEXT,
+                prenom TEXT,
+                email TEXT,
+                montant REAL,
+                date_demande TEXT,
+                date_mise_a_jour TEXT,
+                conseiller TEXT,
+                recherche TEXT,
+                chemin_dossier TEXT NOT NULL,
+                mtime_ns INTEGER,
+                taille INTEGER,
+                donnees TEXT NOT NULL
+            )
+        """)
+        for colonne in ("ref_demande", "type_credit, statut", "type_credit, date_demande", "type_credit, montant",
+                        "statut", "nom", "email", "montant", "date_demande", "conseiller"):
+            nom_index = "idx_demandes_" + colonne.replace(", ", "_")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {nom_index} ON demandes ({colonne})")
+        # Flux des changements : une ligne par demande ecrite ou retiree de
+        # l'index (dans la meme transaction) et par changement de statut OCR
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS changements (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                nature TEXT NOT NULL,
+                chemin_json TEXT,
+                ref_demande TEXT,
+                type_credit TEXT,
+                chemin_dossier TEXT NOT NULL,
+                detail TEXT,
+                date TEXT NOT NULL
+            )
+        """)
+        # Epoque du flux : changee a chaque remise a zero des versions
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT NOT NULL)")
+        if recree or conn.execute("SELECT 1 FROM meta WHERE cle = 'epoque_flux'").fetchone() is None:
+            _nouvelle_epoque(conn)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return chemin
+
+
+@contextmanager
+def _base():
+    """Connexion courte sur l'index (schema mis en place au premier appel du processus), validee puis fermee"""
+    conn = sqlite3.connect(_initialiser(FICHIER_INDEX_DEMANDES), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _nouvelle_epoque(conn: sqlite3.Connection):
+    """
+    Ouvre une nouvelle epoque du flux (index recree ou vide, flux purge)
+
+    Les versions ne suffisent pas a situer un appelant apres une remise a
+    zero : elles repartent de 1 quand la table est recreee. L'epoque tenue
+    par l'appelant ne correspond plus, et changements_depuis lui repond
+    "complet" False.
+    """
+    conn.execute("INSERT OR REPLACE INTO meta (cle, valeur) VALUES ('epoque_flux', ?)", (uuid.uuid4().hex[:12],))
+
+
+def _epoque(conn: sqlite3.Connection) -> str:
+    return conn.execute("SELECT valeur FROM meta WHERE cle = 'epoque_flux'").fetchone()[0]
+
+
+def completer_demande(donnees: Dict, type_credit: str, chemin_dossier: str) -> Dict:
+    """Ajoute a une demande lue sur disque son type, son statut par defaut et son dossier"""
+    donnees.setdefault("type_credit", type_credit)
+    donnees.setdefault("statut", "En attente")
+    donnees["chemin_dossier"] = chemin_dossier
+    donnees["nom_dossier"] = os.path.basename(chemin_dossier)
+    return donnees
+
+
+def lire_dossiers_demandes(racine: str = DOSSIER_DEMANDES) -> Iterator[Tuple[str, str, str, Tuple[int, int], Dict]]:
+    """
+    Lit toutes les demandes des dossiers (parcours parallele, sans passer par l'index)
+
+    Yields:
+        Tuple: (type de credit, chemin du dossier, chemin du _data.json, signature, demande completee)
+    """
+    for dossier in scanner_dossiers(racine, lire_si=lambda *_: True)["dossiers"]:
+        if dossier["donnees"] is not None:
+            yield (dossier["type_credit"], dossier["chemin_dossier"], dossier["chemin_json"], dossier["signature"],
+                   completer_demande(dossier["donnees"], dossier["type_credit"], dossier["chemin_dossier"]))
+
+
+def lire_demande(chemin_json: str, type_credit: str, chemin_dossier: str) -> Optional[Dict]:
+    """
+    Lit un fichier {ref}_data.json et rejoue son journal de modifications
+
+    Returns:
+        Optional[Dict]: Demande completee (voir completer_demande), None si illisible
+    """
+    donnees = lire_demande_journalisee(chemin_json)
+    if donnees is None:
+        return None
+    return completer_demande(donnees, type_credit, chemin_dossier)
+
+
+def _ligne(demande: Dict, chemin_json: str, signature: Tuple[int, int]) -> tuple:
+    """Ligne de la table demandes (colonnes indexees + JSON complet)"""
+    try:
+        montant = float(demande.get("montant") or 0)
+    except (TypeError, ValueError):
+        montant = None
+    jour = date_demande(demande)
+    donnees = {k: v for k, v in demande.items() if k not in ("chemin_dossier", "nom_dossier")}
+    recherche = normaliser_texte(" ".join(str(demande.get(cle) or "") for cle in CHAMPS_RECHERCHE))
+    return (
+        chemin_json, demande.get("ref_demande"), demande["type_credit"], demande.get("statut"),
+        demande.get("nom"), demande.get("prenom"), demande.get("email"), montant,
+        jour.isoformat() if jour else None, demande.get("date_mise_a_jour"), demande.get("conseiller"),
+        recherche, demande["chemin_dossier"], signature[1], signature[0],
+        json.dumps(donnees, default=str, ensure_ascii=False)
+    )
+
+
+_INSERTION = (
+    "INSERT OR REPLACE INTO demandes (chemin_json, ref_demande, type_credit, statut, nom, prenom, email, "
+    "montant, date_demande, date_mise_a_jour, conseiller, recherche, chemin_dossier, mtime_ns, taille, donnees) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _noter_changements(conn: sqlite3.Connection, nature: str, lignes: Iterable[tuple], detail: str = None):
+    """
+    Ajoute des changements au flux, dans la transaction qui les applique
+
+    Args:
+        lignes: (chemin_json, ref_demande, type_credit, chemin_dossier)
+    """
+    maintenant = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        "INSERT INTO changements (nature, chemin_json, ref_demande, type_credit, chemin_dossier, detail, date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(nature, *ligne, detail, maintenant) for ligne in lignes]
+    )
+    conn.execute("DELETE FROM changements WHERE version <= (SELECT MAX(version) FROM changements) - ?",
+                 (TAILLE_FLUX_DEMANDES,))
+
+
+def _inserer(conn: sqlite3.Connection, lignes: List[tuple]):
+    conn.executemany(_INSERTION, lignes)
+    _noter_changements(conn, CHANGEMENT_DEMANDE, [(l[0], l[1], l[2], l[12]) for l in lignes])
+
+
+def _supprimer(conn: sqlite3.Connection, colonne: str, valeurs: Iterable[str]):
+    """Retire des demandes de l'index (par chemin_json ou chemin_dossier) et note leur suppression"""
+    for valeur in valeurs:
+        lignes = conn.execute(
+            f"SELECT chemin_json, ref_demande, type_credit, chemin_dossier FROM demandes WHERE {colonne} = ?", (valeur,)
+        ).fetchall()
+        if lignes:
+            conn.execute(f"DELETE FROM demandes WHERE {colonne} = ?", (valeur,))
+            _noter_changements(conn, CHANGEMENT_SUPPRESSION, [tuple(ligne) for ligne in lignes])
+
+
+def synchroniser_demande(demande: Dict, type_credit: str, chemin_dossier: str) -> bool:
+    """
+    Met a jour l'index apres l'ecriture de {ref}_data.json par l'application
+
+    Args:
+        demande (Dict): Donnees ecrites
+        type_credit (str): Type de credit
+        chemin_dossier (str): Dossier de la demande
+
+    Returns:
+        bool: True si l'index est a jour (sinon la prochaine reconciliation le rattrape)
+    """
+    chemin_json = os.path.join(chemin_dossier, f"{demande.get('ref_demande', 'demande')}_data.json")
+    try:
+        signature = signature_demande(chemin_json)
+        demande = completer_demande(dict(demande), type_credit, chemin_dossier)
+        with _base() as conn:
+            _inserer(conn, [_ligne(demande, chemin_json, signature)])
+        return True
+    except (OSError, sqlite3.Error):
+        return False
+
+
+def supprimer_demande(chemin_dossier: str):
+    """Retire de l'index les demandes d'un dossier"""
+    with _base() as conn:
+        _supprimer(conn, "chemin_dossier", [chemin_dossier])
+
+
+def reconcilier_index(racine: str = DOSSIER_DEMANDES) -> Dict:
+    """
+    Aligne l'index sur les dossiers (modifications faites hors de l'application)
+
+    Chaque demande ({ref}_data.json et son journal) est comparee a l'index par (mtime_ns, taille) :
+    seuls les fichiers nouveaux ou modifies sont relus, les demandes dont le
+    fichier a disparu sont retirees. Les stat et les relectures sont faits
+    en parallele par scanner_dossiers.
+
+    Returns:
+        Dict: Compteurs (nb_demandes, nb_relues, nb_supprimees) et duree_ms
+    """
+    global _derniere_reconciliation
+
+    _derniere_reconciliation = time.monotonic()
+    debut = time.perf_counter()
+    with _base() as conn:
+        connus = {ligne["chemin_json"]: (ligne["mtime_ns"], ligne["taille"])
+                  for ligne in conn.execute("SELECT chemin_json, mtime_ns, taille FROM demandes")}
+
+    def a_relire(chemin_json, signature):
+        return connus.get(chemin_json) != (signature[1], signature[0])
+
+    vus = set()
+    a_inserer = []
+    for dossier in scanner_dossiers(racine, lire_si=a_relire)["dossiers"]:
+        chemin_json, signature = dossier["chemin_json"], dossier["signature"]
+        if signature is None:
+            continue
+        if not a_relire(chemin_json, signature):
+            vus.add(chemin_json)
+        elif dossier["donnees"] is not None:
+            demande = completer_demande(dossier["donnees"], dossier["type_credit"], dossier["chemin_dossier"])
+            a_inserer.append(_ligne(demande, chemin_json, signature))
+            vus.add(chemin_json)
+
+    disparus = connus.keys() - vus
+    if a_inserer or disparus:
+        with _base() as conn:
+            _inserer(conn, a_inserer)
+            _supprimer(conn, "chemin_json", disparus)
+
+    return {
+        "nb_demandes": len(vus),
+        "nb_relues": len(a_inserer),
+        "nb_supprimees": len(disparus),
+        "duree_ms": round((time.perf_counter() - debut) * 1000, 1)
+    }
+
+
+def appliquer_modifications(modifiees: Iterable[Tuple[Dict, str, os.stat_result]], supprimees: Iterable[str]):
+    """
+    Reporte dans l'index des changements deja detectes (cache des demandes)
+
+    Args:
+        modifiees: (demande completee, chemin du _data.json, signature (taille, mtime_ns))
+        supprimees: Chemins des _data.json disparus
+    """
+    lignes = [_ligne(demande, chemin_json, signature) for demande, chemin_json, signature in modifiees]
+    disparus = list(supprimees)
+    if lignes or disparus:
+        with _base() as conn:
+            _inserer(conn, lignes)
+            _supprimer(conn, "chemin_json", disparus)
+
+
+def lignes_index() -> Iterator[Tuple[str, str, str, Tuple[int, int], Dict]]:
+    """
+    Contenu complet de l'index, pour amorcer un cache sans relire les fichiers
+
+    Yields:
+        Tuple: (type de credit, chemin du dossier, chemin du _data.json, (taille, mtime_ns), demande)
+    """
+    with _base() as conn:
+        lignes = conn.execute(
+            "SELECT type_credit, chemin_dossier, chemin_json, taille, mtime_ns, donnees FROM demandes"
+        ).fetchall()
+    for ligne in lignes:
+        demande = completer_demande(json.loads(ligne["donnees"]), ligne["type_credit"], ligne["chemin_dossier"])
+        yield (ligne["type_credit"], ligne["chemin_dossier"], ligne["chemin_json"],
+               (ligne["taille"], ligne["mtime_ns"]), demande)
+
+
+def extraire_lignes(type_credit: str = None, motif_reference: str = None) -> List[sqlite3.Row]:
+    """
+    Lignes brutes de l'index (colonnes indexees et JSON non decode)
+
+    Args:
+        type_credit (str): Type de credit (tous par defaut)
+        motif_reference (str): Motif GLOB sur la reference (ex. "*-2506[0-9][0-9]-*")
+
+    Returns:
+        List[sqlite3.Row]: ref_demande, type_credit, statut, nom, email, montant,
+                           date_demande, date_mise_a_jour, conseiller, chemin_dossier, donnees
+    """
+    requete = ("SELECT ref_demande, type_credit, statut, nom, email, montant, date_demande, date_mise_a_jour, "
+               "conseiller, chemin_dossier, donnees FROM demandes WHERE 1 = 1")
+    parametres = []
+    if type_credit:
+        requete += " AND type_credit = ?"
+        parametres.append(type_credit)
+    if motif_reference:
+        requete += " AND ref_demande GLOB ?"
+        parametres.append(motif_reference)
+    with _base() as conn:
+        return conn.execute(requete + " ORDER BY chemin_dossier", parametres).fetchall()
+
+
+def _chemin_indexe(ref_demande: str, type_credit: str = None) -> Optional[str]:
+    requete = "SELECT chemin_dossier FROM demandes WHERE ref_demande = ?"
+    parametres = [ref_demande]
+    if type_credit:
+        requete += " AND type_credit = ?"
+        parametres.append(type_credit)
+    with _base() as conn:
+        ligne = conn.execute(requete + " ORDER BY chemin_dossier LIMIT 1", parametres).fetchone()
+    if ligne and os.path.isdir(ligne["chemin_dossier"]):
+        return ligne["chemin_dossier"]
+    return None
+
+
+def trouver_chemin_dossier(ref_demande: str, type_credit: str = None) -> Optional[str]:
+    """
+    Dossier d'une demande, par correspondance exacte sur sa reference
+
+    Une seule descente d'index, quel que soit le nombre de dossiers. Si la
+    reference est absente (dossier cree ou deplace hors de l'application),
+    l'index est reconcilie une fois puis interroge de nouveau.
+
+    Args:
+        ref_demande (str): Reference exacte de la demande
+        type_credit (str): Type de credit, pour restreindre la recherche
+
+    Returns:
+        Optional[str]: Chemin du dossier, None si la reference est inconnue
+    """
+    if not ref_demande:
+        return None
+    chemin = _chemin_indexe(ref_demande, type_credit)
+    if chemin is None and time.monotonic() - _derniere_reconciliation >= DELAI_MIN_RECONCILIATION_S:
+        reconcilier_index()
+        chemin = _chemin_indexe(ref_demande, type_credit)
+    return chemin
+
+
+def rechercher_demandes(**filtres) -> List[Dict]:
+    """
+    Demandes de l'index, filtrees par egalite sur les colonnes indexees
+
+    Args:
+        **filtres: Valeurs attendues (type_credit="auto", statut="En attente"...),
+                   une liste ou un tuple pour plusieurs valeurs acceptees
+
+    Returns:
+        List[Dict]: Demandes completes, comme lues depuis les dossiers
+
+    Raises:
+        ValueError: Filtre sur une colonne non indexee
+    """
+    conditions, parametres = [], []
+    for colonne, valeur in filtres.items():
+        if colonne not in FILTRES_DEMANDES:
+            raise ValueError(f"Filtre non indexe: {colonne}")
+        if valeur is None:
+            continue
+        if isinstance(valeur, (list, tuple, set)):
+            valeurs = list(valeur)
+            conditions.append(f"{colonne} IN ({', '.join('?' * len(valeurs))})")
+            parametres.extend(valeurs)
+        else:
+            conditions.append(f"{colonne} = ?")
+            parametres.append(valeur)
+
+    requete = "SELECT type_credit, chemin_dossier, donnees FROM demandes"
+    if conditions:
+        requete += " WHERE " + " AND ".join(conditions)
+    requete += " ORDER BY type_credit, chemin_dossier"
+
+    with _base() as conn:
+        lignes = conn.execute(requete, parametres).fetchall()
+    return [completer_demande(json.loads(ligne["donnees"]), ligne["type_credit"], ligne["chemin_dossier"])
+            for ligne in lignes]
+
+
+def _criteres(type_credit=None, statut=None, depuis: date = None, jusqua: date = None,
+              montant_min: float = None, montant_max: float = None, texte: str = None) -> Tuple[str, list]:
+    """Clause WHERE et parametres communs a interroger_demandes et statistiques_demandes"""
+    conditions, parametres = [], []
+    for colonne, valeur in (("type_credit", type_credit), ("statut", statut)):
+        if valeur is None:
+            continue
+        if isinstance(valeur, (list, tuple, set)):
+            valeurs = list(valeur)
+            conditions.append(f"{colonne} IN ({', '.join('?' * len(valeurs))})")
+            parametres.extend(valeurs)
+        else:
+            conditions.append(f"{colonne} = ?")
+            parametres.append(valeur)
+
+    for condition, valeur in (("date_demande >= ?", depuis.isoformat() if depuis else None),
+                              ("date_demande <= ?", jusqua.isoformat() if jusqua else None),
+                              ("montant >= ?", montant_min), ("montant <= ?", montant_max)):
+        if valeur is not None:
+            conditions.append(condition)
+            parametres.append(valeur)
+
+    recherche = normaliser_texte(texte)
+    if recherche:
+        conditions.append("instr(recherche, ?) > 0")
+        parametres.append(recherche)
+
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", parametres
+
+
+def interroger_demandes(type_credit=None, statut=None, depuis: date = None, jusqua: date = None,
+                        montant_min: float = None, montant_max: float = None, texte: str = None,
+                        tri: str = "date_desc", page: int = 1, par_page: int = PAR_PAGE_DEMANDES,
+                        champs: List[str] = None) -> Dict:
+    """
+    Page de demandes filtree et triee par l'index
+
+    Seules les lignes de la page sont lues et decodees : le cout d'une page
+    ne depend pas du nombre total de demandes.
+
+    Args:
+        type_credit, statut: Valeur ou liste de valeurs acceptees
+        depuis / jusqua: Bornes incluses sur la date de la demande
+        montant_min / montant_max: Bornes incluses sur le montant
+        texte: Recherche libre (nom, prenom, email, telephone, reference),
+               insensible a la casse et aux accents
+        tri: Cle de TRIS_DEMANDES
+        page: Numero de page (a partir de 1, ramene a la derniere page si trop grand)
+        par_page: Demandes par page
+        champs: Champs a renvoyer (demande complete si None)
+
+    Returns:
+        Dict: {"demandes", "total", "page", "nb_pages", "par_page"}
+
+    Raises:
+        ValueError: Tri ou nom de champ inconnu
+    """
+    if tri not in TRIS_DEMANDES:
+        raise ValueError(f"Tri inconnu: {tri}")
+    clause, parametres = _criteres(type_credit, statut, depuis, jusqua, montant_min, montant_max, texte)
+    par_page = max(1, int(par_page))
+
+    if champs is None:
+        selection = "type_credit, chemin_dossier, donnees"
+    elif not all(MOTIF_CHAMP.match(champ) for champ in champs):
+        raise ValueError(f"Champ invalide: {champs}")
+    else:
+        # Colonnes indexees lues directement, autres champs extraits du JSON
+        selection = "type_credit, chemin_dossier, " + ", ".join(
+            f'"{champ}"' if champ in COLONNES_DEMANDES else f"json_extract(donnees, '$.\"{champ}\"') AS \"{champ}\""
+            for champ in champs if champ not in ("type_credit", "chemin_dossier")
+        )
+
+    with _base() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM demandes{clause}", parametres).fetchone()[0]
+        nb_pages = max(1, math.ceil(total / par_page))
+        page = min(max(1, int(page)), nb_pages)
+        lignes = conn.execute(
+            f"SELECT {selection} FROM demandes{clause} ORDER BY {TRIS_DEMANDES[tri]} LIMIT ? OFFSET ?",
+            parametres + [par_page, (page - 1) * par_page]
+        ).fetchall()
+
+    if champs is None:
+        demandes = [completer_demande(json.loads(ligne["donnees"]), ligne["type_credit"], ligne["chemin_dossier"])
+                    for ligne in lignes]
+    else:
+        demandes = [dict(ligne) for ligne in lignes]
+
+    return {"demandes": demandes, "total": total, "page": page, "nb_pages": nb_pages, "par_page": par_page}
+
+
+def statistiques_demandes(**criteres) -> Dict:
+    """
+    Indicateurs des demandes correspondant aux criteres (memes criteres que interroger_demandes)
+
+    Returns:
+        Dict: total, en_attente, montant_total, montant_moyen
+    """
+    clause, parametres = _criteres(**criteres)
+    with _base() as conn:
+        ligne = conn.execute(
+            "SELECT COUNT(*) AS total, COALESCE(SUM(statut = 'En attente'), 0) AS en_attente, "
+            f"COALESCE(SUM(montant), 0) AS montant_total FROM demandes{clause}",
+            parametres
+        ).fetchone()
+    total = ligne["total"]
+    return {
+        "total": total,
+        "en_attente": ligne["en_attente"],
+        "montant_total": ligne["montant_total"],
+        "montant_moyen": ligne["montant_total"] / total if total else 0
+    }
+
+
+###################
+# FLUX DES CHANGEMENTS
+###################
+
+def signaler_changement_ocr(chemin_dossier: str, statut: str):
+    """Note dans le flux un changement de statut du traitement OCR d'un dossier"""
+    with _base() as conn:
+        _noter_changements(conn, CHANGEMENT_OCR,
+                           [(None, reference_dossier(chemin_dossier), type_credit_dossier(chemin_dossier), chemin_dossier)],
+                           detail=statut)
+
+
+def version_demandes() -> Tuple[str, int]:
+    """
+    Position courante du flux : (epoque, version)
+
+    La version (0 si le flux est vide) augmente a chaque changement ; l'epoque
+    change quand les versions sont remises a zero (index recree ou vide).
+    """
+    with _base() as conn:
+        return _epoque(conn), conn.execute("SELECT COALESCE(MAX(version), 0) FROM changements").fetchone()[0]
+
+
+def changements_depuis(version: int, epoque: Optional[str]) -> Dict:
+    """
+    Changements intervenus apres une version du flux
+
+    Seuls les TAILLE_FLUX_DEMANDES derniers changements sont conserves : si
+    des changements posterieurs a version ont ete oublies, ou si l'appelant
+    tient une autre epoque (index recree ou vide depuis), "complet" vaut
+    False et l'appelant doit tout recharger.
+
+    Args:
+        version (int): Derniere version connue de l'appelant
+        epoque (str): Epoque de cette version (version_demandes), None au depart
+
+    Returns:
+        Dict: "epoque" et "version" (courantes), "complet", "changements" (version,
+              nature, chemin_json, ref_demande, type_credit, chemin_dossier, detail, date)
+    """
+    with _base() as conn:
+        courante_epoque = _epoque(conn)
+        minimum, maximum = conn.execute("SELECT MIN(version), MAX(version) FROM changements").fetchone()
+        courante = maximum or 0
+        complet = (epoque == courante_epoque and version <= courante
+                   and (minimum is None or version >= minimum - 1))
+        lignes = []
+        if complet and version < courante:
+            lignes = conn.execute("SELECT * FROM changements WHERE version > ? ORDER BY version", (version,)).fetchall()
+    return {"epoque": courante_epoque, "version": courante, "complet": complet,
+            "changements": [dict(ligne) for ligne in lignes]}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index SQLite des demandes")
+    parser.add_argument("--reconcilier", action="store_true", help="Resynchroniser l'index avec data/demandes_clients")
+    parser.add_argument("--reconstruire", action="store_true", help="Vider puis reconstruire l'index")
+    parser.add_argument("--statut", help="Lister les demandes d'un statut")
+    parser.add_argument("--changements", type=int, metavar="VERSION", help="Afficher le flux apres une version")
+    parser.add_argument("--epoque", help="Epoque de la version passee a --changements (defaut : epoque courante)")
+    args = parser.parse_args()
+
+    if args.reconstruire:
+        with _base() as conn:
+            conn.execute("DELETE FROM demandes")
+            conn.execute("DELETE FROM changements")
+            _nouvelle_epoque(conn)  # Les sessions ouvertes et l'instantane rechargent tout
+    if args.reconcilier or args.reconstruire:
+        resultat = reconcilier_index()
+        print(f"{resultat['nb_demandes']} demande(s), {resultat['nb_relues']} relue(s), "
+              f"{resultat['nb_supprimees']} supprimee(s) en {resultat['duree_ms']} ms")
+    if args.statut:
+        for demande in rechercher_demandes(statut=args.statut):
+            print(f"{demande.get('ref_demande')}  {demande.get('nom', '')}  ({demande['type_credit']})")
+    if args.changements is not None:
+        flux = changements_depuis(args.changements, args.epoque or version_demandes()[0])
+        for changement in flux["changements"]:
+            print(f"{changement['version']:>8}  {changement['date']}  {changement['nature']:<11} "
+                  f"{changement['ref_demande']}  {changement['detail'] or ''}")
+        print(f"Epoque {flux['epoque']}, version {flux['version']}"
+              + ("" if flux["complet"] else " (changements oublies : tout recharger)"))
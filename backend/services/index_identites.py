@@ -0,0 +1,266 @@
+"""
+backend/services/index_identites.py - Index inverse des identifiants clients entre dossiers (doublons, fraude)
+"""
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from backend.config import FICHIER_INDEX_IDENTITES
+from backend.services.normalisation import normaliser_texte, normaliser_numero
+from backend.services.similarite import sont_similaires
+
+# Identifiants indexes
+CLES_IDENTITE = ["cin", "rib", "telephone", "email", "employeur"]
+
+# Identifiants qui designent une seule personne (l'employeur est partage par nature)
+CLES_PERSONNELLES = ["cin", "rib", "telephone", "email"]
+
+# Identifiants saisis dans les formulaires ; CIN et RIB ne viennent que des documents (OCR)
+CLES_FORMULAIRE = ["telephone", "email", "employeur"]
+
+# Marqueurs poses par l'extraction OCR a la place d'une valeur fiable (voir le prompt d'extraction)
+MARQUEURS_OCR = ("ILLISIBLE", "PARTIEL", "INCERTAIN")
+
+# Nombre minimal de chiffres d'un identifiant numerique (RIB marocain : 24 chiffres)
+MIN_CHIFFRES = {"rib": 16, "telephone": 9}
+
+_MOTIF_NON_CHIFFRES = re.compile(r'\D')
+_MOTIF_CIN = re.compile(r'^[A-Z]{1,2}\d{5,6}$')
+_MOTIF_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def normaliser_identifiant(cle: str, valeur) -> Optional[str]:
+    """
+    Forme canonique d'un identifiant pour l'index
+
+    Les marqueurs de l'OCR (ILLISIBLE, PARTIEL, INCERTAIN) et les valeurs mal
+    formees (CIN hors format, email sans "@", numero trop court) sont ecartes :
+    indexes, ils feraient se ressembler des dossiers sans rapport.
+
+    Args:
+        cle (str): Type d'identifiant (cin, rib, telephone, email, employeur)
+        valeur: Valeur brute
+
+    Returns:
+        Optional[str]: Valeur normalisee ou None si inexploitable
+    """
+    if valeur in (None, ""):
+        return None
+    valeur = str(valeur).strip()
+    if any(marqueur in valeur.upper() for marqueur in MARQUEURS_OCR):
+        return None
+
+    if cle == "cin":
+        valeur = normaliser_numero(valeur).upper()
+        if not _MOTIF_CIN.match(valeur):
+            return None
+    elif cle == "rib":
+        valeur = _MOTIF_NON_CHIFFRES.sub('', valeur)
+    elif cle == "telephone":
+        valeur = _MOTIF_NON_CHIFFRES.sub('', valeur)
+        # +212 6... / 00212 6... -> 06...
+        for prefixe in ("00212", "212"):
+            if valeur.startswith(prefixe) and len(valeur) == len(prefixe) + 9:
+                valeur = "0" + valeur[len(prefixe):]
+                break
+    elif cle == "email":
+        valeur = valeur.lower()
+        if not _MOTIF_EMAIL.match(valeur):
+            return None
+    elif cle == "employeur":
+        valeur = normaliser_texte(valeur)
+
+    if len(valeur) < MIN_CHIFFRES.get(cle, 1):
+        return None
+    return valeur
+
+
+@contextmanager
+def _base():
+    """Connexion courte sur l'index, validee puis fermee en sortie"""
+    os.makedirs(os.path.dirname(FICHIER_INDEX_IDENTITES), exist_ok=True)
+    conn = sqlite3.connect(FICHIER_INDEX_IDENTITES, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Cle primaire (cle, valeur, ref) : une recherche par identifiant est
+        # une seule descente d'index, quelle que soit la taille de la base
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS identites (
+                cle TEXT NOT NULL,
+                valeur TEXT NOT NULL,
+                ref_demande TEXT NOT NULL,
+                nom TEXT,
+                type_credit TEXT,
+                source TEXT,
+                date_maj TEXT,
+                PRIMARY KEY (cle, valeur, ref_demande)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_identites_ref ON identites (ref_demande)")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def indexer_identites(ref_demande: str, identites: Dict[str, Iterable], nom: str = None,
+                      type_credit: str = None, source: str = "formulaire") -> int:
+    """
+    Remplace les identifiants d'une demande venant d'une source dans l'index
+
+    Les lignes precedentes de la meme source sont retirees dans la meme
+    transaction : un identifiant mal lu puis corrige par un nouveau passage
+    OCR ne continue pas de signaler d'autres dossiers.
+
+    Args:
+        ref_demande (str): Reference de la demande
+        identites (Dict[str, Iterable]): Valeur(s) par type d'identifiant
+        nom (str): Nom du client
+        type_credit (str): Type de credit
+        source (str): Origine des valeurs (formulaire, ocr)
+
+    Returns:
+        int: Nombre d'identifiants indexes
+    """
+    maintenant = datetime.now().isoformat()
+    lignes = []
+    for cle, valeurs in identites.items():
+        if cle not in CLES_IDENTITE:
+            continue
+        if isinstance(valeurs, (str, int)) or valeurs is None:
+            valeurs = [valeurs]
+        for valeur in {normaliser_identifiant(cle, v) for v in valeurs} - {None}:
+            lignes.append((cle, valeur, ref_demande, nom, type_credit, source, maintenant))
+
+    with _base() as conn:
+        conn.execute("DELETE FROM identites WHERE ref_demande = ? AND source = ?", (ref_demande, source))
+        if lignes:
+            conn.executemany(
+                "INSERT OR REPLACE INTO identites (cle, valeur, ref_demande, nom, type_credit, source, date_maj) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                lignes
+            )
+    return len(lignes)
+
+
+def indexer_demande(demande: Dict, type_credit: str = None) -> int:
+    """
+    Indexe les identifiants saisis dans le formulaire d'une demande
+
+    Le formulaire ne collecte ni CIN ni RIB : ils sont indexes depuis les
+    documents par l'analyse OCR (source "ocr").
+
+    Args:
+        demande (Dict): Donnees de la demande (contenu de {ref}_data.json)
+        type_credit (str): Type de credit, si absent des donnees
+
+    Returns:
+        int: Nombre d'identifiants indexes
+    """
+    ref_demande = demande.get("ref_demande")
+    if not ref_demande:
+        return 0
+    identites = {cle: demande.get(cle) for cle in CLES_FORMULAIRE}
+    try:
+        return indexer_identites(ref_demande, identites, demande.get("nom"),
+                                 type_credit or demande.get("type_credit"), source="formulaire")
+    except sqlite3.Error:
+        # L'index est reconstructible : ne jamais bloquer la soumission d'une demande
+        return 0
+
+
+def rechercher_dossiers(cle: str, valeur, exclure_ref: str = None) -> List[Dict]:
+    """
+    Demandes dans lesquelles apparait un identifiant
+
+    Args:
+        cle (str): Type d'identifiant
+        valeur: Valeur brute (normalisee avant la recherche)
+        exclure_ref (str): Reference a ignorer (demande en cours d'analyse)
+
+    Returns:
+        List[Dict]: Lignes de l'index (ref_demande, nom, type_credit, source)
+    """
+    valeur = normaliser_identifiant(cle, valeur)
+    if valeur is None:
+        return []
+
+    with _base() as conn:
+        lignes = conn.execute(
+            "SELECT ref_demande, nom, type_credit, source FROM identites "
+            "WHERE cle = ? AND valeur = ? AND ref_demande != ?",
+            (cle, valeur, exclure_ref or "")
+        ).fetchall()
+    return [dict(ligne) for ligne in lignes]
+
+
+def detecter_identites_partagees(ref_demande: str, identites: Dict[str, Iterable], nom: str = None) -> List[str]:
+    """
+    Signale les identifiants personnels deja presents dans d'autres demandes
+    sous un autre nom (meme CIN, RIB, telephone ou email)
+
+    Returns:
+        List[str]: Alertes lisibles, une par identifiant partage
+    """
+    nom_norm = normaliser_texte(nom) if nom else None
+    alertes = []
+
+    for cle in CLES_PERSONNELLES:
+        valeurs = identites.get(cle)
+        if isinstance(valeurs, (str, int)) or valeurs is None:
+            valeurs = [valeurs]
+
+        for valeur in {v for v in valeurs if v}:
+            autres = rechercher_dossiers(cle, valeur, exclure_ref=ref_demande)
+            if nom_norm:
+                autres = [a for a in autres if not sont_similaires(normaliser_texte(a["nom"]), nom_norm, "nom")]
+            if autres:
+                refs = ', '.join(sorted({f"{a['ref_demande']} ({a['nom'] or '?'})" for a in autres}))
+                precision = " sous un autre nom" if nom_norm else ""
+                alertes.append(f"{cle.upper()} {valeur} deja present dans d'autres demandes{precision}: {refs}")
+
+    return alertes
+
+
+def supprimer_demande(ref_demande: str):
+    """Retire une demande de l'index"""
+    with _base() as conn:
+        conn.execute("DELETE FROM identites WHERE ref_demande = ?", (ref_demande,))
+
+
+def reconstruire_index() -> int:
+    """
+    Reconstruit l'index depuis les fichiers *_data.json de toutes les demandes
+
+    Returns:
+        int: Nombre de demandes indexees
+    """
+    # Import differe : backend.utils charge streamlit
+    from backend.utils import charger_toutes_demandes
+
+    demandes = charger_toutes_demandes()
+    with _base() as conn:
+        conn.execute("DELETE FROM identites WHERE source = 'formulaire'")
+
+    for demande in demandes:
+        indexer_demande(demande)
+    return len(demandes)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index des identifiants clients")
+    parser.add_argument("--reconstruire", action="store_true", help="Reconstruire l'index depuis data/demandes_clients")
+    parser.add_argument("--chercher", nargs=2, metavar=("CLE", "VALEUR"), help="Rechercher un identifiant (ex: telephone 0612345678)")
+    args = parser.parse_args()
+
+    if args.reconstruire:
+        print(f"{reconstruire_index()} demande(s) indexee(s) dans {FICHIER_INDEX_IDENTITES}")
+    if args.chercher:
+        for ligne in rechercher_dossiers(*args.chercher):
+            print(f"{ligne['ref_demande']}  {ligne['nom']}  ({ligne['type_credit']}, {ligne['source']})")
@@ -0,0 +1,381 @@
+"""
+backend/services/instantane_demandes.py - Instantane en colonnes des demandes (Arrow IPC) pour les pages d'analyse
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.config import DOSSIER_INSTANTANE_DEMANDES, INTERVALLE_INSTANTANE_DEMANDES_S, SHARD_SANS_DATE
+from backend.services.chemins_dossiers import shard_reference
+from backend.services.dates import parser_date
+from backend.services.index_demandes import (
+    changements_depuis,
+    extraire_lignes,
+    version_demandes,
+    CHANGEMENT_DEMANDE,
+    CHANGEMENT_SUPPRESSION
+)
+from backend.services.journal_demandes import ecrire_json_atomique, verrouiller_fichier, deverrouiller_fichier
+
+# Dependance optionnelle : sans pyarrow, le tableau est construit en memoire depuis l'index a chaque version
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    pa = None
+    PYARROW_DISPONIBLE = False
+
+# Version du format : un instantane d'une autre version est reconstruit
+VERSION_INSTANTANE = 1
+
+FICHIER_MANIFESTE = "manifeste.json"
+FICHIER_VERROU = ".verrou"
+
+# Colonnes de l'instantane, dans l'ordre
+COLONNES_TEXTE = ["chemin_dossier", "ref_demande", "type_credit", "statut", "nom", "email", "telephone",
+                  "adresse", "profession", "conseiller"]
+COLONNES_REELS = ["montant", "revenu", "taux"]
+COLONNES_ENTIERS = ["duree"]
+COLONNES_DATES = ["date_demande", "date_mise_a_jour"]
+
+# Champs de {ref}_data.json absents des colonnes de l'index
+CHAMPS_DONNEES = {"telephone": "telephone", "adresse": "adresse", "profession": "profession",
+                  "revenu": "revenu_mensuel_form", "duree": "duree", "taux": "taux_estim"}
+
+if PYARROW_DISPONIBLE:
+    SCHEMA_INSTANTANE = pa.schema(
+        [(nom, pa.string()) for nom in COLONNES_TEXTE]
+        + [(nom, pa.float64()) for nom in COLONNES_REELS]
+        + [(nom, pa.int32()) for nom in COLONNES_ENTIERS]
+        + [(nom, pa.date32()) for nom in COLONNES_DATES]
+    )
+
+_verrou_processus = threading.Lock()
+_verrou_lecture = threading.Lock()
+
+# Partitions deja projetees en memoire (nom de fichier unique par ecriture) et dernier tableau rendu
+_partitions_ouvertes: Dict[str, "pa.Table"] = {}
+_dernier_tableau = {"version": None, "dataframe": None, "verifie": 0.0}
+
+
+###################
+# CONSTRUCTION DES COLONNES
+###################
+
+def _reel(valeur) -> Optional[float]:
+    try:
+        return float(valeur) if valeur not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _entier(valeur) -> Optional[int]:
+    reel = _reel(valeur)
+    return int(round(reel)) if reel is not None and abs(reel) < 2 ** 31 else None
+
+
+def _texte(valeur) -> Optional[str]:
+    return str(valeur) if valeur not in (None, "") else None
+
+
+def partition_demande(type_credit: str, ref_demande: Optional[str]) -> str:
+    """Partition d'une demande : <type>/<AAMM> (mois de la reference, comme son dossier)"""
+    return f"{type_credit}/{shard_reference(ref_demande)}"
+
+
+def colonnes_lignes(lignes: Iterable[sqlite3.Row]) -> Dict[str, list]:
+    """
+    Colonnes typees a partir des lignes brutes de l'index (extraire_lignes)
+
+    Seuls les champs absents des colonnes de l'index sont lus dans le JSON
+    de la demande.
+
+    Returns:
+        Dict[str, list]: Nom de colonne -> valeurs (None si absente ou illisible)
+    """
+    colonnes = {nom: [] for nom in COLONNES_TEXTE + COLONNES_REELS + COLONNES_ENTIERS + COLONNES_DATES}
+    for ligne in lignes:
+        try:
+            donnees = json.loads(ligne["donnees"])
+        except ValueError:
+            donnees = {}
+        for nom in ("chemin_dossier", "ref_demande", "type_credit", "nom", "email", "conseiller"):
+            colonnes[nom].append(_texte(ligne[nom]))
+        colonnes["statut"].append(ligne["statut"] or "En attente")
+        for nom in ("telephone", "adresse", "profession"):
+            colonnes[nom].append(_texte(donnees.get(CHAMPS_DONNEES[nom])))
+        colonnes["montant"].append(_reel(ligne["montant"]))
+        colonnes["revenu"].append(_reel(donnees.get(CHAMPS_DONNEES["revenu"])))
+        colonnes["taux"].append(_reel(donnees.get(CHAMPS_DONNEES["taux"])))
+        colonnes["duree"].append(_entier(donnees.get(CHAMPS_DONNEES["duree"])))
+        colonnes["date_demande"].append(parser_date(ligne["date_demande"]))
+        colonnes["date_mise_a_jour"].append(parser_date(ligne["date_mise_a_jour"]))
+    return colonnes
+
+
+def dataframe_colonnes(colonnes: Dict[str, list]) -> pd.DataFrame:
+    """DataFrame aux memes types que l'instantane, sans pyarrow"""
+    df = pd.DataFrame({nom: pd.Series(colonnes[nom], dtype="object") for nom in COLONNES_TEXTE})
+    for nom in COLONNES_REELS:
+        df[nom] = pd.Series(colonnes[nom], dtype="float64")
+    for nom in COLONNES_ENTIERS:
+        df[nom] = pd.Series(colonnes[nom], dtype="Int32")
+    for nom in COLONNES_DATES:
+        df[nom] = pd.to_datetime(pd.Series(colonnes[nom], dtype="object"))
+    return df
+
+
+###################
+# ECRITURE (INCREMENTALE)
+###################
+
+@contextmanager
+def _verrou_ecriture(racine: str):
+    """Un seul processus (et un seul thread) met l'instantane a jour a la fois"""
+    os.makedirs(racine, exist_ok=True)
+    with _verrou_processus, open(os.path.join(racine, FICHIER_VERROU), "a+b") as f:
+        verrouiller_fichier(f)
+        try:
+            yield
+        finally:
+            deverrouiller_fichier(f)
+
+
+def _lire_manifeste(racine: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(racine, FICHIER_MANIFESTE), "r", encoding="utf-8") as f:
+            manifeste = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifeste if manifeste.get("schema") == VERSION_INSTANTANE else None
+
+
+def _ecrire_partition(racine: str, partition: str, lignes: List[sqlite3.Row], version: int) -> str:
+    """
+    Ecrit une partition dans un nouveau fichier <type>/<AAMM>.<version>.<id>.arrow
+
+    Le fichier precedent n'est jamais reecrit : les lecteurs qui le projettent
+    en memoire le gardent intact, et il est supprime une fois le manifeste
+    remplace.
+
+    Returns:
+        str: Nom du fichier, relatif a la racine
+    """
+    nom_fichier = f"{partition}.{version}.{uuid.uuid4().hex[:8]}.arrow"
+    chemin = os.path.join(racine, nom_fichier)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    table = pa.Table.from_pydict(colonnes_lignes(lignes), schema=SCHEMA_INSTANTANE)
+    chemin_tmp = f"{chemin}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(chemin_tmp, "wb") as sortie, pa_ipc.new_file(sortie, SCHEMA_INSTANTANE) as ecrivain:
+            ecrivain.write_table(table)
+        os.replace(chemin_tmp, chemin)
+    finally:
+        if os.path.exists(chemin_tmp):
+            os.remove(chemin_tmp)
+    return nom_fichier
+
+
+def _lignes_partition(type_credit: str, shard: str) -> List[sqlite3.Row]:
+    """Demandes indexees d'une partition (le motif GLOB degrossit, shard_reference tranche)"""
+    motif = None if shard == SHARD_SANS_DATE else f"*-{shard}[0-9][0-9]-*"
+    return [ligne for ligne in extraire_lignes(type_credit, motif) if shard_reference(ligne["ref_demande"]) == shard]
+
+
+def _supprimer_fichiers_orphelins(racine: str, fichiers: Iterable[str]):
+    """Fichiers de partition qui ne figurent plus au manifeste (echecs ignores : fichier encore ouvert sous Windows)"""
+    gardes = {os.path.normpath(os.path.join(racine, nom)) for nom in fichiers}
+    for dossier, _, noms in os.walk(racine):
+        for nom in noms:
+            chemin = os.path.normpath(os.path.join(dossier, nom))
+            if nom.endswith(".arrow") and chemin not in gardes:
+                try:
+                    os.remove(chemin)
+                except OSError:
+                    pass
+
+
+def actualiser_instantane(racine: str = DOSSIER_INSTANTANE_DEMANDES, reconstruire: bool = False) -> Dict:
+    """
+    Met l'instantane a jour depuis l'index des demandes
+
+    Seules les partitions touchees par le flux des changements depuis la
+    version de l'instantane sont reecrites. L'instantane est reconstruit en
+    entier s'il n'existe pas, si son format a change ou si le flux ne couvre
+    plus sa version.
+
+    Args:
+        racine (str): Dossier de l'instantane
+        reconstruire (bool): Tout reecrire
+
+    Returns:
+        Dict: "epoque" et "version" du flux, "complete" (reconstruction),
+              "partitions_reecrites", "lignes_ecrites", "duree_ms"
+
+    Raises:
+        RuntimeError: pyarrow n'est pas installe
+    """
+    if not PYARROW_DISPONIBLE:
+        raise RuntimeError("pyarrow est requis pour l'instantane des demandes")
+    debut = time.perf_counter()
+
+    with _verrou_ecriture(racine):
+        manifeste = None if reconstruire else _lire_manifeste(racine)
+        flux = changements_depuis(manifeste["version"], manifeste.get("epoque")) if manifeste else None
+        complete = flux is None or not flux["complet"]
+
+        # La version est lue avant les lignes : un changement concurrent est
+        # deja dans les lignes lues ou sera rejoue a la mise a jour suivante
+        if complete:
+            epoque, version = version_demandes()
+            par_partition = {}
+            for ligne in extraire_lignes():
+                par_partition.setdefault(partition_demande(ligne["type_credit"], ligne["ref_demande"]), []).append(ligne)
+            fichiers = {}
+        else:
+            epoque, version = flux["epoque"], flux["version"]
+            touchees = {partition_demande(c["type_credit"], c["ref_demande"]) for c in flux["changements"]
+                        if c["nature"] in (CHANGEMENT_DEMANDE, CHANGEMENT_SUPPRESSION) and c["type_credit"]}
+            par_partition = {partition: _lignes_partition(*partition.split("/", 1)) for partition in touchees}
+            fichiers = dict(manifeste["partitions"])
+            if not par_partition and version == manifeste["version"]:
+                return {"epoque": epoque, "version": version, "complete": False, "partitions_reecrites": 0,
+                        "lignes_ecrites": 0, "duree_ms": round((time.perf_counter() - debut) * 1000, 1)}
+
+        for partition, lignes in sorted(par_partition.items()):
+            if lignes:
+                fichiers[partition] = _ecrire_partition(racine, partition, lignes, version)
+            else:
+                fichiers.pop(partition, None)  # Plus aucune demande dans la partition
+
+        ecrire_json_atomique(os.path.join(racine, FICHIER_MANIFESTE),
+                             {"schema": VERSION_INSTANTANE, "epoque": epoque, "version": version,
+                              "partitions": fichiers})
+        _supprimer_fichiers_orphelins(racine, fichiers.values())
+
+    return {
+        "epoque": epoque,
+        "version": version,
+        "complete": complete,
+        "partitions_reecrites": len(par_partition),
+        "lignes_ecrites": sum(len(lignes) for lignes in par_partition.values()),
+        "duree_ms": round((time.perf_counter() - debut) * 1000, 1)
+    }
+
+
+###################
+# LECTURE
+###################
+
+def _ouvrir_partition(chemin: str) -> "pa.Table":
+    """Partition projetee en memoire (mmap) : les colonnes pointent dans le fichier, sans copie"""
+    table = _partitions_ouvertes.get(chemin)
+    if table is None:
+        source = pa.memory_map(chemin, "r")
+        table = pa_ipc.open_file(source).read_all()
+        source.close()  # Les tampons de la table gardent la projection
+        _partitions_ouvertes[chemin] = table
+    return table
+
+
+def charger_instantane(racine: str = DOSSIER_INSTANTANE_DEMANDES
+                       ) -> Tuple[Optional[Tuple[str, int]], Optional["pa.Table"]]:
+    """
+    Table Arrow de toutes les demandes, lue sans copie depuis les partitions
+
+    Les partitions inchangees depuis l'appel precedent sont reprises telles
+    quelles ; seules les partitions reecrites sont projetees a nouveau.
+
+    Returns:
+        Tuple: ((epoque, version) du flux, table), (None, None) si l'instantane n'existe pas
+    """
+    for _ in range(2):  # Un fichier peut etre remplace entre la lecture du manifeste et son ouverture
+        manifeste = _lire_manifeste(racine)
+        if manifeste is None:
+            return None, None
+        chemins = [os.path.join(racine, nom) for _, nom in sorted(manifeste["partitions"].items())]
+        try:
+            tables = [_ouvrir_partition(chemin) for chemin in chemins]
+        except (OSError, pa.ArrowException):
+            continue
+        for chemin in set(_partitions_ouvertes) - set(chemins):
+            del _partitions_ouvertes[chemin]
+        table = pa.concat_tables(tables) if tables else SCHEMA_INSTANTANE.empty_table()
+        return (manifeste.get("epoque"), manifeste["version"]), table
+    return None, None
+
+
+def tableau_demandes(racine: str = DOSSIER_INSTANTANE_DEMANDES,
+                     intervalle: float = INTERVALLE_INSTANTANE_DEMANDES_S) -> pd.DataFrame:
+    """
+    Toutes les demandes en colonnes typees, pour les pages d'analyse
+
+    Colonnes : chemin_dossier, ref_demande, type_credit, statut, nom, email,
+    telephone, adresse, profession, conseiller (texte) ; montant, revenu,
+    taux (reels) ; duree (mois) ; date_demande, date_mise_a_jour (dates).
+
+    L'instantane est mis a jour au plus toutes les `intervalle` secondes, et
+    le DataFrame n'est reconstruit que si sa version a change : il est
+    partage par toutes les sessions du processus et ne doit pas etre modifie
+    en place. Sans pyarrow, il est construit directement depuis l'index.
+
+    Returns:
+        pd.DataFrame: Une ligne par demande, dans l'ordre des partitions
+    """
+    with _verrou_lecture:
+        if _dernier_tableau["dataframe"] is not None and time.monotonic() - _dernier_tableau["verifie"] < intervalle:
+            return _dernier_tableau["dataframe"]
+
+        version, df = None, None
+        try:
+            if PYARROW_DISPONIBLE:
+                actualiser_instantane(racine)
+                version, table = charger_instantane(racine)
+                if table is not None and version == _dernier_tableau["version"]:
+                    df = _dernier_tableau["dataframe"]
+                elif table is not None:
+                    df = table.to_pandas(date_as_object=False, types_mapper={pa.int32(): pd.Int32Dtype()}.get)
+            else:
+                version = version_demandes()
+                if version == _dernier_tableau["version"]:
+                    df = _dernier_tableau["dataframe"]
+                else:
+                    df = dataframe_colonnes(colonnes_lignes(extraire_lignes()))
+        except (OSError, sqlite3.Error):
+            df = None
+        if df is None:
+            if _dernier_tableau["dataframe"] is not None:
+                return _dernier_tableau["dataframe"]  # Dernier etat connu ; nouvel essai au prochain appel
+            version, df = None, dataframe_colonnes(colonnes_lignes([]))
+
+        _dernier_tableau.update(version=version, dataframe=df, verifie=time.monotonic())
+        return df
+
+
+if __name__ == "__main__":
+    # python -m backend.services.instantane_demandes [--reconstruire] [--boucle SECONDES]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Instantane en colonnes des demandes (Arrow IPC)")
+    parser.add_argument("--racine", default=DOSSIER_INSTANTANE_DEMANDES)
+    parser.add_argument("--reconstruire", action="store_true", help="Reecrire toutes les partitions")
+    parser.add_argument("--boucle", type=float, metavar="SECONDES", help="Mettre a jour periodiquement")
+    args = parser.parse_args()
+
+    while True:
+        resultat = actualiser_instantane(args.racine, args.reconstruire)
+        print(f"Version {resultat['version']} : {resultat['partitions_reecrites']} partition(s), "
+              f"{resultat['lignes_ecrites']} ligne(s) ecrite(s) en {resultat['duree_ms']} ms"
+              + (" (reconstruction)" if resultat["complete"] else ""))
+        if not args.boucle:
+            break
+        args.reconstruire = False
+        time.sleep(args.boucle)
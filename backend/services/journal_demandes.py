@@ -0,0 +1,272 @@
+"""
+backend/services/journal_demandes.py - Journal append-only des changements de statut des demandes
+"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from backend.config import SUFFIXE_JOURNAL_DEMANDE, TAILLE_COMPACTION_JOURNAL_KO, DELAI_GROUPE_FSYNC_MS
+
+# Verrou de fichier inter-processus : fcntl (Linux, macOS) ou msvcrt (Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+SUFFIXE_DONNEES = "_data.json"
+
+
+def chemin_journal(chemin_json: str) -> str:
+    """{ref}_data.json -> {ref}_journal.jsonl, dans le meme dossier"""
+    base = chemin_json[:-len(SUFFIXE_DONNEES)] if chemin_json.endswith(SUFFIXE_DONNEES) else chemin_json
+    return base + SUFFIXE_JOURNAL_DEMANDE
+
+
+def verrouiller_fichier(f):
+    """Verrou exclusif inter-processus sur un fichier ouvert (bloquant)"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def deverrouiller_fichier(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+###################
+# LECTURE
+###################
+
+def signature_demande(chemin_json: str, stat_donnees: os.stat_result = None) -> Tuple[int, int]:
+    """
+    Signature (taille, mtime_ns) d'une demande : fichier de donnees et journal reunis
+
+    Un ajout au journal comme une compaction changent la signature, ce qui
+    suffit aux caches et a l'index pour savoir quand relire la demande.
+
+    Raises:
+        OSError: Fichier de donnees absent
+    """
+    stat_donnees = stat_donnees or os.stat(chemin_json)
+    try:
+        stat_journal = os.stat(chemin_journal(chemin_json))
+    except OSError:
+        return (stat_donnees.st_size, stat_donnees.st_mtime_ns)
+    return (stat_donnees.st_size + stat_journal.st_size, max(stat_donnees.st_mtime_ns, stat_journal.st_mtime_ns))
+
+
+def appliquer_journal(demande: Dict, contenu: bytes) -> Dict:
+    """
+    Rejoue les entrees d'un journal sur une demande (dernier ecrit gagnant)
+
+    Une ligne incomplete (ecriture interrompue) est ignoree. Rejouer deux
+    fois une entree donne le meme resultat : une compaction interrompue
+    avant la remise a zero du journal ne fausse pas la vue.
+    """
+    for ligne in contenu.splitlines():
+        try:
+            entree = json.loads(ligne)
+        except ValueError:
+            continue
+        if isinstance(entree, dict):
+            demande.update(entree.get("champs", {}))
+    return demande
+
+
+def lire_demande_journalisee(chemin_json: str) -> Optional[Dict]:
+    """
+    Vue courante d'une demande : {ref}_data.json complete par son journal
+
+    Returns:
+        Optional[Dict]: Donnees de la demande, None si illisibles
+    """
+    try:
+        with open(chemin_json, "r", encoding='utf-8') as f:
+            demande = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(demande, dict):
+        return None
+
+    try:
+        with open(chemin_journal(chemin_json), "rb") as f:
+            contenu = f.read()
+    except OSError:
+        return demande
+    return appliquer_journal(demande, contenu)
+
+
+###################
+# ECRITURE
+###################
+
+def ecrire_json_atomique(chemin: str, donnees: Dict):
+    """Ecrit un JSON dans un fichier temporaire synchronise puis renomme (jamais de fichier tronque)"""
+    chemin_tmp = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(chemin_tmp, "w", encoding='utf-8') as f:
+            json.dump(donnees, f, default=str, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(chemin_tmp, chemin)
+    finally:
+        if os.path.exists(chemin_tmp):
+            os.remove(chemin_tmp)
+
+
+def _ecrire_lignes(chemin: str, lignes: list):
+    """Ajoute des lignes a un journal sous verrou exclusif, puis un seul fsync"""
+    with open(chemin, "ab") as f:
+        verrouiller_fichier(f)
+        try:
+            f.seek(0, os.SEEK_END)
+            f.write(b"".join(lignes))
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            deverrouiller_fichier(f)
+
+
+# Regroupement des fsync : le premier ecrivain attend DELAI_GROUPE_FSYNC_MS,
+# puis ecrit et synchronise en une fois tout ce que les autres sessions du
+# processus ont ajoute entre-temps (un fsync par journal et par lot).
+_condition = threading.Condition()
+_en_attente = {}  # chemin du journal -> lignes du lot en constitution
+_lot_courant = 0
+_lot_ecrit = -1
+_meneur_actif = False
+_erreurs_lots = {}
+
+
+def _ajouter_groupe(chemin: str, ligne: bytes):
+    global _en_attente, _lot_courant, _lot_ecrit, _meneur_actif
+
+    with _condition:
+        _en_attente.setdefault(chemin, []).append(ligne)
+        mon_lot = _lot_courant
+        while _meneur_actif and _lot_ecrit < mon_lot:
+            _condition.wait()
+        if _lot_ecrit >= mon_lot:
+            erreur = _erreurs_lots.get(mon_lot)
+            if erreur is not None:
+                raise erreur
+            return
+        _meneur_actif = True
+
+    time.sleep(DELAI_GROUPE_FSYNC_MS / 1000)
+
+    with _condition:
+        lot, _en_attente = _en_attente, {}
+        numero = _lot_courant
+        _lot_courant += 1
+
+    erreur = None
+    for chemin_lot, lignes in lot.items():
+        try:
+            _ecrire_lignes(chemin_lot, lignes)
+        except OSError as e:
+            erreur = e
+
+    with _condition:
+        _lot_ecrit = numero
+        if erreur is not None:
+            _erreurs_lots[numero] = erreur
+        for ancien in [n for n in _erreurs_lots if n < numero - 100]:
+            del _erreurs_lots[ancien]
+        _meneur_actif = False
+        _condition.notify_all()
+
+    if erreur is not None:
+        raise erreur
+
+
+def journaliser_modification(chemin_json: str, champs: Dict, compacter: bool = True) -> int:
+    """
+    Enregistre un changement de champs (statut, conseiller, commentaire...) d'une demande
+
+    Seule une ligne est ajoutee au journal : le cout ne depend pas de la
+    taille de la demande. Quand le journal depasse TAILLE_COMPACTION_JOURNAL_KO,
+    il est replie dans {ref}_data.json.
+
+    Args:
+        chemin_json (str): Chemin de {ref}_data.json
+        champs (Dict): Champs modifies et leur nouvelle valeur
+        compacter (bool): Autoriser la compaction apres l'ajout
+
+    Returns:
+        int: Taille du journal apres l'ajout (octets)
+
+    Raises:
+        OSError: Ecriture du journal impossible
+    """
+    entree = {"date": datetime.now().isoformat(), "champs": champs}
+    ligne = (json.dumps(entree, default=str, ensure_ascii=False) + "\n").encode("utf-8")
+    chemin = chemin_journal(chemin_json)
+    _ajouter_groupe(chemin, ligne)
+
+    try:
+        taille = os.path.getsize(chemin)
+    except OSError:
+        return 0
+    if compacter and taille > TAILLE_COMPACTION_JOURNAL_KO * 1024:
+        compacter_journal(chemin_json)
+    return taille
+
+
+def compacter_journal(chemin_json: str) -> bool:
+    """
+    Replie le journal dans {ref}_data.json (ecriture atomique) puis le vide
+
+    Le journal reste verrouille pendant toute l'operation : aucun ajout ne
+    peut se glisser entre la lecture et la remise a zero.
+
+    Returns:
+        bool: True si des entrees ont ete repliees
+    """
+    try:
+        f = open(chemin_journal(chemin_json), "r+b")
+    except FileNotFoundError:
+        return False
+
+    with f:
+        verrouiller_fichier(f)
+        try:
+            f.seek(0)
+            contenu = f.read()
+            if not contenu:
+                return False
+            try:
+                with open(chemin_json, "r", encoding='utf-8') as fichier_donnees:
+                    demande = json.load(fichier_donnees)
+            except (OSError, ValueError):
+                return False
+
+            ecrire_json_atomique(chemin_json, appliquer_journal(demande, contenu))
+            f.truncate(0)
+            f.flush()
+            os.fsync(f.fileno())
+            return True
+        finally:
+            deverrouiller_fichier(f)
+
+
+if __name__ == "__main__":
+    # python -m backend.services.journal_demandes : replie tous les journaux dans les _data.json
+    from backend.services.scanner_dossiers import scanner_dossiers
+
+    nb = sum(1 for dossier in scanner_dossiers()["dossiers"]
+             if dossier["chemin_json"] and compacter_journal(dossier["chemin_json"]))
+    print(f"{nb} journal(aux) compacte(s)")
@@ -0,0 +1,177 @@
+"""
+backend/services/migration_dossiers.py - Migration des dossiers <type>/<Nom - REF> vers <type>/<AAMM>/<REF>
+"""
+import os
+import json
+import time
+import sqlite3
+from typing import Dict, Iterator, Optional, Tuple
+
+from backend.config import DOSSIER_DEMANDES, TYPES_CREDIT, FICHIER_STATUT_TRAITEMENT, DELAI_STABILITE_MIGRATION_S
+from backend.agent_OCR.file_attente import verrouiller_file
+from backend.services.chemins_dossiers import chemin_dossier_demande, reference_valide
+from backend.services.index_demandes import appliquer_modifications, lire_demande
+from backend.services.journal_demandes import signature_demande
+from backend.services.scanner_dossiers import lister_conteneur
+
+# Traitement OCR en file ou en cours : la file et les points de reprise designent le dossier par son chemin
+STATUTS_OCR_ACTIFS = ("queued", "processing")
+
+# Issues possibles pour un dossier
+MIGRE = "migre"
+A_MIGRER = "a_migrer"  # --dry-run
+IGNORE_SANS_DONNEES = "sans_donnees"
+IGNORE_OCR_ACTIF = "ocr_actif"
+IGNORE_RECENT = "recent"
+CONFLIT = "conflit"
+ERREUR = "erreur"
+
+
+def iterer_dossiers_historiques(racine: str = DOSSIER_DEMANDES) -> Iterator[Tuple[str, str]]:
+    """
+    Dossiers encore ranges directement sous <type>/ (ancienne arborescence)
+
+    Yields:
+        Tuple[str, str]: (type de credit, chemin du dossier)
+    """
+    for type_credit in TYPES_CREDIT:
+        _, dossiers, _ = lister_conteneur(os.path.join(racine, type_credit))
+        for chemin_dossier in sorted(dossiers):
+            yield type_credit, chemin_dossier
+
+
+def _fichier_donnees(chemin_dossier: str) -> Tuple[Optional[os.DirEntry], float]:
+    """*_data.json du dossier et date de la derniere modification d'un de ses fichiers"""
+    entree_json, derniere_modification = None, 0.0
+    with os.scandir(chemin_dossier) as fichiers:
+        for fichier in fichiers:
+            if fichier.name.endswith("_data.json"):
+                entree_json = fichier
+            derniere_modification = max(derniere_modification, fichier.stat().st_mtime)
+    return entree_json, derniere_modification
+
+
+def _statut_ocr(chemin_dossier: str) -> Optional[str]:
+    try:
+        with open(os.path.join(chemin_dossier, FICHIER_STATUT_TRAITEMENT), "r", encoding="utf-8") as f:
+            return json.load(f).get("status")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def migrer_dossier(type_credit: str, chemin_dossier: str, racine: str = DOSSIER_DEMANDES,
+                   delai_stabilite: float = DELAI_STABILITE_MIGRATION_S, simulation: bool = False) -> Tuple[str, Optional[str]]:
+    """
+    Deplace un dossier vers <type>/<AAMM>/<REF>, par un seul renommage atomique
+
+    Le dossier n'est pas deplace tant qu'il peut etre en cours d'ecriture
+    (soumission recente, traitement OCR en file ou en cours) : il le sera a
+    une execution suivante. Le traitement OCR est verifie une derniere fois
+    sous le verrou de la file, tenu jusqu'au renommage : un job ne peut pas
+    etre ajoute entre les deux. L'index des demandes est mis a jour aussitot ;
+    les caches des sessions admin voient le deplacement par le mtime des
+    dossiers.
+
+    Args:
+        type_credit (str): Type de credit
+        chemin_dossier (str): Dossier de l'ancienne arborescence
+        racine (str): Dossier racine des demandes
+        delai_stabilite (float): Secondes sans modification exigees avant deplacement
+        simulation (bool): Ne rien deplacer
+
+    Returns:
+        Tuple[str, Optional[str]]: (issue, nouveau chemin)
+    """
+    try:
+        entree_json, derniere_modification = _fichier_donnees(chemin_dossier)
+    except OSError:
+        return ERREUR, None
+    if entree_json is None:
+        return IGNORE_SANS_DONNEES, None
+
+    ref_demande = entree_json.name[:-len("_data.json")]
+    if not reference_valide(ref_demande):
+        return ERREUR, None
+    if time.time() - derniere_modification < delai_stabilite:
+        return IGNORE_RECENT, None
+
+    if _statut_ocr(chemin_dossier) in STATUTS_OCR_ACTIFS:
+        return IGNORE_OCR_ACTIF, None
+
+    cible = chemin_dossier_demande(type_credit, ref_demande, racine)
+    if os.path.exists(cible):
+        return CONFLIT, cible
+    if simulation:
+        return A_MIGRER, cible
+
+    try:
+        with verrouiller_file(chemin_dossier) as job_actif:
+            if job_actif or _statut_ocr(chemin_dossier) in STATUTS_OCR_ACTIFS:
+                return IGNORE_OCR_ACTIF, None
+            os.makedirs(os.path.dirname(cible), exist_ok=True)
+            os.rename(chemin_dossier, cible)
+    except (OSError, sqlite3.Error):
+        return ERREUR, None
+
+    chemin_json = os.path.join(cible, entree_json.name)
+    demande = lire_demande(chemin_json, type_credit, cible)
+    try:
+        modifiees = [(demande, chemin_json, signature_demande(chemin_json))] if demande is not None else []
+        appliquer_modifications(modifiees, [entree_json.path])
+    except (OSError, sqlite3.Error):
+        pass  # Realigne par la reconciliation de l'index
+    return MIGRE, cible
+
+
+def migrer_dossiers(racine: str = DOSSIER_DEMANDES, limite: int = None,
+                    delai_stabilite: float = DELAI_STABILITE_MIGRATION_S, simulation: bool = False,
+                    rapporter=None) -> Dict[str, int]:
+    """
+    Migre les dossiers de l'ancienne arborescence, un par un
+
+    Reprenable : chaque dossier est deplace d'un bloc, et une execution
+    interrompue reprend simplement avec les dossiers restes sous <type>/.
+    L'application reste utilisable pendant la migration (resolution des
+    chemins dans les deux arborescences).
+
+    Args:
+        racine (str): Dossier racine des demandes
+        limite (int): Nombre maximal de dossiers deplaces
+        delai_stabilite (float): Secondes sans modification exigees avant deplacement
+        simulation (bool): Lister les deplacements sans les faire
+        rapporter: Fonction appelee avec (chemin, issue, nouveau chemin) pour chaque dossier
+
+    Returns:
+        Dict[str, int]: Nombre de dossiers par issue
+    """
+    compteurs = {}
+    nb_deplaces = 0
+    for type_credit, chemin_dossier in iterer_dossiers_historiques(racine):
+        if limite is not None and nb_deplaces >= limite:
+            break
+        issue, cible = migrer_dossier(type_credit, chemin_dossier, racine, delai_stabilite, simulation)
+        compteurs[issue] = compteurs.get(issue, 0) + 1
+        if issue in (MIGRE, A_MIGRER):
+            nb_deplaces += 1
+        if rapporter is not None:
+            rapporter(chemin_dossier, issue, cible)
+    return compteurs
+
+
+if __name__ == "__main__":
+    # python -m backend.services.migration_dossiers [--dry-run] [--limite N]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migration des dossiers de demandes vers <type>/<AAMM>/<REF>")
+    parser.add_argument("--racine", default=DOSSIER_DEMANDES)
+    parser.add_argument("--dry-run", action="store_true", help="Afficher les deplacements sans les faire")
+    parser.add_argument("--limite", type=int, default=None, help="Nombre maximal de dossiers deplaces")
+    parser.add_argument("--delai", type=float, default=DELAI_STABILITE_MIGRATION_S,
+                        help="Secondes sans modification avant deplacement")
+    args = parser.parse_args()
+
+    def afficher(chemin, issue, cible):
+        print(f"{issue:<13} {os.path.relpath(chemin, args.racine)}" + (f" -> {os.path.relpath(cible, args.racine)}" if cible else ""))
+
+    resultat = migrer_dossiers(args.racine, args.limite, args.delai, args.dry_run, afficher)
+    print(", ".join(f"{issue}: {nb}" for issue, nb in sorted(resultat.items())) or "Aucun dossier a migrer")
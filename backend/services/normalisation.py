@@ -0,0 +1,129 @@
+"""
+backend/services/normalisation.py - Normalisation de texte partagee (comparaisons OCR, recherche)
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# Motifs precompiles
+MOTIF_ESPACES = re.compile(r'\s+')
+MOTIF_PONCTUATION = re.compile(r'[^\w\s]')
+MOTIF_SEPARATEURS_NUMERO = re.compile(r'[\s\-\.]')
+
+TAILLE_CACHE_NORMALISATION = 8192
+
+
+def _construire_table_accents() -> dict:
+    """
+    Table str.translate repliant les lettres accentuees latines sur leur lettre de base
+
+    Calculee une seule fois a l'import par decomposition unicodedata (NFKD)
+    des blocs Latin-1 et Latin etendu A/B.
+    """
+    table = {}
+    for code in range(0x00C0, 0x0250):
+        caractere = chr(code)
+        decompose = unicodedata.normalize('NFKD', caractere)
+        base = ''.join(c for c in decompose if not unicodedata.combining(c))
+        if base and base != caractere:
+            table[code] = base
+
+    # Lettres sans decomposition canonique
+    table.update({
+        ord('ß'): 'ss', ord('æ'): 'ae', ord('Æ'): 'AE', ord('œ'): 'oe', ord('Œ'): 'OE',
+        ord('ø'): 'o', ord('Ø'): 'O', ord('đ'): 'd', ord('Đ'): 'D', ord('ł'): 'l', ord('Ł'): 'L'
+    })
+    return table
+
+
+TABLE_ACCENTS = _construire_table_accents()
+
+
+def replier_accents(texte: str) -> str:
+    """
+    Supprime les accents d'un texte ("Hélène" -> "Helene")
+
+    Args:
+        texte (str): Texte a replier
+
+    Returns:
+        str: Texte sans accents
+    """
+    texte = texte.translate(TABLE_ACCENTS)
+    if texte.isascii():
+        return texte
+
+    # Caracteres hors table (rares) : decomposition complete
+    return ''.join(c for c in unicodedata.normalize('NFKD', texte) if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=TAILLE_CACHE_NORMALISATION)
+def _normaliser_texte(texte: str) -> str:
+    texte = replier_accents(texte.lower())
+    texte = MOTIF_PONCTUATION.sub(' ', texte)
+    return MOTIF_ESPACES.sub(' ', texte).strip()
+
+
+def normaliser_texte(texte) -> str:
+    """
+    Normalise un texte pour comparaison : minuscules, sans accents,
+    ponctuation remplacee par des espaces, espaces compactes
+
+    Les valeurs deja vues sont servies par un cache LRU.
+
+    Args:
+        texte (str): Texte a normaliser
+
+    Returns:
+        str: Texte normalise ("" si vide)
+    """
+    if not texte:
+        return ""
+    return _normaliser_texte(texte if isinstance(texte, str) else str(texte))
+
+
+@lru_cache(maxsize=TAILLE_CACHE_NORMALISATION)
+def _normaliser_numero(numero: str) -> str:
+    return MOTIF_SEPARATEURS_NUMERO.sub('', numero)
+
+
+def normaliser_numero(numero) -> str:
+    """
+    Normalise un numero en enlevant espaces, tirets et points
+
+    Args:
+        numero (str): Numero a normaliser
+
+    Returns:
+        str: Numero normalise ("" si vide)
+    """
+    if not numero:
+        return ""
+    return _normaliser_numero(numero if isinstance(numero, str) else str(numero))
+
+
+def compacter_espaces(texte: str) -> str:
+    """
+    Supprime les espaces en debut et fin de chaine et remplace les espaces multiples par un seul
+
+    Args:
+        texte (str): Texte a compacter
+
+    Returns:
+        str: Texte compacte
+    """
+    return MOTIF_ESPACES.sub(' ', texte).strip()
+
+
+def texte_contient(texte, recherche) -> bool:
+    """
+    Recherche insensible a la casse, aux accents et a la ponctuation
+
+    Args:
+        texte (str): Texte dans lequel chercher
+        recherche (str): Texte recherche
+
+    Returns:
+        bool: True si la recherche normalisee est contenue dans le texte normalise
+    """
+    return normaliser_texte(recherche) in normaliser_texte(texte)
@@ -0,0 +1,533 @@
+"""
+backend/services/portefeuille.py - Rapport de portefeuille agrege sur l'ensemble des dossiers
+"""
+import os
+import json
+import heapq
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from fpdf import FPDF
+
+from backend.config import DOSSIER_DEMANDES, FICHIER_STATUT_TRAITEMENT, TYPES_CREDIT, NB_THREADS_PORTEFEUILLE
+from backend.services.dates import date_demande, parser_date
+from backend.services.journal_demandes import lire_demande_journalisee
+from backend.services.scanner_dossiers import lister_conteneur
+
+# Export Excel (optionnel - si xlsxwriter est installe)
+try:
+    import xlsxwriter
+    XLSX_DISPONIBLE = True
+except ImportError:
+    XLSX_DISPONIBLE = False
+
+NOM_RAPPORT_ANALYSE = "rapport_analyse.json"
+
+# Bornes (incluses) des classes de delais
+CLASSES_DELAI_TRAITEMENT_S = [10, 30, 60, 120, 300, 600, 1800, 3600]
+CLASSES_DELAI_DEMANDE_JOURS = [0, 1, 2, 3, 7, 14, 30, 90]
+
+NB_SCORES_FAIBLES = 20  # Dossiers au score le plus faible repris dans le rapport
+NB_MAX_RAISONS_ECHEC = 200  # Raisons distinctes conservees, les suivantes sont regroupees
+
+COLONNES_DOSSIERS = [
+    ("ref_demande", "Reference"), ("type_credit", "Type"), ("nom", "Client"), ("statut", "Statut"),
+    ("montant", "Montant (DH)"), ("date_demande", "Date demande"), ("statut_ocr", "Statut OCR"),
+    ("concordance", "Concordance"), ("score_confiance", "Score"), ("nb_problemes", "Problemes"),
+    ("delai_traitement_s", "Duree OCR (s)"), ("delai_demande_jours", "Delai demande -> analyse (j)"),
+    ("raison_echec", "Raison d'echec")
+]
+
+
+###################
+# LECTURE DES DOSSIERS
+###################
+
+def iterer_dossiers(racine: str = DOSSIER_DEMANDES) -> Iterator[Tuple[str, str]]:
+    """
+    Parcourt les dossiers de demandes (<type>/<AAMM>/<REF> et ancienne
+    arborescence <type>/<Nom - REF>), un dossier mensuel a la fois
+
+    Yields:
+        Tuple[str, str]: (type de credit, chemin du dossier)
+    """
+    for type_credit in TYPES_CREDIT:
+        a_lister = [os.path.join(racine, type_credit)]
+        while a_lister:
+            _, dossiers, shards = lister_conteneur(a_lister.pop(0))
+            for chemin_dossier in dossiers:
+                yield type_credit, chemin_dossier
+            a_lister += sorted(shards)
+
+
+def _lire_json(chemin: str) -> Optional[Dict]:
+    try:
+        with open(chemin, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _raison_echec(message: str) -> str:
+    """Raison d'echec sans le detail variable ("Erreur X: chemin/..." -> "Erreur X")"""
+    return message.split(":", 1)[0].strip()[:120] or "Inconnue"
+
+
+def lire_dossier(chemin_dossier: str, type_credit: str) -> Optional[Dict]:
+    """
+    Resume d'un dossier pour le rapport de portefeuille
+
+    Lit la demande (*_data.json et son journal), le rapport d'analyse OCR et le statut de
+    traitement, et n'en garde que les champs agreges.
+
+    Returns:
+        Optional[Dict]: Enregistrement du dossier, None sans fichier de demande ou si le
+        dossier a disparu (suppression, migration) depuis le parcours
+    """
+    demande = None
+    try:
+        with os.scandir(chemin_dossier) as entrees:
+            for entree in entrees:
+                if entree.name.endswith("_data.json"):
+                    demande = lire_demande_journalisee(entree.path)
+                    break
+    except OSError:
+        return None
+    if demande is None:
+        return None
+
+    try:
+        montant = float(demande.get("montant") or 0)
+    except (TypeError, ValueError):
+        montant = 0.0
+
+    jour_demande = date_demande(demande)
+    enregistrement = {
+        "ref_demande": demande.get("ref_demande", os.path.basename(chemin_dossier)),
+        "type_credit": demande.get("type_credit", type_credit),
+        "nom": demande.get("nom", ""),
+        "statut": demande.get("statut", "En attente"),
+        "montant": montant,
+        "date_demande": jour_demande,
+        "statut_ocr": "aucun",
+        "concordance": None,
+        "score_confiance": None,
+        "nb_problemes": None,
+        "delai_traitement_s": None,
+        "delai_demande_jours": None,
+        "raison_echec": None,
+        "raisons_echec": []
+    }
+
+    statut = _lire_json(os.path.join(chemin_dossier, FICHIER_STATUT_TRAITEMENT)) or {}
+    if statut.get("status"):
+        enregistrement["statut_ocr"] = statut["status"]
+    if statut.get("status") == "error":
+        enregistrement["raisons_echec"].append(_raison_echec(str(statut.get("error") or "Inconnue")))
+
+    debut, fin = statut.get("start_time"), statut.get("end_time")
+    if debut and fin:
+        try:
+            duree = (datetime.fromisoformat(fin) - datetime.fromisoformat(debut)).total_seconds()
+            enregistrement["delai_traitement_s"] = round(duree, 1)
+        except ValueError:
+            pass
+    fin_analyse = parser_date(fin)
+    if fin_analyse and jour_demande:
+        enregistrement["delai_demande_jours"] = (fin_analyse - jour_demande).days
+
+    rapport = _lire_json(os.path.join(chemin_dossier, NOM_RAPPORT_ANALYSE))
+    if rapport:
+        resume = rapport.get("resume", {})
+        enregistrement["concordance"] = resume.get("concordance")
+        enregistrement["score_confiance"] = resume.get("score_confiance")
+        enregistrement["nb_problemes"] = resume.get("nombre_problemes")
+        if enregistrement["statut_ocr"] == "aucun":
+            enregistrement["statut_ocr"] = "completed"
+        for erreur in rapport.get("workflow", {}).get("erreurs_rencontrees", []):
+            enregistrement["raisons_echec"].append(_raison_echec(str(erreur)))
+
+    if enregistrement["raisons_echec"]:
+        enregistrement["raison_echec"] = enregistrement["raisons_echec"][0]
+    return enregistrement
+
+
+def iterer_enregistrements(racine: str = DOSSIER_DEMANDES,
+                           nb_threads: int = NB_THREADS_PORTEFEUILLE) -> Iterator[Dict]:
+    """
+    Lit les dossiers en parallele et restitue leurs enregistrements au fil de l'eau
+
+    Au plus nb_threads * 4 lectures sont en cours a un instant donne : la
+    memoire reste constante quel que soit le nombre de dossiers.
+
+    Yields:
+        Dict: Enregistrement de chaque dossier (ordre du parcours)
+    """
+    with ThreadPoolExecutor(max_workers=nb_threads) as executeur:
+        en_cours = deque()
+        for type_credit, chemin_dossier in iterer_dossiers(racine):
+            en_cours.append(executeur.submit(lire_dossier, chemin_dossier, type_credit))
+            if len(en_cours) >= nb_threads * 4:
+                enregistrement = en_cours.popleft().result()
+                if enregistrement:
+                    yield enregistrement
+
+        while en_cours:
+            enregistrement = en_cours.popleft().result()
+            if enregistrement:
+                yield enregistrement
+
+
+###################
+# AGREGATION
+###################
+
+def _nouveau_delai(classes: list) -> Dict:
+    return {"nb": 0, "total": 0.0, "min": None, "max": None, "classes": [0] * (len(classes) + 1)}
+
+
+def _ajouter_delai(delai: Dict, valeur: float, classes: list):
+    delai["nb"] += 1
+    delai["total"] += valeur
+    delai["min"] = valeur if delai["min"] is None else min(delai["min"], valeur)
+    delai["max"] = valeur if delai["max"] is None else max(delai["max"], valeur)
+    indice = next((i for i, borne in enumerate(classes) if valeur <= borne), len(classes))
+    delai["classes"][indice] += 1
+
+
+def nouvel_agregat() -> Dict:
+    """Agregat vide du portefeuille (taille independante du nombre de dossiers)"""
+    return {
+        "nb_dossiers": 0,
+        "nb_analyses": 0,
+        "nb_concordants": 0,
+        "somme_scores": 0.0,
+        "par_type": {},
+        "par_statut": Counter(),
+        "statuts_ocr": Counter(),
+        "scores": [0] * 10,  # Repartition des scores par tranche de 10 points
+        "raisons_echec": Counter(),
+        "delai_traitement_s": _nouveau_delai(CLASSES_DELAI_TRAITEMENT_S),
+        "delai_demande_jours": _nouveau_delai(CLASSES_DELAI_DEMANDE_JOURS),
+        "scores_faibles": []  # Tas des NB_SCORES_FAIBLES plus faibles scores
+    }
+
+
+def ajouter_enregistrement(agregat: Dict, enregistrement: Dict):
+    """Integre un dossier a l'agregat"""
+    agregat["nb_dossiers"] += 1
+    agregat["par_statut"][enregistrement["statut"]] += 1
+    agregat["statuts_ocr"][enregistrement["statut_ocr"]] += 1
+
+    type_credit = enregistrement["type_credit"]
+    par_type = agregat["par_type"].setdefault(type_credit, {
+        "nb": 0, "montant_total": 0.0, "montant_min": None, "montant_max": None,
+        "nb_analyses": 0, "nb_concordants": 0, "somme_scores": 0.0
+    })
+    montant = enregistrement["montant"]
+    par_type["nb"] += 1
+    par_type["montant_total"] += montant
+    par_type["montant_min"] = montant if par_type["montant_min"] is None else min(par_type["montant_min"], montant)
+    par_type["montant_max"] = montant if par_type["montant_max"] is None else max(par_type["montant_max"], montant)
+
+    score = enregistrement["score_confiance"]
+    if enregistrement["concordance"] is not None:
+        concordant = 1 if enregistrement["concordance"] else 0
+        agregat["nb_analyses"] += 1
+        agregat["nb_concordants"] += concordant
+        par_type["nb_analyses"] += 1
+        par_type["nb_concordants"] += concordant
+        if score is not None:
+            agregat["somme_scores"] += score
+            par_type["somme_scores"] += score
+            agregat["scores"][min(int(score // 10), 9)] += 1
+
+            element = (-score, enregistrement["ref_demande"], enregistrement["nb_problemes"] or 0)
+            if len(agregat["scores_faibles"]) < NB_SCORES_FAIBLES:
+                heapq.heappush(agregat["scores_faibles"], element)
+            else:
+                heapq.heappushpop(agregat["scores_faibles"], element)
+
+    for raison in enregistrement["raisons_echec"]:
+        if raison not in agregat["raisons_echec"] and len(agregat["raisons_echec"]) >= NB_MAX_RAISONS_ECHEC:
+            raison = "Autres"
+        agregat["raisons_echec"][raison] += 1
+
+    if enregistrement["delai_traitement_s"] is not None:
+        _ajouter_delai(agregat["delai_traitement_s"], enregistrement["delai_traitement_s"], CLASSES_DELAI_TRAITEMENT_S)
+    if enregistrement["delai_demande_jours"] is not None:
+        _ajouter_delai(agregat["delai_demande_jours"], enregistrement["delai_demande_jours"], CLASSES_DELAI_DEMANDE_JOURS)
+
+
+def _taux(nombre: int, total: int) -> float:
+    return round(nombre / total * 100, 1) if total else 0.0
+
+
+def _libelles_classes(classes: list, unite: str) -> list:
+    libelles = [f"<= {classes[0]} {unite}"]
+    libelles += [f"{classes[i - 1]}-{classes[i]} {unite}" for i in range(1, len(classes))]
+    libelles.append(f"> {classes[-1]} {unite}")
+    return libelles
+
+
+def synthese_portefeuille(agregat: Dict) -> Dict:
+    """
+    Indicateurs finaux du portefeuille (taux, moyennes, repartitions)
+
+    Returns:
+        Dict: Synthese serialisable en JSON
+    """
+    par_type = {}
+    for type_credit, valeurs in sorted(agregat["par_type"].items()):
+        par_type[type_credit] = {
+            "nb_dossiers": valeurs["nb"],
+            "montant_total": round(valeurs["montant_total"], 2),
+            "montant_moyen": round(valeurs["montant_total"] / valeurs["nb"], 2) if valeurs["nb"] else 0.0,
+            "montant_min": valeurs["montant_min"],
+            "montant_max": valeurs["montant_max"],
+            "nb_analyses": valeurs["nb_analyses"],
+            "taux_concordance": _taux(valeurs["nb_concordants"], valeurs["nb_analyses"]),
+            "score_moyen": round(valeurs["somme_scores"] / valeurs["nb_analyses"], 1) if valeurs["nb_analyses"] else None
+        }
+
+    def delai(cle: str, classes: list, unite: str) -> Dict:
+        valeurs = agregat[cle]
+        return {
+            "nb": valeurs["nb"],
+            "moyenne": round(valeurs["total"] / valeurs["nb"], 1) if valeurs["nb"] else None,
+            "min": valeurs["min"],
+            "max": valeurs["max"],
+            "repartition": dict(zip(_libelles_classes(classes, unite), valeurs["classes"]))
+        }
+
+    return {
+        "date_generation": datetime.now().isoformat(),
+        "nb_dossiers": agregat["nb_dossiers"],
+        "nb_analyses": agregat["nb_analyses"],
+        "taux_concordance": _taux(agregat["nb_concordants"], agregat["nb_analyses"]),
+        "score_moyen": round(agregat["somme_scores"] / agregat["nb_analyses"], 1) if agregat["nb_analyses"] else None,
+        "par_type": par_type,
+        "par_statut": dict(agregat["par_statut"].most_common()),
+        "statuts_ocr": dict(agregat["statuts_ocr"].most_common()),
+        "repartition_scores": {f"{i * 10}-{i * 10 + 10}": n for i, n in enumerate(agregat["scores"])},
+        "raisons_echec": dict(agregat["raisons_echec"].most_common()),
+        "delai_traitement_s": delai("delai_traitement_s", CLASSES_DELAI_TRAITEMENT_S, "s"),
+        "delai_demande_jours": delai("delai_demande_jours", CLASSES_DELAI_DEMANDE_JOURS, "j"),
+        "scores_faibles": [
+            {"ref_demande": ref, "score_confiance": -score, "nb_problemes": nb_problemes}
+            for score, ref, nb_problemes in sorted(agregat["scores_faibles"], reverse=True)
+        ]
+    }
+
+
+###################
+# SORTIES
+###################
+
+def _ecrire_feuille_synthese(classeur, feuille, synthese: Dict):
+    """Feuille Excel des indicateurs agreges"""
+    gras = classeur.add_format({"bold": True})
+    titre = classeur.add_format({"bold": True, "font_size": 14})
+    ligne = 0
+
+    def ecrire(valeurs, format_ligne=None):
+        nonlocal ligne
+        feuille.write_row(ligne, 0, valeurs, format_ligne)
+        ligne += 1
+
+    ecrire(["Rapport de portefeuille", synthese["date_generation"][:16].replace("T", " ")], titre)
+    ligne += 1
+    ecrire(["Dossiers", synthese["nb_dossiers"]])
+    ecrire(["Dossiers analyses (OCR)", synthese["nb_analyses"]])
+    ecrire(["Taux de concordance (%)", synthese["taux_concordance"]])
+    ecrire(["Score de confiance moyen", synthese["score_moyen"] if synthese["score_moyen"] is not None else "-"])
+    ligne += 1
+
+    ecrire(["Type", "Dossiers", "Montant total", "Montant moyen", "Montant min", "Montant max",
+            "Analyses", "Concordance (%)", "Score moyen"], gras)
+    for type_credit, valeurs in synthese["par_type"].items():
+        ecrire([type_credit, valeurs["nb_dossiers"], valeurs["montant_total"], valeurs["montant_moyen"],
+                valeurs["montant_min"], valeurs["montant_max"], valeurs["nb_analyses"],
+                valeurs["taux_concordance"], valeurs["score_moyen"] if valeurs["score_moyen"] is not None else "-"])
+    ligne += 1
+
+    for libelle, repartition in (("Tranche de score", synthese["repartition_scores"]),
+                                 ("Statut OCR", synthese["statuts_ocr"]),
+                                 ("Statut de la demande", synthese["par_statut"]),
+                                 ("Raison d'echec", synthese["raisons_echec"]),
+                                 ("Duree OCR", synthese["delai_traitement_s"]["repartition"]),
+                                 ("Delai demande -> analyse", synthese["delai_demande_jours"]["repartition"])):
+        ecrire([libelle, "Dossiers"], gras)
+        for cle, nombre in repartition.items():
+            ecrire([cle, nombre])
+        ligne += 1
+
+    feuille.set_column(0, 0, 34)
+    feuille.set_column(1, 8, 14)
+
+
+class _PDFPortefeuille(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 15)
+        self.cell(0, 10, 'Rapport de portefeuille - Analyse des dossiers de credit', 0, 1, 'C')
+        self.ln(4)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
+
+
+def _latin1(texte) -> str:
+    """Les polices standard de FPDF sont en latin-1"""
+    return str(texte).encode("latin-1", "replace").decode("latin-1")
+
+
+def generer_pdf_portefeuille(synthese: Dict) -> bytes:
+    """
+    Rapport PDF du portefeuille a partir de la synthese
+
+    Returns:
+        bytes: Contenu du PDF
+    """
+    pdf = _PDFPortefeuille()
+    pdf.alias_nb_pages()
+    pdf.add_page()
+
+    def titre(texte):
+        pdf.ln(3)
+        pdf.set_font('Arial', 'B', 12)
+        pdf.cell(0, 9, _latin1(texte), 0, 1)
+        pdf.set_font('Arial', '', 9)
+
+    def tableau(entetes, lignes, largeurs):
+        pdf.set_font('Arial', 'B', 9)
+        for entete, largeur in zip(entetes, largeurs):
+            pdf.cell(largeur, 7, _latin1(entete), 1, 0, 'C')
+        pdf.ln()
+        pdf.set_font('Arial', '', 9)
+        for ligne in lignes:
+            for valeur, largeur in zip(ligne, largeurs):
+                pdf.cell(largeur, 6, _latin1(valeur), 1, 0)
+            pdf.ln()
+
+    pdf.set_font('Arial', '', 9)
+    pdf.cell(0, 6, _latin1(f"Genere le {datetime.now().strftime('%d/%m/%Y a %H:%M')}"), 0, 1)
+
+    titre("Synthese")
+    score_moyen = synthese["score_moyen"]
+    tableau(["Indicateur", "Valeur"], [
+        ["Dossiers", synthese["nb_dossiers"]],
+        ["Dossiers analyses (OCR)", synthese["nb_analyses"]],
+        ["Taux de concordance", f"{synthese['taux_concordance']} %"],
+        ["Score de confiance moyen", f"{score_moyen}/100" if score_moyen is not None else "-"]
+    ], [80, 50])
+
+    titre("Montants et concordance par type de credit")
+    tableau(["Type", "Dossiers", "Montant total", "Montant moyen", "Concordance", "Score moyen"], [
+        [type_credit, v["nb_dossiers"], f"{v['montant_total']:,.0f} DH", f"{v['montant_moyen']:,.0f} DH",
+         f"{v['taux_concordance']} %", v["score_moyen"] if v["score_moyen"] is not None else "-"]
+        for type_credit, v in synthese["par_type"].items()
+    ], [25, 20, 40, 35, 30, 25])
+
+    titre("Repartition des scores de confiance")
+    maximum = max(synthese["repartition_scores"].values()) or 1
+    for tranche, nombre in synthese["repartition_scores"].items():
+        pdf.cell(25, 5, tranche, 0, 0)
+        largeur = 120 * nombre / maximum
+        if largeur:
+            pdf.set_fill_color(70, 130, 180)
+            pdf.cell(largeur, 5, "", 0, 0, '', True)
+        pdf.cell(0, 5, f"  {nombre}", 0, 1)
+
+    titre("Statuts du traitement OCR")
+    tableau(["Statut", "Dossiers"], list(synthese["statuts_ocr"].items()), [60, 30])
+
+    if synthese["raisons_echec"]:
+        titre("Raisons d'echec OCR")
+        tableau(["Raison", "Occurrences"], list(synthese["raisons_echec"].items())[:15], [140, 30])
+
+    for cle, libelle, unite in (("delai_traitement_s", "Duree du traitement OCR", "s"),
+                                ("delai_demande_jours", "Delai entre la demande et l'analyse", "j")):
+        delai = synthese[cle]
+        if delai["nb"]:
+            titre(f"{libelle} (moyenne {delai['moyenne']} {unite}, min {delai['min']}, max {delai['max']})")
+            tableau(["Tranche", "Dossiers"], list(delai["repartition"].items()), [60, 30])
+
+    if synthese["scores_faibles"]:
+        titre("Dossiers au score de confiance le plus faible")
+        tableau(["Reference", "Score", "Problemes"], [
+            [d["ref_demande"], d["score_confiance"], d["nb_problemes"]] for d in synthese["scores_faibles"]
+        ], [70, 25, 25])
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def generer_rapport_portefeuille(sortie_xlsx=None, racine: str = DOSSIER_DEMANDES,
+                                 nb_threads: int = NB_THREADS_PORTEFEUILLE) -> Dict:
+    """
+    Agrege l'ensemble des dossiers en une passe et, si demande, ecrit le classeur Excel
+
+    Les dossiers sont lus en parallele et traites au fil de l'eau : seul
+    l'agregat (de taille fixe) est garde en memoire. Le detail par dossier
+    est ecrit ligne a ligne dans le classeur (mode constant_memory).
+
+    Args:
+        sortie_xlsx: Chemin ou flux binaire du classeur Excel (None : pas d'Excel)
+        racine: Dossier racine des demandes
+        nb_threads: Lectures de dossiers en parallele
+
+    Returns:
+        Dict: Synthese du portefeuille (voir synthese_portefeuille)
+    """
+    if sortie_xlsx is not None and not XLSX_DISPONIBLE:
+        raise ImportError("Export Excel non disponible (package xlsxwriter requis)")
+
+    agregat = nouvel_agregat()
+    classeur = feuille_dossiers = None
+    if sortie_xlsx is not None:
+        classeur = xlsxwriter.Workbook(sortie_xlsx, {"constant_memory": True})
+        feuille_synthese = classeur.add_worksheet("Synthese")
+        feuille_dossiers = classeur.add_worksheet("Dossiers")
+        feuille_dossiers.write_row(0, 0, [libelle for _, libelle in COLONNES_DOSSIERS], classeur.add_format({"bold": True}))
+
+    try:
+        for ligne, enregistrement in enumerate(iterer_enregistrements(racine, nb_threads), start=1):
+            ajouter_enregistrement(agregat, enregistrement)
+            if feuille_dossiers is not None:
+                feuille_dossiers.write_row(ligne, 0, [
+                    enregistrement[cle].isoformat() if isinstance(enregistrement[cle], date) else enregistrement[cle]
+                    for cle, _ in COLONNES_DOSSIERS
+                ])
+
+        synthese = synthese_portefeuille(agregat)
+        if classeur is not None:
+            _ecrire_feuille_synthese(classeur, feuille_synthese, synthese)
+    finally:
+        if classeur is not None:
+            classeur.close()
+
+    return synthese
+
+
+if __name__ == "__main__":
+    # python -m backend.services.portefeuille --pdf portefeuille.pdf --xlsx portefeuille.xlsx
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rapport de portefeuille sur l'ensemble des dossiers")
+    parser.add_argument("--pdf", help="Fichier PDF de sortie")
+    parser.add_argument("--xlsx", help="Fichier Excel de sortie (detail par dossier)")
+    parser.add_argument("--racine", default=DOSSIER_DEMANDES, help="Dossier racine des demandes")
+    parser.add_argument("--threads", type=int, default=NB_THREADS_PORTEFEUILLE, help="Lectures en parallele")
+    args = parser.parse_args()
+
+    synthese = generer_rapport_portefeuille(args.xlsx, args.racine, args.threads)
+    if args.pdf:
+        with open(args.pdf, "wb") as f:
+            f.write(generer_pdf_portefeuille(synthese))
+    if not args.pdf and not args.xlsx:
+        print(json.dumps(synthese, ensure_ascii=False, indent=2, default=str))
+    else:
+        print(f"{synthese['nb_dossiers']} dossier(s), concordance {synthese['taux_concordance']} %")
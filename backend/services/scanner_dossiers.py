@@ -0,0 +1,154 @@
+"""
+backend/services/scanner_dossiers.py - Parcours parallele des dossiers de demandes (volumes reseau)
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.config import DOSSIER_DEMANDES, TYPES_CREDIT, NB_THREADS_SCAN_DOSSIERS
+from backend.services.chemins_dossiers import est_shard
+from backend.services.journal_demandes import lire_demande_journalisee, signature_demande
+
+NB_TENTATIVES_INSTANTANE = 3  # Reprises si un dossier de type ou mensuel change pendant le parcours
+
+
+def _mtime(chemin: str) -> Optional[int]:
+    try:
+        return os.stat(chemin).st_mtime_ns
+    except OSError:
+        return None
+
+
+def lister_conteneur(chemin: str) -> Tuple[Optional[int], List[str], List[str]]:
+    """
+    Contenu d'un dossier de type (<type>/) ou mensuel (<type>/<AAMM>/)
+
+    Le mtime est lu avant le listing : s'il n'a pas change apres coup,
+    le listing est complet.
+
+    Returns:
+        Tuple: (mtime_ns, dossiers de demande, sous-dossiers mensuels)
+    """
+    mtime = _mtime(chemin)
+    dossiers, shards = [], []
+    try:
+        with os.scandir(chemin) as entrees:
+            for entree in entrees:
+                if entree.is_dir():
+                    (shards if est_shard(entree.name) else dossiers).append(entree.path)
+    except OSError:
+        pass
+    return mtime, dossiers, shards
+
+
+def _examiner_dossier(type_credit: str, chemin_dossier: str,
+                      lire_si: Optional[Callable[[str, Tuple[int, int]], bool]]) -> Dict:
+    """Fichier de demande d'un dossier, sa signature et, si demande, son contenu (journal rejoue)"""
+    resultat = {"type_credit": type_credit, "chemin_dossier": chemin_dossier,
+                "chemin_json": None, "signature": None, "donnees": None}
+    try:
+        with os.scandir(chemin_dossier) as fichiers:
+            entree_json = next((f for f in fichiers if f.name.endswith("_data.json")), None)
+        if entree_json is None:
+            return resultat
+        resultat["chemin_json"] = entree_json.path
+        resultat["signature"] = signature_demande(entree_json.path, entree_json.stat())
+    except OSError:
+        return resultat
+
+    if lire_si is not None and lire_si(resultat["chemin_json"], resultat["signature"]):
+        resultat["donnees"] = lire_demande_journalisee(resultat["chemin_json"])
+    return resultat
+
+
+def scanner_dossiers(racine: str = DOSSIER_DEMANDES, nb_threads: int = NB_THREADS_SCAN_DOSSIERS,
+                     lire_si: Callable[[str, Tuple[int, int]], bool] = None) -> Dict:
+    """
+    Instantane des dossiers de demandes, parcourus en parallele
+
+    Les dossiers de type puis leurs sous-dossiers mensuels sont listes
+    simultanement, puis chaque dossier de demande est examine par un pool
+    de threads (os.scandir, un stat du _data.json et de son journal). Sur un
+    volume reseau, les allers-retours se recouvrent au lieu de s'additionner.
+    Si l'un de ces dossiers change pendant le parcours (creation,
+    suppression, deplacement par la migration), le parcours est repris pour
+    rendre un instantane coherent.
+
+    Args:
+        racine: Dossier racine des demandes
+        nb_threads: Operations de fichiers simultanees
+        lire_si: (chemin_json, signature) -> bool ; les demandes retenues sont
+                 lues (journal compris) dans le pool
+
+    Returns:
+        Dict: "dossiers" (type_credit, chemin_dossier, chemin_json, signature,
+              donnees ; tries par chemin), "mtimes_conteneurs" (dossiers de
+              type et mensuels), "coherent", "duree_ms"
+    """
+    debut = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, nb_threads)) as executeur:
+        for _ in range(NB_TENTATIVES_INSTANTANE):
+            mtimes_avant = {}
+            a_examiner = []
+            a_lister = [(type_credit, os.path.join(racine, type_credit)) for type_credit in TYPES_CREDIT]
+            while a_lister:
+                listes = executeur.map(lambda conteneur: lister_conteneur(conteneur[1]), a_lister)
+                suivants = []
+                for (type_credit, chemin), (mtime, dossiers, shards) in zip(a_lister, listes):
+                    mtimes_avant[chemin] = mtime
+                    a_examiner += [(type_credit, chemin_dossier) for chemin_dossier in dossiers]
+                    suivants += [(type_credit, chemin_shard) for chemin_shard in shards]
+                a_lister = suivants
+
+            futures = [executeur.submit(_examiner_dossier, type_credit, chemin_dossier, lire_si)
+                       for type_credit, chemin_dossier in a_examiner]
+            dossiers = [future.result() for future in futures]
+
+            mtimes_apres = dict(zip(mtimes_avant, executeur.map(_mtime, list(mtimes_avant))))
+            if mtimes_apres == mtimes_avant:
+                break
+
+    dossiers.sort(key=lambda d: d["chemin_dossier"])
+    return {
+        "dossiers": dossiers,
+        "mtimes_conteneurs": mtimes_apres,
+        "coherent": mtimes_apres == mtimes_avant,
+        "duree_ms": round((time.perf_counter() - debut) * 1000, 1)
+    }
+
+
+def signatures_paralleles(chemins_json: Iterable[str],
+                          nb_threads: int = NB_THREADS_SCAN_DOSSIERS) -> Dict[str, Optional[Tuple[int, int]]]:
+    """
+    Signatures (taille, mtime_ns) de plusieurs demandes, calculees en parallele
+
+    Returns:
+        Dict: chemin -> signature, None si le fichier n'existe plus
+    """
+    def signature(chemin):
+        try:
+            return signature_demande(chemin)
+        except OSError:
+            return None
+
+    chemins_json = list(chemins_json)
+    with ThreadPoolExecutor(max_workers=max(1, nb_threads)) as executeur:
+        return dict(zip(chemins_json, executeur.map(signature, chemins_json)))
+
+
+if __name__ == "__main__":
+    # Parcours complet chronometre : python -m backend.services.scanner_dossiers --threads 32
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parcours parallele des dossiers de demandes")
+    parser.add_argument("--racine", default=DOSSIER_DEMANDES)
+    parser.add_argument("--threads", type=int, default=NB_THREADS_SCAN_DOSSIERS)
+    parser.add_argument("--lire", action="store_true", help="Lire aussi toutes les demandes")
+    args = parser.parse_args()
+
+    instantane = scanner_dossiers(args.racine, args.threads, (lambda *_: True) if args.lire else None)
+    nb_json = sum(1 for d in instantane["dossiers"] if d["chemin_json"])
+    print(f"{len(instantane['dossiers'])} dossier(s), {nb_json} demande(s) en {instantane['duree_ms']} ms "
+          f"({args.threads} threads, instantane {'coherent' if instantane['coherent'] else 'instable'})")
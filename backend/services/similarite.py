@@ -0,0 +1,136 @@
+"""
+backend/services/similarite.py - Similarite de chaines tolerante aux erreurs OCR
+"""
+from backend.config import SEUILS_SIMILARITE_OCR, SEUIL_SIMILARITE_DEFAUT
+
+# Implementation C (optionnelle - si rapidfuzz est installe)
+try:
+    from rapidfuzz.distance import OSA, Levenshtein
+    RAPIDFUZZ_DISPONIBLE = True
+except ImportError:
+    RAPIDFUZZ_DISPONIBLE = False
+
+
+def distance_edition(texte1: str, texte2: str, borne: int = None, transpositions: bool = True) -> int:
+    """
+    Distance d'edition bornee (Levenshtein, ou Damerau restreinte avec transpositions)
+
+    Le calcul s'arrete des que la distance depasse la borne : le resultat
+    vaut alors borne + 1.
+
+    Args:
+        texte1 (str): Premiere chaine
+        texte2 (str): Seconde chaine
+        borne (int): Distance maximale utile (defaut: pas de borne)
+        transpositions (bool): Compter l'inversion de deux caracteres voisins comme une seule erreur
+
+    Returns:
+        int: Distance d'edition, ou borne + 1 si elle depasse la borne
+    """
+    if texte1 == texte2:
+        return 0
+
+    longueur1, longueur2 = len(texte1), len(texte2)
+    if borne is None:
+        borne = max(longueur1, longueur2)
+    if abs(longueur1 - longueur2) > borne:
+        return borne + 1
+
+    if RAPIDFUZZ_DISPONIBLE:
+        algorithme = OSA if transpositions else Levenshtein
+        return algorithme.distance(texte1, texte2, score_cutoff=borne)
+
+    # Programmation dynamique limitee a la bande |i - j| <= borne, avec sortie anticipee
+    hors_borne = borne + 1
+    avant_precedente = None
+    precedente = [j if j <= borne else hors_borne for j in range(longueur2 + 1)]
+    for i in range(1, longueur1 + 1):
+        caractere = texte1[i - 1]
+        courante = [hors_borne] * (longueur2 + 1)
+        if i <= borne:
+            courante[0] = i
+        for j in range(max(1, i - borne), min(longueur2, i + borne) + 1):
+            cout = 0 if caractere == texte2[j - 1] else 1
+            valeur = min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + cout)
+            if (transpositions and i > 1 and j > 1
+                    and caractere == texte2[j - 2] and texte1[i - 2] == texte2[j - 1]):
+                valeur = min(valeur, avant_precedente[j - 2] + 1)
+            courante[j] = min(valeur, hors_borne)
+
+        if min(courante) > borne:
+            return hors_borne
+        avant_precedente, precedente = precedente, courante
+
+    return precedente[longueur2]
+
+
+def trier_mots(texte: str) -> str:
+    """Mots tries par ordre alphabetique ("EL ALAOUI Karim" -> "ALAOUI EL Karim")"""
+    return ' '.join(sorted(texte.split()))
+
+
+def ratio_mots_tries(texte1: str, texte2: str) -> float:
+    """
+    Similarite entre 0 et 1 des textes aux mots tries (insensible a l'ordre des mots)
+
+    Returns:
+        float: 1 - distance / longueur de la plus longue chaine
+    """
+    tries1, tries2 = trier_mots(texte1), trier_mots(texte2)
+    longueur = max(len(tries1), len(tries2))
+    if longueur == 0:
+        return 1.0
+    return 1 - distance_edition(tries1, tries2) / longueur
+
+
+def sont_similaires(texte1: str, texte2: str, champ: str = None, seuil: float = None) -> bool:
+    """
+    Indique si deux valeurs normalisees designent la meme chose malgre le bruit OCR
+
+    La similarite aux mots tries doit atteindre le seuil du champ
+    (SEUILS_SIMILARITE_OCR). La distance n'est calculee que jusqu'a la borne
+    deduite de ce seuil.
+
+    Args:
+        texte1 (str): Premiere valeur normalisee
+        texte2 (str): Seconde valeur normalisee
+        champ (str): Champ compare (nom, prenom, employeur...)
+        seuil (float): Similarite minimale, a la place du seuil du champ
+
+    Returns:
+        bool: True si les valeurs sont considerees identiques
+    """
+    if texte1 == texte2:
+        return True
+    if not texte1 or not texte2:
+        return False
+
+    if seuil is None:
+        seuil = SEUILS_SIMILARITE_OCR.get(champ, SEUIL_SIMILARITE_DEFAUT)
+    tries1, tries2 = trier_mots(texte1), trier_mots(texte2)
+    if tries1 == tries2:
+        return True
+
+    borne = int((1 - seuil) * max(len(tries1), len(tries2)) + 1e-9)
+    return distance_edition(tries1, tries2, borne) <= borne
+
+
+def grouper_valeurs_similaires(valeurs, champ: str = None, seuil: float = None) -> list:
+    """
+    Regroupe des valeurs normalisees similaires
+
+    Seules les valeurs distinctes sont comparees, chacune au representant
+    de chaque groupe existant.
+
+    Returns:
+        list: Liste de groupes (listes de valeurs distinctes)
+    """
+    groupes = []
+    for valeur in dict.fromkeys(valeurs):
+        for groupe in groupes:
+            if sont_similaires(valeur, groupe[0], champ, seuil):
+                groupe.append(valeur)
+                break
+        else:
+            groupes.append([valeur])
+    return groupes
@@ -0,0 +1,129 @@
+"""
+backend/services/surveillance_demandes.py - Surveillance de data/demandes_clients (inotify, FSEvents... via watchdog)
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+from backend.config import DOSSIER_DEMANDES, TYPES_CREDIT, DELAI_REGROUPEMENT_SURVEILLANCE_MS, SUFFIXE_JOURNAL_DEMANDE
+from backend.services.chemins_dossiers import est_shard
+
+# Dependance optionnelle : sans watchdog, le cache des demandes reste a jour par ses stat() periodiques
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_DISPONIBLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_DISPONIBLE = False
+
+# Fichiers d'un dossier dont l'ecriture change la demande (les PDF, rapports et fichiers temporaires sont ignores)
+SUFFIXES_SURVEILLES = ("_data.json", SUFFIXE_JOURNAL_DEMANDE)
+
+
+class SurveillanceDemandes(FileSystemEventHandler):
+    """
+    Pousse les changements du disque vers le cache des demandes
+
+    Chaque evenement (creation, modification, suppression, deplacement) est
+    ramene au dossier de demande ou au dossier de type/mensuel concerne.
+    Les evenements sont regroupes pendant DELAI_REGROUPEMENT_SURVEILLANCE_MS,
+    puis le cache relit uniquement ces dossiers et reporte les changements
+    dans l'index et son flux (changements_depuis), sans attendre qu'une
+    session admin le sollicite.
+    """
+
+    def __init__(self, cache, racine: str = DOSSIER_DEMANDES,
+                 delai_regroupement_ms: float = DELAI_REGROUPEMENT_SURVEILLANCE_MS):
+        self.cache = cache
+        self.racine = os.path.abspath(racine)
+        self.delai_regroupement = delai_regroupement_ms / 1000
+        self._observateur = None
+        self._verrou = threading.Lock()
+        self._en_attente = set()
+        self._minuterie = None
+        self._statistiques = {"evenements": 0, "evenements_ignores": 0, "lots": 0, "dossiers_signales": 0,
+                              "erreurs": 0}
+
+    def demarrer(self) -> bool:
+        """
+        Demarre l'observateur (thread de watchdog)
+
+        Returns:
+            bool: False si watchdog n'est pas installe ou si le dossier n'existe pas
+        """
+        if not WATCHDOG_DISPONIBLE or self._observateur is not None or not os.path.isdir(self.racine):
+            return False
+        self._observateur = Observer()
+        self._observateur.schedule(self, self.racine, recursive=True)
+        self._observateur.daemon = True
+        self._observateur.start()
+        return True
+
+    def arreter(self):
+        if self._observateur is not None:
+            self._observateur.stop()
+            self._observateur.join(timeout=5)
+            self._observateur = None
+
+    @property
+    def active(self) -> bool:
+        return self._observateur is not None and self._observateur.is_alive()
+
+    def statistiques(self) -> Dict:
+        with self._verrou:
+            stats = dict(self._statistiques)
+        stats["active"] = self.active
+        stats["watchdog_disponible"] = WATCHDOG_DISPONIBLE
+        return stats
+
+    def dossier_concerne(self, chemin: str) -> Optional[str]:
+        """
+        Dossier a relire pour un chemin du disque
+
+        Returns:
+            Optional[str]: Dossier de demande (fichier surveille ou dossier lui-meme),
+                           dossier de type ou mensuel (creation, suppression), None a ignorer
+        """
+        relatif = os.path.relpath(os.path.abspath(chemin), self.racine)
+        parties = relatif.split(os.sep)
+        if parties[0] not in TYPES_CREDIT:
+            return None
+
+        profondeur = 3 if len(parties) > 1 and est_shard(parties[1]) else 2  # <type>/<AAMM>/<REF> ou <type>/<Nom - REF>
+        if len(parties) <= profondeur:
+            return os.path.join(self.racine, *parties)  # Dossier de demande, de type ou mensuel
+        if len(parties) == profondeur + 1 and parties[-1].endswith(SUFFIXES_SURVEILLES):
+            return os.path.join(self.racine, *parties[:profondeur])
+        return None
+
+    def on_any_event(self, event):
+        chemins = [event.src_path, getattr(event, "dest_path", None)]
+        dossiers = {self.dossier_concerne(chemin) for chemin in chemins if chemin} - {None}
+        with self._verrou:
+            self._statistiques["evenements"] += 1
+            if not dossiers:
+                self._statistiques["evenements_ignores"] += 1
+                return
+            self._en_attente |= dossiers
+            if self._minuterie is None:
+                self._minuterie = threading.Timer(self.delai_regroupement, self._appliquer)
+                self._minuterie.daemon = True
+                self._minuterie.start()
+
+    def _appliquer(self):
+        """Signale au cache les dossiers touches pendant le regroupement, puis l'actualise"""
+        with self._verrou:
+            dossiers, self._en_attente = self._en_attente, set()
+            self._minuterie = None
+            self._statistiques["lots"] += 1
+            self._statistiques["dossiers_signales"] += len(dossiers)
+
+        for chemin_dossier in dossiers:
+            self.cache.invalider(chemin_dossier)
+        try:
+            self.cache.actualiser()
+        except Exception:
+            with self._verrou:
+                self._statistiques["erreurs"] += 1  # Rattrape par la verification periodique du cache
@@ -4,6 +4,8 @@ backend/services/validations.py - Fonctions de validation des données
 import re
 from datetime import date
 
+from backend.services.normalisation import compacter_espaces
+
 
 def calculer_age(date_naissance):
     """
@@ -135,10 +137,5 @@ def nettoyer_texte(texte):
     if not isinstance(texte, str):
         return ""
 
-    # Suppression des espaces en début et fin de chaîne
-    texte = texte.strip()
-
-    # Remplacement des espaces multiples par un seul espace
-    texte = re.sub(r'\s+', ' ', texte)
-
-    return texte
+    # Suppression des espaces en début et fin de chaîne et des espaces multiples
+    return compacter_espaces(texte)
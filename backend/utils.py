@@ -3,74 +3,98 @@ backend/utils.py - Fonctions utilitaires pour l'application
 """
 import os
 import json
+import logging
+import sqlite3
 import streamlit as st
-from datetime import date
+from datetime import date, datetime
 from typing import List, Dict, Optional
 
-from backend.config import DOSSIER_DEMANDES
+from backend.config import FICHIER_STATUT_TRAITEMENT, DELAI_HEARTBEAT_OCR
+from backend.services.index_demandes import (
+    lire_dossiers_demandes,
+    signaler_changement_ocr,
+    synchroniser_demande,
+    trouver_chemin_dossier
+)
+from backend.services.cache_demandes import CacheDemandes
+from backend.services.surveillance_demandes import SurveillanceDemandes
+from backend.services.chemins_dossiers import nom_dossier_historique, resoudre_dossier
+from backend.services.journal_demandes import (
+    journaliser_modification,
+    ecrire_json_atomique,
+    verrouiller_fichier,
+    deverrouiller_fichier
+)
 
+logger = logging.getLogger(__name__)
 
-def charger_toutes_demandes() -> List[Dict]:
-    """
-    Charge toutes les demandes de crédit depuis les dossiers
+# Champs saisis dans la gestion des demandes, journalises avec le statut
+CHAMPS_JOURNALISES = ["commentaire", "conseiller"]
 
-    Returns:
-        List[Dict]: Liste de dictionnaires contenant les données des demandes
-    """
-    demandes = []
+# Libellés des types de crédit dans les pages d'analyse
+LIBELLES_TYPES_CREDIT = {"auto": "Auto", "immo": "Immobilier", "conso": "Consommation", "decouvert": "Découvert"}
 
-    # Types de crédit et leurs dossiers
-    types_credit = {
-        "auto": "auto",
-        "immo": "immo",
-        "conso": "conso",
-        "decouvert": "decouvert"
-    }
-
-    if not os.path.exists(DOSSIER_DEMANDES):
-        return demandes
+# Statuts d'une demande encore en cours d'instruction
+STATUTS_EN_COURS = ["En attente", "En cours d'analyse", "En cours de traitement"]
 
-    for type_credit, dossier in types_credit.items():
-        chemin_base = os.path.join(DOSSIER_DEMANDES, dossier)
+# Fichiers internes d'un dossier (verrous, temporaires, empreintes des rapports), jamais presentes comme documents
+SUFFIXES_FICHIERS_INTERNES = (".verrou", ".tmp", ".sha256")
 
-        if not os.path.exists(chemin_base):
-            continue
 
-        for nom_dossier in os.listdir(chemin_base):
-            chemin_dossier = os.path.join(chemin_base, nom_dossier)
+@st.cache_resource
+def obtenir_cache_demandes() -> CacheDemandes:
+    """Cache des demandes unique pour le processus, partagé par toutes les sessions"""
+    return CacheDemandes()
 
-            if not os.path.isdir(chemin_dossier):
-                continue
 
-            # Chercher le fichier JSON de données
-            for fichier in os.listdir(chemin_dossier):
-                if fichier.endswith("_data.json"):
-                    chemin_json = os.path.join(chemin_dossier, fichier)
+@st.cache_resource
+def obtenir_surveillance_demandes() -> SurveillanceDemandes:
+    """
+    Surveillance du disque unique pour le processus (sans effet si watchdog
+    n'est pas installé) : les changements arrivent dans le cache et le flux
+    de l'index sans attendre une interaction
+    """
+    surveillance = SurveillanceDemandes(obtenir_cache_demandes())
+    surveillance.demarrer()
+    return surveillance
 
-                    try:
-                        with open(chemin_json, "r", encoding='utf-8') as f:
-                            donnees = json.load(f)
 
-                            if "type_credit" not in donnees:
-                                donnees["type_credit"] = type_credit
+def actualiser_demandes():
+    """
+    Reporte dans l'index des demandes les changements des dossiers, pour les
+    pages qui l'interrogent directement (listes paginées)
+    """
+    try:
+        obtenir_cache_demandes().actualiser()
+    except (OSError, sqlite3.Error):
+        pass
 
-                            if "statut" not in donnees:
-                                donnees["statut"] = "En attente"
 
-                            donnees["chemin_dossier"] = chemin_dossier
-                            donnees["nom_dossier"] = nom_dossier
+def charger_toutes_demandes() -> List[Dict]:
+    """
+    Charge toutes les demandes de crédit
 
-                            demandes.append(donnees)
-                            break
-                    except:
-                        continue
+    Les demandes viennent du cache partagé (amorcé depuis l'index SQLite), qui
+    ne relit que les _data.json modifiés depuis l'appel précédent. En cas
+    d'erreur du cache, les dossiers sont relus directement.
 
-    return demandes
+    Returns:
+        List[Dict]: Liste de dictionnaires contenant les données des demandes
+    """
+    try:
+        return obtenir_cache_demandes().obtenir()
+    except (OSError, sqlite3.Error):
+        return [demande for _, _, _, _, demande in lire_dossiers_demandes()]
 
 
 def obtenir_chemin_dossier(demande: Dict, type_credit: str) -> Optional[str]:
     """
-    Obtient le chemin du dossier d'une demande avec format Nom Prenom - REF
+    Obtient le chemin du dossier d'une demande
+
+    La recherche porte sur la référence exacte : chemin connu de la demande,
+    emplacement <type>/<AAMM>/<REF> (ou ancien <type>/<Nom - REF> tant que
+    la migration n'est pas terminée), puis index des demandes. Aucun
+    parcours du dossier du type de crédit.
 
     Args:
         demande (Dict): Données de la demande
@@ -79,28 +103,27 @@ def obtenir_chemin_dossier(demande: Dict, type_credit: str) -> Optional[str]:
     Returns:
         Optional[str]: Chemin du dossier ou None si non trouvé
     """
-    if "chemin_dossier" in demande and os.path.exists(demande["chemin_dossier"]):
+    if "chemin_dossier" in demande and os.path.isdir(demande["chemin_dossier"]):
         return demande["chemin_dossier"]
 
-    chemin_base = os.path.join(DOSSIER_DEMANDES, type_credit)
     ref_demande = demande.get('ref_demande', '')
-    nom = demande.get('nom', '')
+    if not ref_demande:
+        return None
 
-    if os.path.exists(chemin_base):
-        for dossier in os.listdir(chemin_base):
-            if ref_demande and f" - {ref_demande}" in dossier:
-                return os.path.join(chemin_base, dossier)
-            elif nom and nom.lower() in dossier.lower():
-                return os.path.join(chemin_base, dossier)
-            elif ref_demande and ref_demande in dossier:
-                return os.path.join(chemin_base, dossier)
+    chemin_canonique = resoudre_dossier(type_credit, ref_demande, demande.get('nom', ''))
+    if chemin_canonique:
+        return chemin_canonique
 
-    return None
+    try:
+        return trouver_chemin_dossier(ref_demande, type_credit)
+    except sqlite3.Error:
+        return None
 
 
 def generer_nom_dossier(nom_complet: str, ref_demande: str) -> str:
     """
-    Génère le nom du dossier selon le format Nom Prenom - REF
+    Génère le nom du dossier selon le format Nom Prenom - REF (ancienne
+    arborescence ; les nouveaux dossiers sont rangés sous <type>/<AAMM>/<REF>)
 
     Args:
         nom_complet (str): Nom complet du client
@@ -109,17 +132,17 @@ def generer_nom_dossier(nom_complet: str, ref_demande: str) -> str:
     Returns:
         str: Nom du dossier formaté
     """
-    if not nom_complet or not ref_demande:
-        return f"Client - {ref_demande}" if ref_demande else "Client"
-
-    # Format final : Nom Prenom - REF
-    return f"{nom_complet.strip()} - {ref_demande}"
+    return nom_dossier_historique(nom_complet, ref_demande)
 
 
 def sauvegarder_statut_demande(demande: Dict, nouveau_statut: str, type_credit: str) -> bool:
     """
     Sauvegarde le nouveau statut d'une demande
 
+    Le statut, le commentaire et le conseiller sont ajoutés au journal de la
+    demande ({ref}_journal.jsonl) : une ligne par changement, sans réécrire
+    {ref}_data.json, et sans risque d'entrelacement entre deux sauvegardes.
+
     Args:
         demande (Dict): Données de la demande
         nouveau_statut (str): Nouveau statut à appliquer
@@ -135,19 +158,28 @@ def sauvegarder_statut_demande(demande: Dict, nouveau_statut: str, type_credit:
     ref_demande = demande.get('ref_demande', 'demande')
     chemin_json = os.path.join(chemin_dossier, f"{ref_demande}_data.json")
 
-    demande["statut"] = nouveau_statut
-    demande["date_mise_a_jour"] = date.today().isoformat()
+    champs = {"statut": nouveau_statut, "date_mise_a_jour": date.today().isoformat()}
+    for cle in CHAMPS_JOURNALISES:
+        if cle in demande:
+            champs[cle] = demande[cle]
 
     if "admin_user" in st.session_state:
-        demande["modifie_par"] = st.session_state.admin_user
+        champs["modifie_par"] = st.session_state.admin_user
 
     try:
-        with open(chemin_json, "w", encoding='utf-8') as f:
-            json.dump(demande, f, default=str, ensure_ascii=False, indent=2)
-        return True
-    except:
+        if os.path.exists(chemin_json):
+            journaliser_modification(chemin_json, champs)
+        else:
+            ecrire_json_atomique(chemin_json, {**demande, **champs})
+    except OSError:
         return False
 
+    demande.update(champs)
+
+    synchroniser_demande(demande, type_credit, chemin_dossier)
+    obtenir_cache_demandes().invalider(chemin_dossier)
+    return True
+
 
 def get_statut_couleur(statut: str) -> str:
     """
@@ -214,6 +246,10 @@ def lister_fichiers_dossier(chemin_dossier: str) -> List[Dict]:
     """
     Liste tous les fichiers d'un dossier avec leurs informations
 
+    Un seul os.scandir : le type de chaque entrée vient du listing, sans
+    isfile() ni stat() supplémentaire par nom (allers-retours réseau). Les
+    fichiers internes (SUFFIXES_FICHIERS_INTERNES) sont ignorés.
+
     Args:
         chemin_dossier (str): Chemin du dossier
 
@@ -222,22 +258,29 @@ def lister_fichiers_dossier(chemin_dossier: str) -> List[Dict]:
     """
     fichiers = []
 
-    if not os.path.exists(chemin_dossier):
+    try:
+        entrees = os.scandir(chemin_dossier)
+    except OSError:
         return fichiers
 
-    for nom_fichier in os.listdir(chemin_dossier):
-        chemin_fichier = os.path.join(chemin_dossier, nom_fichier)
-
-        if os.path.isfile(chemin_fichier):
-            stat_fichier = os.stat(chemin_fichier)
+    with entrees:
+        for entree in entrees:
+            if entree.name.endswith(SUFFIXES_FICHIERS_INTERNES):
+                continue
+            try:
+                if not entree.is_file():
+                    continue
+                stat_fichier = entree.stat()
+            except OSError:
+                continue
 
             fichier_info = {
-                "nom": nom_fichier,
-                "chemin": chemin_fichier,
+                "nom": entree.name,
+                "chemin": entree.path,
                 "taille": stat_fichier.st_size,
                 "date_modification": date.fromtimestamp(stat_fichier.st_mtime),
-                "extension": os.path.splitext(nom_fichier)[1].lower(),
-                "type": determiner_type_fichier(nom_fichier)
+                "extension": os.path.splitext(entree.name)[1].lower(),
+                "type": determiner_type_fichier(entree.name)
             }
 
             fichiers.append(fichier_info)
@@ -314,3 +357,93 @@ def formater_taille_fichier(taille_bytes: int) -> str:
         return f"{taille_bytes / 1024:.1f} KB"
     else:
         return f"{taille_bytes / (1024 * 1024):.1f} MB"
+
+
+def lire_statut_traitement(chemin_dossier: str) -> Optional[Dict]:
+    """
+    Lit le fichier de statut du traitement OCR d'un dossier
+
+    Args:
+        chemin_dossier (str): Chemin du dossier
+
+    Returns:
+        Optional[Dict]: Statut du traitement ou None si absent/illisible
+    """
+    chemin_statut = os.path.join(chemin_dossier, FICHIER_STATUT_TRAITEMENT)
+    if not os.path.exists(chemin_statut):
+        return None
+
+    try:
+        with open(chemin_statut, "r", encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def mettre_a_jour_statut_traitement(chemin_dossier: str, **champs) -> Dict:
+    """
+    Fusionne des champs dans le statut du traitement OCR et rafraichit le heartbeat
+
+    Lecture, fusion et ecriture se font sous un verrou de fichier : pipeline,
+    worker, superviseur et page admin ecrivent ce statut en concurrence. Le
+    renommage d'un fichier temporaire unique evite tout statut tronque. Un
+    changement de "status" est note dans le flux des changements de l'index.
+
+    Args:
+        chemin_dossier (str): Chemin du dossier
+        **champs: Champs a mettre a jour (status, etape, pages_traitees...)
+
+    Returns:
+        Dict: Statut complet apres mise a jour
+    """
+    chemin_statut = os.path.join(chemin_dossier, FICHIER_STATUT_TRAITEMENT)
+    statut = dict(champs)
+    ancien_status = None
+    try:
+        with open(f"{chemin_statut}.verrou", "a+b") as verrou:
+            verrouiller_fichier(verrou)
+            try:
+                statut = lire_statut_traitement(chemin_dossier) or {}
+                ancien_status = statut.get("status")
+                statut.update(champs)
+                statut["heartbeat"] = datetime.now().isoformat()
+                ecrire_json_atomique(chemin_statut, statut)
+            finally:
+                deverrouiller_fichier(verrou)
+    except OSError as e:
+        logger.warning("Ecriture du statut de traitement %s impossible : %s", chemin_statut, e)
+        return statut
+
+    if statut.get("status") != ancien_status:
+        try:
+            signaler_changement_ocr(chemin_dossier, statut.get("status"))
+        except sqlite3.Error:
+            pass
+
+    return statut
+
+
+def traitement_est_interrompu(statut: Optional[Dict], delai: int = DELAI_HEARTBEAT_OCR) -> bool:
+    """
+    Detecte un traitement reste "processing" dont le heartbeat est perime
+
+    Args:
+        statut (Optional[Dict]): Statut lu par lire_statut_traitement
+        delai (int): Delai en secondes sans heartbeat avant interruption
+
+    Returns:
+        bool: True si le traitement semble mort et peut etre repris
+    """
+    if not statut or statut.get("status") != "processing":
+        return False
+
+    dernier_signe = statut.get("heartbeat") or statut.get("start_time")
+    if not dernier_signe:
+        return True
+
+    try:
+        ecoule = datetime.now() - datetime.fromisoformat(dernier_signe)
+    except (TypeError, ValueError):
+        return True
+
+    return ecoule.total_seconds() > delai
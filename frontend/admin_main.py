@@ -1,14 +1,32 @@
 """
 frontend/admin_main.py - Orchestrateur principal des modules d'administration
 """
+import sqlite3
 import streamlit as st
 
+from backend.config import INTERVALLE_FLUX_ADMIN_S
 from backend.auth import (
     gerer_authentification,
     afficher_info_utilisateur,
     deconnecter_utilisateur
 )
-from backend.utils import charger_toutes_demandes, formater_montant, get_statut_couleur
+from backend.utils import (
+    actualiser_demandes,
+    formater_montant,
+    get_statut_couleur,
+    obtenir_cache_demandes,
+    obtenir_surveillance_demandes
+)
+from backend.services.index_demandes import (
+    changements_depuis,
+    interroger_demandes,
+    statistiques_demandes,
+    version_demandes,
+    CHANGEMENT_DEMANDE,
+    CHANGEMENT_OCR,
+    CHANGEMENT_SUPPRESSION
+)
+from backend.services.instantane_demandes import tableau_demandes
 from frontend.pages.dashboard import afficher_tableau_bord_general
 from frontend.pages.gestion_credits import afficher_gestion_credit
 from frontend.pages.gestion_clients import afficher_gestion_clients
@@ -29,8 +47,13 @@ def main():
     if not gerer_authentification():
         return
 
-    # Charger les données une seule fois
-    demandes_toutes = charger_toutes_demandes()
+    # Index des demandes à jour ; la liste complète n'est chargée que par les pages qui l'agrègent
+    obtenir_surveillance_demandes()
+    actualiser_demandes()
+    try:
+        st.session_state["version_affichee"] = version_demandes()
+    except sqlite3.Error:
+        st.session_state["version_affichee"] = None
 
     # Sidebar de navigation
     with st.sidebar:
@@ -48,27 +71,81 @@ def main():
             ]
         )
 
+        afficher_notifications_demandes()
+
+        with st.expander("⏱️ Cache des demandes"):
+            stats_cache = obtenir_cache_demandes().statistiques()
+            st.caption(
+                f"{stats_cache['nb_demandes']} demandes · {stats_cache['hits']} hits / {stats_cache['miss']} miss · "
+                f"dernier appel {stats_cache['duree_dernier_appel_ms']:.1f} ms"
+            )
+            stats_surveillance = obtenir_surveillance_demandes().statistiques()
+            st.caption(
+                f"Surveillance du disque : {'active' if stats_surveillance['active'] else 'inactive (scrutation)'} · "
+                f"version {(st.session_state.get('version_affichee') or (None, None))[1]}"
+            )
+            st.json({"cache": stats_cache, "surveillance": stats_surveillance}, expanded=False)
+
     # Orchestration des pages
     if page == "📊 Dashboard":
-        afficher_tableau_bord_general(demandes_toutes)
+        afficher_tableau_bord_general(tableau_demandes())
 
     elif page == "💳 Gestion des Crédits":
-        orchestrer_gestion_credits(demandes_toutes)
+        orchestrer_gestion_credits()
 
     elif page == "👥 Gestion des Clients":
-        afficher_gestion_clients(demandes_toutes)
+        afficher_gestion_clients(tableau_demandes())
 
     elif page == "🔓 Déconnexion":
         deconnecter_utilisateur()
         st.rerun()
 
 
-def orchestrer_gestion_credits(demandes_toutes):
+def _fragment_periodique(fonction):
+    """st.fragment(run_every=...) si disponible (Streamlit >= 1.37), sinon affichage à chaque rerun"""
+    fragment = getattr(st, "fragment", None)
+    return fragment(run_every=INTERVALLE_FLUX_ADMIN_S)(fonction) if fragment else fonction
+
+
+@_fragment_periodique
+def afficher_notifications_demandes():
+    """Signale les changements arrivés depuis l'affichage de la page, sans la recharger"""
+    if st.session_state.get("version_affichee") is None:
+        return
+    epoque, version = st.session_state["version_affichee"]
+    actualiser_demandes()
+    try:
+        flux = changements_depuis(version, epoque)
+    except sqlite3.Error:
+        return
+
+    if not flux["complet"]:
+        nb_demandes, nb_ocr = 1, 0
+    else:
+        dossiers = {c["chemin_dossier"] for c in flux["changements"]
+                    if c["nature"] in (CHANGEMENT_DEMANDE, CHANGEMENT_SUPPRESSION)}
+        nb_demandes = len(dossiers)
+        nb_ocr = len({c["chemin_dossier"] for c in flux["changements"]
+                      if c["nature"] == CHANGEMENT_OCR and c["detail"] in ("completed", "error")})
+    if not nb_demandes and not nb_ocr:
+        return
+
+    message = []
+    if nb_demandes:
+        message.append(f"{nb_demandes} demande(s) modifiée(s)" if flux["complet"] else "Demandes modifiées")
+    if nb_ocr:
+        message.append(f"{nb_ocr} traitement(s) OCR terminé(s)")
+    st.info("🔔 " + " · ".join(message))
+    if st.button("🔄 Actualiser", key="actualiser_changements"):
+        st.rerun()
+
+
+def orchestrer_gestion_credits():
     """Orchestre l'interface de gestion des crédits par type"""
 
     st.title("💳 Gestion des Demandes de Crédit")
 
-    if not demandes_toutes:
+    if not statistiques_demandes()["total"]:
         st.info("📋 Aucune demande de crédit pour le moment.")
         return
 
@@ -95,39 +172,23 @@ def orchestrer_gestion_credits(demandes_toutes):
     }
 
     if type_choisi == "📊 Vue globale":
-        afficher_vue_globale_credits(demandes_toutes)
+        afficher_vue_globale_credits()
     else:
         type_credit, titre = mapping[type_choisi]
-        demandes_filtrees = filtrer_par_type(demandes_toutes, type_credit)
-        afficher_gestion_credit(titre, demandes_filtrees, type_credit)
-
+        afficher_gestion_credit(titre, type_credit)
 
-def filtrer_par_type(demandes_toutes, type_credit):
-    """Filtre les demandes par type de crédit"""
-    return [
-        demande for demande in demandes_toutes
-        if demande.get("type_credit") == type_credit
-    ]
 
-
-def afficher_vue_globale_credits(demandes_toutes):
+def afficher_vue_globale_credits():
     """Affiche une vue globale avec statistiques par type"""
 
     st.header("📊 Vue d'ensemble des demandes")
 
     # Compter par type
     stats_types = {
-        "auto": 0,
-        "immo": 0,
-        "conso": 0,
-        "decouvert": 0
+        type_credit: statistiques_demandes(type_credit=type_credit)["total"]
+        for type_credit in ["auto", "immo", "conso", "decouvert"]
     }
 
-    for demande in demandes_toutes:
-        type_credit = demande.get("type_credit", "")
-        if type_credit in stats_types:
-            stats_types[type_credit] += 1
-
     # Afficher les métriques
     col1, col2, col3, col4 = st.columns(4)
 
@@ -146,14 +207,15 @@ def afficher_vue_globale_credits(demandes_toutes):
     for type_credit, count in stats_types.items():
         if count > 0:
             with st.expander(f"Détails {type_credit.upper()} ({count} demandes)"):
-                demandes_type = filtrer_par_type(demandes_toutes, type_credit)
+                dernieres = interroger_demandes(type_credit=type_credit, tri="date_desc", par_page=5,
+                                                champs=["nom", "montant", "statut"])
 
-                for demande in demandes_type[-5:]:
+                for demande in dernieres["demandes"]:
                     col1, col2, col3 = st.columns([2, 1, 1])
                     with col1:
                         st.write(f"**{demande.get('nom', 'N/A')}**")
                     with col2:
-                        st.write(formater_montant(demande.get('montant', 0)))
+                        st.write(formater_montant(demande.get('montant') or 0))
                     with col3:
                         statut = demande.get('statut', 'En attente')
                         st.write(f"{get_statut_couleur(statut)} {statut}")
@@ -6,13 +6,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 import json
-import uuid
-from datetime import datetime, date
+from datetime import date
 
 from backend.services.calcul import calcul_mensualite, calculer_tableau_amortissement, get_taux_endettement
 from backend.services.validations import calculer_age, valider_email, valider_telephone
 from backend.services.fichiers import sauvegarder_fichier
-from backend.config import DOSSIER_AUTO
+from backend.services.index_identites import indexer_demande
+from backend.services.index_demandes import synchroniser_demande
+from backend.services.chemins_dossiers import generer_reference, creer_dossier_demande
 from frontend.forms.credit_auto.recapitulatif import generer_pdf_recapitulatif
 
 
@@ -268,12 +269,8 @@ def run():
                     return
 
                 try:
-                    reference_demande = f"AUTO-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
-                    nom_dossier = f"{nom.strip()} - {reference_demande}"
-
-                    os.makedirs(DOSSIER_AUTO, exist_ok=True)
-                    chemin_dossier = os.path.join(DOSSIER_AUTO, nom_dossier)
-                    os.makedirs(chemin_dossier, exist_ok=True)
+                    reference_demande = generer_reference("AUTO")
+                    chemin_dossier = creer_dossier_demande("auto", reference_demande)
 
                     donnees_formulaire = {
                         "nom": nom,
@@ -322,6 +319,8 @@ def run():
                     chemin_json = os.path.join(chemin_dossier, f"{reference_demande}_data.json")
                     with open(chemin_json, "w", encoding='utf-8') as f:
                         json.dump(donnees_formulaire, f, default=str, ensure_ascii=False, indent=2)
+                    indexer_demande(donnees_formulaire, "auto")
+                    synchroniser_demande(donnees_formulaire, "auto", chemin_dossier)
 
                     st.session_state.demande_soumise = True
                     st.session_state.reference_demande = reference_demande
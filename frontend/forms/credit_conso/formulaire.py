@@ -4,13 +4,14 @@ frontend/forms/credit_conso/formulaire.py - Formulaire de crédit consommation
 import streamlit as st
 import os
 import json
-import uuid
-from datetime import datetime, date
+from datetime import date
 
 from backend.services.calcul import calcul_mensualite, get_taux_endettement
 from backend.services.validations import valider_email, valider_telephone
 from backend.services.fichiers import sauvegarder_fichier
-from backend.config import DOSSIER_CONSO
+from backend.services.index_identites import indexer_demande
+from backend.services.index_demandes import synchroniser_demande
+from backend.services.chemins_dossiers import generer_reference, creer_dossier_demande
 from frontend.forms.credit_conso.recapitulatif import generer_pdf_recapitulatif
 
 
@@ -91,12 +92,8 @@ def run():
                     return
 
                 try:
-                    reference = f"CONSO-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
-                    nom_dossier = f"{nom.strip()} - {reference}"
-
-                    os.makedirs(DOSSIER_CONSO, exist_ok=True)
-                    chemin_dossier = os.path.join(DOSSIER_CONSO, nom_dossier)
-                    os.makedirs(chemin_dossier, exist_ok=True)
+                    reference = generer_reference("CONSO")
+                    chemin_dossier = creer_dossier_demande("conso", reference)
 
                     donnees = {
                         "nom": nom, "naissance": naissance, "telephone": telephone, "email": email,
@@ -118,6 +115,8 @@ def run():
 
                     with open(os.path.join(chemin_dossier, f"{reference}_data.json"), "w", encoding='utf-8') as f:
                         json.dump(donnees, f, default=str, ensure_ascii=False, indent=2)
+                    indexer_demande(donnees, "conso")
+                    synchroniser_demande(donnees, "conso", chemin_dossier)
 
                     st.session_state.demande_soumise = True
                     st.session_state.reference_demande = reference
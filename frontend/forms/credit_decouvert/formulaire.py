@@ -4,12 +4,13 @@ frontend/forms/credit_decouvert/formulaire.py - Formulaire de découvert bancair
 import streamlit as st
 import os
 import json
-import uuid
-from datetime import datetime, date
+from datetime import date
 
 from backend.services.validations import valider_email, valider_telephone
 from backend.services.fichiers import sauvegarder_fichier
-from backend.config import DOSSIER_DECOUVERT
+from backend.services.index_identites import indexer_demande
+from backend.services.index_demandes import synchroniser_demande
+from backend.services.chemins_dossiers import generer_reference, creer_dossier_demande
 from frontend.forms.credit_decouvert.recapitulatif import generer_pdf_recapitulatif
 
 
@@ -67,12 +68,8 @@ def run():
                 return
 
             try:
-                reference = f"DEC-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
-                nom_dossier = f"{nom.strip()} - {reference}"
-
-                os.makedirs(DOSSIER_DECOUVERT, exist_ok=True)
-                chemin_dossier = os.path.join(DOSSIER_DECOUVERT, nom_dossier)
-                os.makedirs(chemin_dossier, exist_ok=True)
+                reference = generer_reference("DEC")
+                chemin_dossier = creer_dossier_demande("decouvert", reference)
 
                 donnees = {
                     "nom": nom, "naissance": naissance, "telephone": telephone, "email": email,
@@ -95,6 +92,8 @@ def run():
 
                 with open(os.path.join(chemin_dossier, f"{reference}_data.json"), "w", encoding='utf-8') as f:
                     json.dump(donnees, f, default=str, ensure_ascii=False, indent=2)
+                indexer_demande(donnees, "decouvert")
+                synchroniser_demande(donnees, "decouvert", chemin_dossier)
 
                 st.session_state.demande_soumise = True
                 st.session_state.reference_demande = reference
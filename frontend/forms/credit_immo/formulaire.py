@@ -4,13 +4,14 @@ frontend/forms/credit_immo/formulaire.py - Formulaire de crédit immobilier
 import streamlit as st
 import os
 import json
-import uuid
-from datetime import datetime, date
+from datetime import date
 
 from backend.services.calcul import calcul_mensualite, get_taux_endettement
 from backend.services.validations import valider_email, valider_telephone
 from backend.services.fichiers import sauvegarder_fichier
-from backend.config import DOSSIER_IMMO
+from backend.services.index_identites import indexer_demande
+from backend.services.index_demandes import synchroniser_demande
+from backend.services.chemins_dossiers import generer_reference, creer_dossier_demande
 from frontend.forms.credit_immo.recapitulatif import generer_pdf_recapitulatif
 
 
@@ -126,12 +127,8 @@ def run():
                     return
 
                 try:
-                    reference_demande = f"IMMO-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
-                    nom_dossier = f"{nom.strip()} - {reference_demande}"
-
-                    os.makedirs(DOSSIER_IMMO, exist_ok=True)
-                    chemin_dossier = os.path.join(DOSSIER_IMMO, nom_dossier)
-                    os.makedirs(chemin_dossier, exist_ok=True)
+                    reference_demande = generer_reference("IMMO")
+                    chemin_dossier = creer_dossier_demande("immo", reference_demande)
 
                     donnees = {
                         "nom": nom, "naissance": naissance, "lieu_naissance": lieu_naissance,
@@ -160,6 +157,8 @@ def run():
 
                     with open(os.path.join(chemin_dossier, f"{reference_demande}_data.json"), "w", encoding='utf-8') as f:
                         json.dump(donnees, f, default=str, ensure_ascii=False, indent=2)
+                    indexer_demande(donnees, "immo")
+                    synchroniser_demande(donnees, "immo", chemin_dossier)
 
                     st.session_state.demande_soumise = True
                     st.session_state.reference_demande = reference_demande
@@ -4,32 +4,32 @@ frontend/pages/dashboard.py - Tableau de bord général avec statistiques et gra
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime, date
-from typing import List, Dict
+from datetime import date
 
-from backend.utils import formater_montant, charger_toutes_demandes
+from backend.utils import formater_montant, LIBELLES_TYPES_CREDIT, STATUTS_EN_COURS
+from backend.services.instantane_demandes import tableau_demandes
 
 
-def afficher_tableau_bord_general(demandes_toutes: List[Dict] = None):
+def afficher_tableau_bord_general(df_demandes: pd.DataFrame = None):
     """
     Affiche le tableau de bord général avec les statistiques globales
 
     Args:
-        demandes_toutes (List[Dict], optional): Toutes les demandes de crédit.
-                                               Si None, les charge automatiquement.
+        df_demandes (pd.DataFrame, optional): Demandes en colonnes (tableau_demandes).
+                                              Si None, le charge automatiquement.
     """
     st.header("📊 Vue d'ensemble générale")
 
     # Charger les demandes si non fournies
-    if demandes_toutes is None:
-        demandes_toutes = charger_toutes_demandes()
+    if df_demandes is None:
+        df_demandes = tableau_demandes()
 
-    if not demandes_toutes:
+    if df_demandes.empty:
         st.info("Aucune demande de crédit pour le moment.")
         return
 
     # KPIs principaux
-    afficher_kpis_principaux(demandes_toutes)
+    afficher_kpis_principaux(df_demandes)
 
     st.markdown("---")
 
@@ -37,71 +37,77 @@ def afficher_tableau_bord_general(demandes_toutes: List[Dict] = None):
     col1, col2 = st.columns(2)
 
     with col1:
-        afficher_repartition_types_credit(demandes_toutes)
+        afficher_repartition_types_credit(df_demandes)
 
     with col2:
-        afficher_repartition_statuts(demandes_toutes)
+        afficher_repartition_statuts(df_demandes)
 
     # Évolution temporelle et montants
-    afficher_evolution_temporelle(demandes_toutes)
-    afficher_montants_par_type(demandes_toutes)
+    afficher_evolution_temporelle(df_demandes)
+    afficher_montants_par_type(df_demandes)
 
     # Tableau récapitulatif
-    afficher_tableau_recapitulatif(demandes_toutes)
+    afficher_tableau_recapitulatif(df_demandes)
 
 
-def afficher_kpis_principaux(demandes_toutes: List[Dict]):
+def libelles_types(df_demandes: pd.DataFrame) -> pd.Series:
+    """
+    Libellé du type de crédit de chaque demande
+
+    Args:
+        df_demandes (pd.DataFrame): Demandes en colonnes
+
+    Returns:
+        pd.Series: Auto, Immobilier, Consommation, Découvert ou Inconnu
+    """
+    return df_demandes["type_credit"].map(LIBELLES_TYPES_CREDIT).fillna("Inconnu")
+
+
+def afficher_kpis_principaux(df_demandes: pd.DataFrame):
     """
     Affiche les KPIs principaux du tableau de bord
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        df_demandes (pd.DataFrame): Toutes les demandes
     """
     col1, col2, col3, col4 = st.columns(4)
+    statuts = df_demandes["statut"]
 
     with col1:
-        nb_total = len(demandes_toutes)
+        nb_total = len(df_demandes)
         st.metric("📈 Total demandes", nb_total)
 
     with col2:
-        en_cours = sum(1 for d in demandes_toutes
-                      if d.get("statut", "En attente") in ["En attente", "En cours d'analyse", "En cours de traitement"])
+        en_cours = int(statuts.isin(STATUTS_EN_COURS).sum())
         st.metric("⏳ En cours", en_cours)
 
     with col3:
-        acceptees = sum(1 for d in demandes_toutes if d.get("statut") == "Accepté")
+        acceptees = int((statuts == "Accepté").sum())
         taux_acceptation = (acceptees / nb_total * 100) if nb_total > 0 else 0
         st.metric("✅ Acceptées", acceptees, f"{taux_acceptation:.1f}%")
 
     with col4:
-        refusees = sum(1 for d in demandes_toutes if d.get("statut") == "Refusé")
+        refusees = int((statuts == "Refusé").sum())
         taux_refus = (refusees / nb_total * 100) if nb_total > 0 else 0
         st.metric("❌ Refusées", refusees, f"{taux_refus:.1f}%")
 
 
-def afficher_repartition_types_credit(demandes_toutes: List[Dict]):
+def afficher_repartition_types_credit(df_demandes: pd.DataFrame):
     """
     Affiche la répartition par type de crédit
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        df_demandes (pd.DataFrame): Toutes les demandes
     """
     st.subheader("📊 Répartition par type")
 
-    types_credit = {
-        "Auto": sum(1 for d in demandes_toutes if d.get("type_credit") == "auto" or "marque" in d),
-        "Immobilier": sum(1 for d in demandes_toutes if d.get("type_credit") == "immo" or "type_bien" in d),
-        "Consommation": sum(1 for d in demandes_toutes if d.get("type_credit") == "conso" or "type_projet" in d),
-        "Découvert": sum(1 for d in demandes_toutes if d.get("type_credit") == "decouvert" or "type_decouvert" in d)
-    }
-
-    # Filtrer les types avec des valeurs > 0
-    types_credit_filtre = {k: v for k, v in types_credit.items() if v > 0}
+    # Nombre de demandes par type (seuls les types présents apparaissent)
+    nombres = libelles_types(df_demandes).value_counts()
 
-    if types_credit_filtre:
+    if not nombres.empty:
         df_types = pd.DataFrame({
-            'Type': list(types_credit_filtre.keys()),
-            'Nombre': list(types_credit_filtre.values())
+            'Type': nombres.index,
+            'Nombre': nombres.to_numpy()
         })
 
         fig = px.pie(
@@ -119,25 +125,22 @@ def afficher_repartition_types_credit(demandes_toutes: List[Dict]):
         st.info("Aucune donnée à afficher")
 
 
-def afficher_repartition_statuts(demandes_toutes: List[Dict]):
+def afficher_repartition_statuts(df_demandes: pd.DataFrame):
     """
     Affiche la répartition par statut
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        df_demandes (pd.DataFrame): Toutes les demandes
     """
     st.subheader("📋 Répartition par statut")
 
     # Compter les demandes par statut
-    statuts = {}
-    for d in demandes_toutes:
-        statut = d.get("statut", "En attente")
-        statuts[statut] = statuts.get(statut, 0) + 1
+    statuts = df_demandes["statut"].fillna("En attente").value_counts(sort=False)
 
-    if statuts:
+    if not statuts.empty:
         df_statuts = pd.DataFrame({
-            'Statut': list(statuts.keys()),
-            'Nombre': list(statuts.values())
+            'Statut': statuts.index,
+            'Nombre': statuts.to_numpy()
         })
 
         # Couleurs personnalisées selon le statut
@@ -167,55 +170,27 @@ def afficher_repartition_statuts(demandes_toutes: List[Dict]):
         st.info("Aucune donnée à afficher")
 
 
-def afficher_evolution_temporelle(demandes_toutes: List[Dict]):
+def afficher_evolution_temporelle(df_demandes: pd.DataFrame):
     """
     Affiche l'évolution temporelle des demandes
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        df_demandes (pd.DataFrame): Toutes les demandes
     """
     st.subheader("📈 Évolution temporelle")
 
-    # Préparer les données temporelles
-    dates = []
-    for d in demandes_toutes:
-        # Extraire la date de la référence ou utiliser la date de soumission si disponible
-        if "date_soumission" in d:
-            if isinstance(d["date_soumission"], str):
-                try:
-                    dates.append(datetime.fromisoformat(d["date_soumission"]).date())
-                except:
-                    dates.append(date.today())
-            else:
-                dates.append(d["date_soumission"])
-        elif "ref_demande" in d:
-            # Format: TYPE-YYMMDD-XXXX
-            ref = d["ref_demande"]
-            try:
-                date_str = ref.split("-")[1]
-                date_obj = datetime.strptime(f"20{date_str}", "%Y%m%d").date()
-                dates.append(date_obj)
-            except (IndexError, ValueError):
-                # Utiliser une date par défaut si impossible de parser
-                dates.append(date.today())
-        else:
-            dates.append(date.today())
-
-    if dates:
-        # Compter les demandes par date
-        demandes_par_date = {}
-        for d in dates:
-            d_str = d.strftime("%Y-%m-%d")
-            demandes_par_date[d_str] = demandes_par_date.get(d_str, 0) + 1
-
-        # Trier par date
-        dates_triees = sorted(demandes_par_date.keys())
-        counts_tries = [demandes_par_date[d] for d in dates_triees]
+    # Date de soumission, ou date de la référence TYPE-YYMMDD-XXXX (colonne
+    # date_demande de l'instantané), aujourd'hui par défaut
+    dates = df_demandes["date_demande"].fillna(pd.Timestamp(date.today()))
+
+    if not dates.empty:
+        # Compter les demandes par date, triées par date
+        demandes_par_date = dates.dt.normalize().value_counts().sort_index()
 
         # Créer un DataFrame pour le graphique
         df_dates = pd.DataFrame({
-            'Date': pd.to_datetime(dates_triees),
-            'Nombre': counts_tries
+            'Date': demandes_par_date.index,
+            'Nombre': demandes_par_date.to_numpy()
         })
 
         fig = px.line(
@@ -235,34 +210,28 @@ def afficher_evolution_temporelle(demandes_toutes: List[Dict]):
         st.plotly_chart(fig, use_container_width=True)
 
 
-def afficher_montants_par_type(demandes_toutes: List[Dict]):
+def afficher_montants_par_type(df_demandes: pd.DataFrame):
     """
     Affiche les montants par type de crédit
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        df_demandes (pd.DataFrame): Toutes les demandes
     """
     st.subheader("💰 Montants par type de crédit")
 
-    # Calculer la somme des montants par type
-    montants_par_type = {
-        "Auto": sum(d.get("montant", 0) for d in demandes_toutes
-                   if d.get("type_credit") == "auto" or "marque" in d),
-        "Immobilier": sum(d.get("montant", 0) for d in demandes_toutes
-                         if d.get("type_credit") == "immo" or "type_bien" in d),
-        "Consommation": sum(d.get("montant", 0) for d in demandes_toutes
-                           if d.get("type_credit") == "conso" or "type_projet" in d),
-        "Découvert": sum(d.get("montant", 0) for d in demandes_toutes
-                        if d.get("type_credit") == "decouvert" or "type_decouvert" in d)
-    }
+    # Somme des montants par type, dans l'ordre des types de crédit
+    types_ordre = list(LIBELLES_TYPES_CREDIT.values())
+    montants_par_type = (df_demandes["montant"].fillna(0)
+                         .groupby(libelles_types(df_demandes)).sum()
+                         .reindex(types_ordre, fill_value=0))
 
     # Filtrer les types avec des montants > 0
-    montants_filtre = {k: v for k, v in montants_par_type.items() if v > 0}
+    montants_filtre = montants_par_type[montants_par_type > 0]
 
-    if montants_filtre:
+    if not montants_filtre.empty:
         df_montants = pd.DataFrame({
-            'Type': list(montants_filtre.keys()),
-            'Montant': list(montants_filtre.values())
+            'Type': montants_filtre.index,
+            'Montant': montants_filtre.to_numpy()
         })
 
         fig = px.bar(
@@ -284,85 +253,46 @@ def afficher_montants_par_type(demandes_toutes: List[Dict]):
         st.plotly_chart(fig, use_container_width=True)
 
         # Affichage des montants sous forme de métriques
-        col1, col2, col3, col4 = st.columns(4)
-        types_ordre = ["Auto", "Immobilier", "Consommation", "Découvert"]
-        colonnes = [col1, col2, col3, col4]
+        colonnes = st.columns(4)
 
         for i, type_credit in enumerate(types_ordre):
-            if type_credit in montants_filtre:
+            if type_credit in montants_filtre.index:
                 with colonnes[i]:
                     st.metric(
                         f"💰 {type_credit}",
-                        formater_montant(montants_filtre[type_credit])
+                        formater_montant(float(montants_filtre[type_credit]))
                     )
 
 
-def afficher_tableau_recapitulatif(demandes_toutes: List[Dict]):
+def afficher_tableau_recapitulatif(df_demandes: pd.DataFrame):
     """
     Affiche un tableau récapitulatif des demandes récentes
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        df_demandes (pd.DataFrame): Toutes les demandes
     """
     st.subheader("📋 Demandes récentes")
 
-    if not demandes_toutes:
+    if df_demandes.empty:
         st.info("Aucune demande à afficher")
         return
 
-    # Préparer les données pour le tableau
-    donnees_tableau = []
-
-    for demande in demandes_toutes[-10:]:  # 10 dernières demandes
-        # Déterminer le type de crédit
-        type_credit = "Inconnu"
-        if "marque" in demande or demande.get("type_credit") == "auto":
-            type_credit = "Auto"
-        elif "type_bien" in demande or demande.get("type_credit") == "immo":
-            type_credit = "Immobilier"
-        elif "type_projet" in demande or demande.get("type_credit") == "conso":
-            type_credit = "Consommation"
-        elif "type_decouvert" in demande or demande.get("type_credit") == "decouvert":
-            type_credit = "Découvert"
-
-        # Déterminer la date
-        date_demande = date.today()
-        if "date_soumission" in demande:
-            if isinstance(demande["date_soumission"], str):
-                try:
-                    date_demande = datetime.fromisoformat(demande["date_soumission"]).date()
-                except:
-                    pass
-            else:
-                date_demande = demande["date_soumission"]
-        elif "ref_demande" in demande:
-            ref = demande["ref_demande"]
-            try:
-                date_str = ref.split("-")[1]
-                date_demande = datetime.strptime(f"20{date_str}", "%Y%m%d").date()
-            except:
-                pass
-
-        donnees_tableau.append({
-            "Référence": demande.get("ref_demande", "N/A"),
-            "Date": date_demande,
-            "Client": demande.get("nom", "N/A"),
-            "Type": type_credit,
-            "Montant": formater_montant(demande.get("montant", 0)),
-            "Statut": demande.get("statut", "En attente"),
-            "Conseiller": demande.get("conseiller", "Non assigné")
-        })
-
-    if donnees_tableau:
-        df = pd.DataFrame(donnees_tableau)
-
-        # Trier par date décroissante
-        df = df.sort_values('Date', ascending=False)
-
-        st.dataframe(
-            df,
-            use_container_width=True,
-            hide_index=True
-        )
-    else:
-        st.info("Aucune donnée à afficher dans le tableau")
+    # 10 demandes les plus récentes (sans date : aujourd'hui), par date décroissante
+    dates = df_demandes["date_demande"].fillna(pd.Timestamp(date.today()))
+    recentes = df_demandes.loc[dates.sort_values(ascending=False, kind="stable").index[:10]]
+
+    df = pd.DataFrame({
+        "Référence": recentes["ref_demande"].fillna("N/A"),
+        "Date": dates.loc[recentes.index].dt.date,
+        "Client": recentes["nom"].fillna("N/A"),
+        "Type": libelles_types(recentes),
+        "Montant": recentes["montant"].fillna(0).map(formater_montant),
+        "Statut": recentes["statut"].fillna("En attente"),
+        "Conseiller": recentes["conseiller"].fillna("Non assigné")
+    })
+
+    st.dataframe(
+        df,
+        use_container_width=True,
+        hide_index=True
+    )
@@ -1,41 +1,48 @@
 """
 frontend/pages/gestion_clients.py - Module de gestion des clients
 """
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from typing import List, Dict
 
-from backend.utils import formater_montant
+from backend.utils import formater_montant, LIBELLES_TYPES_CREDIT, STATUTS_EN_COURS
+from backend.services.instantane_demandes import tableau_demandes
+from backend.services.normalisation import texte_contient
 
 
-def afficher_gestion_clients(demandes_toutes: List[Dict]):
+def afficher_gestion_clients(df_demandes: pd.DataFrame = None):
     """
     Affiche la gestion centralisée des clients
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes de crédit
+        df_demandes (pd.DataFrame, optional): Demandes en colonnes (tableau_demandes).
+                                              Si None, le charge automatiquement.
     """
     st.header("👥 Gestion des clients")
 
-    if not demandes_toutes:
+    if df_demandes is None:
+        df_demandes = tableau_demandes()
+
+    if df_demandes.empty:
         st.info("Aucun client trouvé.")
         return
 
     # Préparer les données clients
-    clients_data = preparer_donnees_clients(demandes_toutes)
+    demandes = demandes_clients(df_demandes)
+    clients_data = preparer_donnees_clients(demandes)
 
-    if not clients_data:
+    if clients_data.empty:
         st.info("Aucune donnée client disponible.")
         return
 
     # Statistiques des clients
-    afficher_statistiques_clients(clients_data)
+    afficher_statistiques_clients(clients_data, demandes)
 
     st.markdown("---")
 
     # Filtres
-    clients_filtres = afficher_filtres_clients(clients_data)
+    clients_filtres = afficher_filtres_clients(clients_data, demandes)
 
     # Tableau des clients
     afficher_tableau_clients(clients_filtres)
@@ -44,81 +51,88 @@ def afficher_gestion_clients(demandes_toutes: List[Dict]):
     afficher_analyses_clients(clients_data)
 
 
-def preparer_donnees_clients(demandes_toutes: List[Dict]) -> List[Dict]:
+def demandes_clients(df_demandes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Demandes rattachées à un client (nom renseigné), avec leur clé client
+
+    Args:
+        df_demandes (pd.DataFrame): Toutes les demandes
+
+    Returns:
+        pd.DataFrame: Demandes avec les colonnes cle_client (nom + email),
+                      type_libelle et statut (En attente par défaut)
+    """
+    demandes = df_demandes[df_demandes["nom"].fillna("") != ""]
+    email = demandes["email"].fillna("")
+
+    # Clé unique basée sur nom + email
+    cles = demandes["nom"].where(email == "", demandes["nom"] + "_" + email)
+
+    return demandes.assign(
+        cle_client=cles,
+        type_libelle=demandes["type_credit"].map(LIBELLES_TYPES_CREDIT).fillna("Inconnu"),
+        statut=demandes["statut"].fillna("En attente")
+    )
+
+
+def _valeurs_client(demandes: pd.DataFrame, colonne: str) -> pd.Series:
+    """
+    Valeurs distinctes d'une colonne pour chaque client, triées et jointes par des virgules
+
+    Chaque client reçoit un masque de bits des valeurs rencontrées : le texte
+    n'est construit qu'une fois par combinaison (quelques types, statuts ou
+    conseillers), pas une fois par client.
+    """
+    valeurs = demandes[["cle_client", colonne]].dropna()
+    codes_clients, clients = pd.factorize(valeurs["cle_client"])
+    codes_valeurs, distinctes = pd.factorize(valeurs[colonne], sort=True)
+
+    if len(distinctes) > 62:
+        # Trop de valeurs pour un masque de 64 bits : concaténation par groupe
+        uniques = valeurs.drop_duplicates().sort_values(["cle_client", colonne])
+        return (uniques[colonne] + ", ").groupby(uniques["cle_client"], sort=False).sum().str[:-2]
+
+    masques = np.zeros(len(clients), dtype=np.int64)
+    np.bitwise_or.at(masques, codes_clients, np.left_shift(1, codes_valeurs.astype(np.int64)))
+    textes = {masque: ", ".join(v for i, v in enumerate(distinctes) if masque >> i & 1) for masque in np.unique(masques)}
+    return pd.Series(masques, index=clients).map(textes)
+
+
+def preparer_donnees_clients(demandes: pd.DataFrame) -> pd.DataFrame:
     """
     Prépare les données des clients uniques avec leurs statistiques
 
     Args:
-        demandes_toutes (List[Dict]): Toutes les demandes
+        demandes (pd.DataFrame): Demandes des clients (demandes_clients)
 
     Returns:
-        List[Dict]: Liste des clients avec leurs données agrégées
+        pd.DataFrame: Un client par ligne (index : cle_client) avec ses données agrégées
     """
-    clients = {}
-
-    for demande in demandes_toutes:
-        nom = demande.get("nom", "")
-        email = demande.get("email", "")
-
-        if not nom:
-            continue
-
-        # Clé unique basée sur nom + email
-        cle_client = f"{nom}_{email}" if email else nom
-
-        if cle_client not in clients:
-            clients[cle_client] = {
-                "nom": nom,
-                "email": email,
-                "telephone": demande.get("telephone", ""),
-                "adresse": demande.get("adresse", ""),
-                "profession": demande.get("profession", ""),
-                "revenu": demande.get("revenu_mensuel_form", 0),
-                "demandes": [],
-                "types_credit": set(),
-                "montant_total": 0,
-                "nb_demandes": 0,
-                "statuts": set(),
-                "conseillers": set()
-            }
-
-        # Ajouter cette demande aux statistiques du client
-        client = clients[cle_client]
-        client["demandes"].append(demande)
-        client["nb_demandes"] += 1
-        client["montant_total"] += demande.get("montant", 0)
-        client["statuts"].add(demande.get("statut", "En attente"))
-
-        if demande.get("conseiller"):
-            client["conseillers"].add(demande.get("conseiller"))
-
-        # Déterminer le type de crédit
-        if "marque" in demande or demande.get("type_credit") == "auto":
-            client["types_credit"].add("Auto")
-        elif "type_bien" in demande or demande.get("type_credit") == "immo":
-            client["types_credit"].add("Immobilier")
-        elif "type_projet" in demande or demande.get("type_credit") == "conso":
-            client["types_credit"].add("Consommation")
-        elif "type_decouvert" in demande or demande.get("type_credit") == "decouvert":
-            client["types_credit"].add("Découvert")
-
-    # Convertir les sets en listes pour l'affichage
-    clients_list = []
-    for client_data in clients.values():
-        client_data["types_credit"] = list(client_data["types_credit"])
-        client_data["statuts"] = list(client_data["statuts"])
-        client_data["conseillers"] = list(client_data["conseillers"])
-        clients_list.append(client_data)
-
-    return clients_list
-
-
-def afficher_statistiques_clients(clients_data: List[Dict]):
+    # Coordonnées et revenu : ceux de la première demande du client
+    clients = demandes.drop_duplicates("cle_client")[
+        ["cle_client", "nom", "email", "telephone", "adresse", "profession", "revenu"]
+    ].set_index("cle_client")
+    clients["nb_demandes"] = demandes["cle_client"].value_counts(sort=False)
+    clients["montant_total"] = demandes.groupby("cle_client", sort=False)["montant"].sum()
+
+    for colonne in ("email", "telephone", "adresse", "profession"):
+        clients[colonne] = clients[colonne].fillna("")
+    clients["revenu"] = clients["revenu"].fillna(0)
+
+    clients["types_credit"] = _valeurs_client(demandes, "type_libelle").reindex(clients.index, fill_value="")
+    clients["statuts"] = _valeurs_client(demandes, "statut").reindex(clients.index, fill_value="")
+    clients["conseillers"] = _valeurs_client(demandes, "conseiller").reindex(clients.index, fill_value="")
+
+    return clients
+
+
+def afficher_statistiques_clients(clients_data: pd.DataFrame, demandes: pd.DataFrame):
     """
     Affiche les statistiques générales des clients
 
     Args:
-        clients_data (List[Dict]): Données des clients
+        clients_data (pd.DataFrame): Données des clients
+        demandes (pd.DataFrame): Demandes des clients
     """
     col1, col2, col3, col4 = st.columns(4)
 
@@ -126,107 +140,91 @@ def afficher_statistiques_clients(clients_data: List[Dict]):
         st.metric("👥 Total clients", len(clients_data))
 
     with col2:
-        clients_actifs = sum(1 for c in clients_data
-                           if any(statut in ["En attente", "En cours d'analyse", "En cours de traitement"]
-                                 for statut in c["statuts"]))
+        clients_actifs = demandes.loc[demandes["statut"].isin(STATUTS_EN_COURS), "cle_client"].nunique()
         st.metric("🔄 Clients actifs", clients_actifs)
 
     with col3:
-        demandes_totales = sum(c["nb_demandes"] for c in clients_data)
-        moyenne_demandes = demandes_totales / len(clients_data) if clients_data else 0
+        moyenne_demandes = clients_data["nb_demandes"].mean() if len(clients_data) else 0
         st.metric("📊 Moy. demandes/client", f"{moyenne_demandes:.1f}")
 
     with col4:
-        montant_total = sum(c["montant_total"] for c in clients_data)
+        montant_total = float(clients_data["montant_total"].sum())
         st.metric("💰 Volume total", formater_montant(montant_total))
 
 
-def afficher_filtres_clients(clients_data: List[Dict]) -> List[Dict]:
+def afficher_filtres_clients(clients_data: pd.DataFrame, demandes: pd.DataFrame) -> pd.DataFrame:
     """
     Affiche les filtres pour les clients et retourne les données filtrées
 
     Args:
-        clients_data (List[Dict]): Données des clients
+        clients_data (pd.DataFrame): Données des clients
+        demandes (pd.DataFrame): Demandes des clients
 
     Returns:
-        List[Dict]: Clients filtrés
+        pd.DataFrame: Clients filtrés
     """
     col1, col2, col3 = st.columns(3)
 
     with col1:
         # Filtre par profession
-        professions = ["Toutes"] + list(set([c["profession"] for c in clients_data if c["profession"]]))
+        professions = ["Toutes"] + sorted(clients_data.loc[clients_data["profession"] != "", "profession"].unique())
         profession_filtre = st.selectbox("🏢 Profession", professions)
 
     with col2:
         # Filtre par type de crédit
-        tous_types = set()
-        for client in clients_data:
-            tous_types.update(client["types_credit"])
-
-        type_credit_filtre = st.selectbox("💳 Type de crédit", ["Tous"] + sorted(list(tous_types)))
+        type_credit_filtre = st.selectbox("💳 Type de crédit", ["Tous"] + sorted(demandes["type_libelle"].unique()))
 
     with col3:
         # Filtre par statut
-        tous_statuts = set()
-        for client in clients_data:
-            tous_statuts.update(client["statuts"])
-
-        statut_filtre = st.selectbox("📋 Statut", ["Tous"] + sorted(list(tous_statuts)))
+        statut_filtre = st.selectbox("📋 Statut", ["Tous"] + sorted(demandes["statut"].unique()))
 
     # Recherche par nom
     recherche_nom = st.text_input("🔍 Rechercher par nom", placeholder="Nom du client...")
 
     # Appliquer les filtres
-    clients_filtres = clients_data
+    masque = pd.Series(True, index=clients_data.index)
 
     if profession_filtre != "Toutes":
-        clients_filtres = [c for c in clients_filtres if c["profession"] == profession_filtre]
+        masque &= clients_data["profession"] == profession_filtre
 
     if type_credit_filtre != "Tous":
-        clients_filtres = [c for c in clients_filtres if type_credit_filtre in c["types_credit"]]
+        masque &= clients_data.index.isin(demandes.loc[demandes["type_libelle"] == type_credit_filtre, "cle_client"])
 
     if statut_filtre != "Tous":
-        clients_filtres = [c for c in clients_filtres if statut_filtre in c["statuts"]]
+        masque &= clients_data.index.isin(demandes.loc[demandes["statut"] == statut_filtre, "cle_client"])
 
     if recherche_nom:
-        clients_filtres = [c for c in clients_filtres
-                          if recherche_nom.lower() in c["nom"].lower()]
+        masque &= clients_data["nom"].map(lambda nom: texte_contient(nom, recherche_nom)).astype(bool)
 
-    return clients_filtres
+    return clients_data[masque]
 
 
-def afficher_tableau_clients(clients_filtres: List[Dict]):
+def afficher_tableau_clients(clients_filtres: pd.DataFrame):
     """
     Affiche le tableau des clients avec leurs informations
 
     Args:
-        clients_filtres (List[Dict]): Clients filtrés
+        clients_filtres (pd.DataFrame): Clients filtrés
     """
     st.subheader(f"📋 Liste des clients ({len(clients_filtres)})")
 
-    if not clients_filtres:
+    if clients_filtres.empty:
         st.info("Aucun client ne correspond aux critères de filtrage.")
         return
 
     # Préparer les données pour le tableau
-    donnees_tableau = []
-
-    for client in clients_filtres:
-        donnees_tableau.append({
-            "Nom": client["nom"],
-            "Email": client["email"],
-            "Téléphone": client["telephone"],
-            "Profession": client["profession"],
-            "Revenu (DH)": formater_montant(client["revenu"]),
-            "Nb demandes": client["nb_demandes"],
-            "Montant total": formater_montant(client["montant_total"]),
-            "Types de crédit": ", ".join(client["types_credit"]),
-            "Statuts": ", ".join(client["statuts"]),
-            "Conseillers": ", ".join(client["conseillers"]) if client["conseillers"] else "Non assigné"
-        })
-
-    df_clients = pd.DataFrame(donnees_tableau)
+    df_clients = pd.DataFrame({
+        "Nom": clients_filtres["nom"],
+        "Email": clients_filtres["email"],
+        "Téléphone": clients_filtres["telephone"],
+        "Profession": clients_filtres["profession"],
+        "Revenu (DH)": clients_filtres["revenu"].map(formater_montant),
+        "Nb demandes": clients_filtres["nb_demandes"],
+        "Montant total": clients_filtres["montant_total"].map(formater_montant),
+        "Types de crédit": clients_filtres["types_credit"],
+        "Statuts": clients_filtres["statuts"],
+        "Conseillers": clients_filtres["conseillers"].replace("", "Non assigné")
+    })
 
     # Affichage du tableau avec possibilité de tri
     st.dataframe(
@@ -266,12 +264,12 @@ def afficher_tableau_clients(clients_filtres: List[Dict]):
             st.info("📊 Export Excel non disponible (package xlsxwriter requis)")
 
 
-def afficher_analyses_clients(clients_data: List[Dict]):
+def afficher_analyses_clients(clients_data: pd.DataFrame):
     """
     Affiche les analyses graphiques des clients
 
     Args:
-        clients_data (List[Dict]): Données des clients
+        clients_data (pd.DataFrame): Données des clients
     """
     st.markdown("---")
     st.subheader("📊 Analyses des clients")
@@ -290,24 +288,23 @@ def afficher_analyses_clients(clients_data: List[Dict]):
     afficher_analyse_multi_demandes(clients_data)
 
 
-def afficher_repartition_professions(clients_data: List[Dict]):
+def afficher_repartition_professions(clients_data: pd.DataFrame):
     """
     Affiche la répartition des clients par profession
 
     Args:
-        clients_data (List[Dict]): Données des clients
+        clients_data (pd.DataFrame): Données des clients
     """
-    professions = {}
-
-    for client in clients_data:
-        profession = client["profession"] if client["profession"] else "Non renseigné"
-        professions[profession] = professions.get(profession, 0) + 1
+    professions = clients_data["profession"].replace("", "Non renseigné").value_counts()
 
-    if professions:
+    if not professions.empty:
         # Limiter aux 8 professions les plus fréquentes
-        professions_triees = sorted(professions.items(), key=lambda x: x[1], reverse=True)[:8]
+        professions_triees = professions.head(8)
 
-        df_professions = pd.DataFrame(professions_triees, columns=['Profession', 'Nombre'])
+        df_professions = pd.DataFrame({
+            'Profession': professions_triees.index,
+            'Nombre': professions_triees.to_numpy()
+        })
 
         fig = px.pie(
             df_professions,
@@ -321,31 +318,31 @@ def afficher_repartition_professions(clients_data: List[Dict]):
         st.plotly_chart(fig, use_container_width=True)
 
 
-def afficher_distribution_revenus(clients_data: List[Dict]):
+def afficher_distribution_revenus(clients_data: pd.DataFrame):
     """
     Affiche la distribution des revenus des clients
 
     Args:
-        clients_data (List[Dict]): Données des clients
+        clients_data (pd.DataFrame): Données des clients
     """
-    revenus = [client["revenu"] for client in clients_data if client["revenu"] > 0]
+    revenus = clients_data.loc[clients_data["revenu"] > 0, "revenu"]
 
-    if revenus:
+    if not revenus.empty:
         # Créer des tranches de revenus
-        tranches = {
-            "< 5 000 DH": sum(1 for r in revenus if r < 5000),
-            "5 000 - 10 000 DH": sum(1 for r in revenus if 5000 <= r < 10000),
-            "10 000 - 20 000 DH": sum(1 for r in revenus if 10000 <= r < 20000),
-            "> 20 000 DH": sum(1 for r in revenus if r >= 20000)
-        }
+        tranches = pd.cut(
+            revenus,
+            bins=[0, 5000, 10000, 20000, float("inf")],
+            labels=["< 5 000 DH", "5 000 - 10 000 DH", "10 000 - 20 000 DH", "> 20 000 DH"],
+            right=False
+        ).value_counts(sort=False)
 
         # Filtrer les tranches avec des valeurs > 0
-        tranches_filtre = {k: v for k, v in tranches.items() if v > 0}
+        tranches_filtre = tranches[tranches > 0]
 
-        if tranches_filtre:
+        if not tranches_filtre.empty:
             df_revenus = pd.DataFrame({
-                'Tranche': list(tranches_filtre.keys()),
-                'Nombre': list(tranches_filtre.values())
+                'Tranche': tranches_filtre.index.astype(str),
+                'Nombre': tranches_filtre.to_numpy()
             })
 
             fig = px.bar(
@@ -362,57 +359,48 @@ def afficher_distribution_revenus(clients_data: List[Dict]):
             st.plotly_chart(fig, use_container_width=True)
 
 
-def afficher_analyse_multi_demandes(clients_data: List[Dict]):
+def afficher_analyse_multi_demandes(clients_data: pd.DataFrame):
     """
     Affiche l'analyse des clients avec plusieurs demandes
 
     Args:
-        clients_data (List[Dict]): Données des clients
+        clients_data (pd.DataFrame): Données des clients
     """
     # Clients avec plusieurs demandes
-    clients_multi = [c for c in clients_data if c["nb_demandes"] > 1]
+    clients_multi = clients_data[clients_data["nb_demandes"] > 1]
 
-    if clients_multi:
+    if not clients_multi.empty:
         st.subheader(f"🔄 Clients multi-demandes ({len(clients_multi)})")
 
         # Tableau des clients multi-demandes
-        donnees_multi = []
-
-        for client in sorted(clients_multi, key=lambda x: x["nb_demandes"], reverse=True)[:10]:
-            donnees_multi.append({
-                "Client": client["nom"],
-                "Nb demandes": client["nb_demandes"],
-                "Montant total": formater_montant(client["montant_total"]),
-                "Types": ", ".join(client["types_credit"]),
-                "Statuts actuels": ", ".join(client["statuts"])
-            })
-
-        if donnees_multi:
-            df_multi = pd.DataFrame(donnees_multi)
-            st.dataframe(df_multi, use_container_width=True, hide_index=True)
+        premiers = clients_multi.sort_values("nb_demandes", ascending=False, kind="stable").head(10)
+
+        df_multi = pd.DataFrame({
+            "Client": premiers["nom"],
+            "Nb demandes": premiers["nb_demandes"],
+            "Montant total": premiers["montant_total"].map(formater_montant),
+            "Types": premiers["types_credit"],
+            "Statuts actuels": premiers["statuts"]
+        })
+        st.dataframe(df_multi, use_container_width=True, hide_index=True)
 
         # Graphique de répartition
-        repartition_demandes = {}
-        for client in clients_data:
-            nb_demandes = client["nb_demandes"]
-            cle = f"{nb_demandes} demande{'s' if nb_demandes > 1 else ''}"
-            repartition_demandes[cle] = repartition_demandes.get(cle, 0) + 1
-
-        if repartition_demandes:
-            df_repartition = pd.DataFrame({
-                'Nombre de demandes': list(repartition_demandes.keys()),
-                'Clients': list(repartition_demandes.values())
-            })
+        repartition_demandes = clients_data["nb_demandes"].value_counts().sort_index()
 
-            fig = px.bar(
-                df_repartition,
-                x='Nombre de demandes',
-                y='Clients',
-                title="Répartition des clients par nombre de demandes",
-                color='Clients',
-                color_continuous_scale='Blues'
-            )
+        df_repartition = pd.DataFrame({
+            'Nombre de demandes': [f"{nb} demande{'s' if nb > 1 else ''}" for nb in repartition_demandes.index],
+            'Clients': repartition_demandes.to_numpy()
+        })
 
-            st.plotly_chart(fig, use_container_width=True)
+        fig = px.bar(
+            df_repartition,
+            x='Nombre de demandes',
+            y='Clients',
+            title="Répartition des clients par nombre de demandes",
+            color='Clients',
+            color_continuous_scale='Blues'
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Aucun client avec plusieurs demandes trouvé.")
@@ -1,49 +1,71 @@
 """
 frontend/pages/gestion_credits.py - Gestion des demandes de crédit
 """
+import io
 import streamlit as st
-from typing import List, Dict
+from datetime import datetime
+from typing import Dict
 
 from backend.utils import (
     get_statut_couleur,
     formater_montant,
     sauvegarder_statut_demande
 )
+from backend.services.index_demandes import interroger_demandes, statistiques_demandes
 from frontend.pages.traitement_documents import afficher_section_documents
 
 
-def afficher_gestion_credit(titre: str, demandes: List[Dict], type_credit: str):
+def afficher_gestion_credit(titre: str, type_credit: str):
     """
     Affiche la gestion des demandes pour un type de crédit spécifique
 
+    Les demandes sont lues page par page dans l'index : filtres, tri et
+    pagination sont appliqués par la requête, pas sur la liste complète.
+
     Args:
         titre (str): Titre de la section
-        demandes (List[Dict]): Liste des demandes
         type_credit (str): Type de crédit
     """
     st.header(titre)
 
-    if not demandes:
+    statistiques = statistiques_demandes(type_credit=type_credit)
+    if not statistiques["total"]:
         st.info(f"Aucune demande de type {type_credit} pour le moment.")
         return
 
     # Statistiques spécifiques au type de crédit
-    afficher_statistiques_credit(demandes)
+    afficher_statistiques_credit(statistiques)
 
     st.markdown("---")
 
     # Filtres
-    demandes_filtrees = afficher_filtres_credit(demandes, type_credit)
+    criteres = afficher_filtres_credit(type_credit)
+
+    cle_page = f"page_{type_credit}"
+    resultat = interroger_demandes(type_credit=type_credit, page=st.session_state.get(cle_page, 1), **criteres)
 
     # Affichage des demandes sous forme de cartes
-    if demandes_filtrees:
-        st.subheader(f"📋 Demandes ({len(demandes_filtrees)})")
+    if resultat["total"]:
+        st.subheader(f"📋 Demandes ({resultat['total']})")
 
-        for i, demande in enumerate(demandes_filtrees):
+        debut = (resultat["page"] - 1) * resultat["par_page"]
+        for i, demande in enumerate(resultat["demandes"], start=debut):
             afficher_demande_avec_colonnes(demande, type_credit, i)
+
+        if resultat["nb_pages"] > 1:
+            st.number_input(
+                f"Page (sur {resultat['nb_pages']})",
+                min_value=1,
+                max_value=resultat["nb_pages"],
+                value=resultat["page"],
+                key=cle_page
+            )
     else:
         st.info("Aucune demande ne correspond aux critères de filtrage.")
 
+    # Rapport de portefeuille : un seul jeu de boutons par page, pas un par demande
+    afficher_telechargements_portefeuille(type_credit)
+
 
 def afficher_demande_avec_colonnes(demande: Dict, type_credit: str, index: int):
     """
@@ -76,43 +98,39 @@ def afficher_demande_avec_colonnes(demande: Dict, type_credit: str, index: int):
     st.markdown("---")
 
 
-def afficher_statistiques_credit(demandes: List[Dict]):
+def afficher_statistiques_credit(statistiques: Dict):
     """
     Affiche les statistiques pour un type de crédit
 
     Args:
-        demandes (List[Dict]): Liste des demandes
+        statistiques (Dict): Indicateurs calculés par statistiques_demandes
     """
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("📋 Total", len(demandes))
+        st.metric("📋 Total", statistiques["total"])
 
     with col2:
-        en_attente = sum(1 for d in demandes if d.get("statut", "En attente") == "En attente")
-        st.metric("⏳ En attente", en_attente)
+        st.metric("⏳ En attente", statistiques["en_attente"])
 
     with col3:
-        montant_total = sum(d.get("montant", 0) for d in demandes)
-        st.metric("💰 Montant total", formater_montant(montant_total))
+        st.metric("💰 Montant total", formater_montant(statistiques["montant_total"]))
 
     with col4:
-        montant_moyen = montant_total / len(demandes) if demandes else 0
-        st.metric("📊 Montant moyen", formater_montant(montant_moyen))
+        st.metric("📊 Montant moyen", formater_montant(statistiques["montant_moyen"]))
 
 
-def afficher_filtres_credit(demandes: List[Dict], type_credit: str) -> List[Dict]:
+def afficher_filtres_credit(type_credit: str) -> Dict:
     """
-    Affiche les filtres et retourne les demandes filtrées
+    Affiche les filtres et retourne les critères de la requête
 
     Args:
-        demandes (List[Dict]): Liste des demandes
         type_credit (str): Type de crédit
 
     Returns:
-        List[Dict]: Demandes filtrées
+        Dict: Critères pour interroger_demandes (statut, texte, dates, montants, tri)
     """
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
 
     with col1:
         statut_filtre = st.selectbox(
@@ -123,23 +141,41 @@ def afficher_filtres_credit(demandes: List[Dict], type_credit: str) -> List[Dict
         )
 
     with col2:
-        recherche_nom = st.text_input(
-            "🔍 Rechercher par nom",
-            placeholder="Nom du client...",
+        recherche = st.text_input(
+            "🔍 Rechercher",
+            placeholder="Nom, email, téléphone, référence...",
             key=f"recherche_{type_credit}"
         )
 
-    # Appliquer les filtres
-    demandes_filtrees = demandes
-
-    if statut_filtre != "Tous":
-        demandes_filtrees = [d for d in demandes_filtrees if d.get("statut", "En attente") == statut_filtre]
-
-    if recherche_nom:
-        demandes_filtrees = [d for d in demandes_filtrees
-                           if recherche_nom.lower() in d.get("nom", "").lower()]
-
-    return demandes_filtrees
+    with col3:
+        tris = {
+            "Plus récentes": "date_desc",
+            "Plus anciennes": "date_asc",
+            "Montant décroissant": "montant_desc",
+            "Montant croissant": "montant_asc",
+            "Nom": "nom"
+        }
+        tri = st.selectbox("↕️ Trier par", list(tris), key=f"tri_{type_credit}")
+
+    with st.expander("📅 Période et montant"):
+        col_dates, col_montants = st.columns(2)
+        with col_dates:
+            periode = st.date_input("Période de la demande", value=(), key=f"periode_{type_credit}")
+        with col_montants:
+            montant_min = st.number_input("Montant minimum (DH)", min_value=0, value=0, step=10000,
+                                          key=f"montant_min_{type_credit}")
+            montant_max = st.number_input("Montant maximum (DH, 0 = sans limite)", min_value=0, value=0,
+                                          step=10000, key=f"montant_max_{type_credit}")
+
+    return {
+        "statut": None if statut_filtre == "Tous" else statut_filtre,
+        "texte": recherche or None,
+        "depuis": periode[0] if len(periode) > 0 else None,
+        "jusqua": periode[1] if len(periode) > 1 else None,
+        "montant_min": montant_min or None,
+        "montant_max": montant_max or None,
+        "tri": tris[tri]
+    }
 
 
 def afficher_informations_demande(demande: Dict, type_credit: str):
@@ -292,4 +328,54 @@ def afficher_actions_demande(demande: Dict, type_credit: str, index: int):
             st.info("📤 Fonctionnalité email en développement")
 
         if st.button("📊 Générer rapport", key=f"report_{demande.get('ref_demande', '')}_{index}"):
-            st.info("📋 Génération de rapport en développement")
+            generer_rapport_portefeuille_session()
+
+
+def generer_rapport_portefeuille_session():
+    """
+    Génère le rapport de portefeuille (tous les dossiers) et le garde en session
+    """
+    from backend.services.portefeuille import (
+        XLSX_DISPONIBLE,
+        generer_rapport_portefeuille,
+        generer_pdf_portefeuille
+    )
+
+    with st.spinner("📊 Agrégation de tous les dossiers..."):
+        sortie_xlsx = io.BytesIO() if XLSX_DISPONIBLE else None
+        synthese = generer_rapport_portefeuille(sortie_xlsx)
+        st.session_state.rapport_portefeuille = {
+            "pdf": generer_pdf_portefeuille(synthese),
+            "xlsx": sortie_xlsx.getvalue() if sortie_xlsx is not None else None,
+            "nb_dossiers": synthese["nb_dossiers"],
+            "date": datetime.now().strftime("%Y%m%d_%H%M")
+        }
+
+
+def afficher_telechargements_portefeuille(cle: str):
+    """
+    Boutons de téléchargement du dernier rapport de portefeuille généré
+
+    Args:
+        cle (str): Suffixe des clés des widgets (type de crédit de la page)
+    """
+    rapport = st.session_state.get("rapport_portefeuille")
+    if not rapport:
+        return
+
+    st.caption(f"Rapport de portefeuille: {rapport['nb_dossiers']} dossier(s)")
+    st.download_button(
+        "📄 Rapport PDF",
+        data=rapport["pdf"],
+        file_name=f"portefeuille_{rapport['date']}.pdf",
+        mime="application/pdf",
+        key=f"portefeuille_pdf_{cle}"
+    )
+    if rapport["xlsx"] is not None:
+        st.download_button(
+            "📊 Détail Excel",
+            data=rapport["xlsx"],
+            file_name=f"portefeuille_{rapport['date']}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=f"portefeuille_xlsx_{cle}"
+        )
@@ -5,6 +5,7 @@ import streamlit as st
 import os
 import json
 import base64
+import importlib.util
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -13,15 +14,23 @@ from backend.utils import (
     lister_fichiers_dossier,
     formater_taille_fichier,
     sauvegarder_statut_demande,
-    get_value_safe
+    get_value_safe,
+    lire_statut_traitement,
+    traitement_est_interrompu
 )
 
-# Import du module OCR (optionnel - si les dependances sont installees)
-try:
-    from backend.agent_OCR import traiter_dossier_documents
-    OCR_DISPONIBLE = True
-except ImportError:
-    OCR_DISPONIBLE = False
+# File des traitements OCR : SQLite uniquement, la pile OCR (langgraph, openai,
+# PyMuPDF, reportlab) n'est chargee que par les workers
+from backend.agent_OCR.file_attente import (
+    enfiler_traitement,
+    recuperer_jobs_orphelins,
+    compter_workers_actifs,
+    job_dossier
+)
+
+# Module OCR disponible si ses dependances sont installees (sans les importer)
+DEPENDANCES_OCR = ["langgraph", "openai", "fitz", "reportlab"]
+OCR_DISPONIBLE = all(importlib.util.find_spec(module) is not None for module in DEPENDANCES_OCR)
 
 
 def afficher_section_documents(demande: Dict, type_credit: str, index: int):
@@ -37,7 +46,7 @@ def afficher_section_documents(demande: Dict, type_credit: str, index: int):
 
     # Récupérer la liste des fichiers
     fichiers = lister_fichiers_dossier(chemin_dossier)
-    fichiers_documents = [f for f in fichiers if not f["nom"].endswith('.json')]
+    fichiers_documents = [f for f in fichiers if not f["nom"].endswith(('.json', '.jsonl'))]
 
     if not fichiers_documents:
         st.info("📄 Aucun document trouvé dans ce dossier")
@@ -106,11 +115,17 @@ def afficher_bouton_telecharger_rapport_ocr(demande: Dict, type_credit: str, key
         try:
             chemin_dossier = obtenir_chemin_dossier(demande, type_credit)
 
-            # Essayer le PDF existant
+            # PDF en cache, ou genere a la demande depuis rapport_analyse.json
+            pdf_data = None
             chemin_pdf = os.path.join(chemin_dossier, "rapport_ocr.pdf")
-            if os.path.exists(chemin_pdf):
+            if OCR_DISPONIBLE:
+                from backend.agent_OCR.rapport import obtenir_rapport_pdf
+                with st.spinner("Préparation du rapport PDF..."):
+                    pdf_data = obtenir_rapport_pdf(chemin_dossier)
+            elif os.path.exists(chemin_pdf):
                 with open(chemin_pdf, "rb") as f:
                     pdf_data = f.read()
+            if pdf_data:
                 nom_fichier = f"Rapport_OCR_{ref_demande}_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
                 st.download_button(
                     label="⬇️ Télécharger le rapport OCR (PDF)",
@@ -306,7 +321,7 @@ def afficher_visualiseur_documents_complet(demande: Dict, type_credit: str):
         return
 
     fichiers = lister_fichiers_dossier(chemin_dossier)
-    fichiers_documents = [f for f in fichiers if not f["nom"].endswith('.json')]
+    fichiers_documents = [f for f in fichiers if not f["nom"].endswith(('.json', '.jsonl'))]
 
     if not fichiers_documents:
         st.info("📄 Aucun document trouvé")
@@ -358,13 +373,31 @@ def afficher_section_traitement(demande: Dict, type_credit: str, chemin_dossier:
 
     col1, col2 = st.columns([2, 1])
 
+    # La file fait foi : un job n'est interrompu que si le worker qui le traite est mort
+    # (un rendu ou un appel d'API long laisse vieillir le heartbeat du statut sans que
+    # le worker le soit). Sans job dans la file (traitement par lot), le statut decide.
+    job = job_dossier(chemin_dossier)
+    status = (statut_traitement or {}).get("status")
+    if job is not None:
+        interrompu = job["orphelin"]
+    else:
+        interrompu = status == "queued" or traitement_est_interrompu(statut_traitement)
+    en_file = not interrompu and (job is not None or status == "processing")
+
     with col1:
         if statut_traitement:
-            status = statut_traitement.get("status", "unknown")
             if status == "completed":
                 st.success("✅ Traitement termine")
+            elif interrompu:
+                st.error("⛔ Traitement interrompu (aucun signe de vie)")
+                afficher_progression_traitement(statut_traitement)
+            elif status == "queued":
+                st.info("🕒 En file d'attente")
             elif status == "processing":
                 st.warning("⏳ Traitement en cours...")
+                afficher_progression_traitement(statut_traitement)
+            elif status == "error":
+                st.error(f"❌ {statut_traitement.get('error') or 'Echec du traitement'}")
             else:
                 st.info("📋 Aucun traitement effectue")
         else:
@@ -374,13 +407,41 @@ def afficher_section_traitement(demande: Dict, type_credit: str, chemin_dossier:
         if not OCR_DISPONIBLE:
             st.warning("⚠️ Module OCR non disponible")
             st.caption("Installez les dependances: langgraph, openai, fitz")
+            return
+
+        if interrompu:
+            if st.button("▶️ REPRENDRE", key=f"resume_{index}", type="primary"):
+                lancer_traitement_ocr(demande, chemin_dossier, reprendre=True)
+            if st.button("🔁 Tout relancer", key=f"restart_{index}"):
+                lancer_traitement_ocr(demande, chemin_dossier)
+        elif en_file:
+            if st.button("🔄 Actualiser", key=f"refresh_{index}"):
+                st.rerun()
         elif st.button("🚀 LANCER TRAITEMENT", key=f"process_{index}", type="primary"):
-            lancer_traitement_ocr(demande, type_credit, chemin_dossier, index)
+            lancer_traitement_ocr(demande, chemin_dossier)
 
+        if en_file and compter_workers_actifs() == 0:
+            st.caption("⚠️ Aucun worker OCR actif - lancer `python run_workers_ocr.py`")
 
-def lancer_traitement_ocr(demande: Dict, type_credit: str, chemin_dossier: str, index: int):
+
+def afficher_progression_traitement(statut_traitement: Dict):
     """
-    Lance le traitement OCR sur le dossier
+    Affiche l'étape et la progression publiées par le worker
+    """
+    etape = statut_traitement.get("etape")
+    pages_total = statut_traitement.get("pages_total")
+    pages_traitees = statut_traitement.get("pages_traitees") or 0
+
+    if etape:
+        st.caption(f"Étape: {etape}")
+    if pages_total:
+        st.progress(min(pages_traitees / pages_total, 1.0),
+                    text=f"{pages_traitees}/{pages_total} pages extraites")
+
+
+def lancer_traitement_ocr(demande: Dict, chemin_dossier: str, reprendre: bool = False):
+    """
+    Place le dossier dans la file des traitements OCR (executee par les workers)
     """
     if not OCR_DISPONIBLE:
         st.error("❌ Module OCR non disponible")
@@ -389,42 +450,11 @@ def lancer_traitement_ocr(demande: Dict, type_credit: str, chemin_dossier: str,
     ref_demande = demande.get('ref_demande', 'N/A')
 
     try:
-        # Sauvegarder le statut en cours
-        statut = {
-            "status": "processing",
-            "start_time": datetime.now().isoformat(),
-            "ref_demande": ref_demande
-        }
-        chemin_statut = os.path.join(chemin_dossier, "traitement_status.json")
-        with open(chemin_statut, "w", encoding='utf-8') as f:
-            json.dump(statut, f, ensure_ascii=False, indent=2)
-
-        with st.spinner("🔬 Traitement OCR en cours..."):
-            # Lancer le traitement
-            resultat = traiter_dossier_documents(chemin_dossier)
-
-            if resultat:
-                # Mettre a jour le statut
-                statut["status"] = "completed"
-                statut["end_time"] = datetime.now().isoformat()
-                statut["concordance"] = resultat.concordance
-                statut["nb_documents"] = resultat.nb_documents_analyses
-
-                with open(chemin_statut, "w", encoding='utf-8') as f:
-                    json.dump(statut, f, ensure_ascii=False, indent=2)
-
-                st.success(f"✅ Traitement termine - {resultat.nb_documents_analyses} documents analyses")
-                if resultat.concordance:
-                    st.info("✅ Toutes les informations concordent")
-                else:
-                    st.warning(f"⚠️ {len(resultat.problemes_concordance)} probleme(s) detecte(s)")
-            else:
-                statut["status"] = "error"
-                statut["error"] = "Echec du traitement"
-                with open(chemin_statut, "w", encoding='utf-8') as f:
-                    json.dump(statut, f, ensure_ascii=False, indent=2)
-                st.error("❌ Echec du traitement OCR")
+        # Libere le job orphelin d'un worker mort avant de (re)mettre en file
+        recuperer_jobs_orphelins()
 
+        job_id = enfiler_traitement(chemin_dossier, ref_demande, reprendre=reprendre)
+        st.success(f"✅ Traitement #{job_id} ajouté à la file")
         st.rerun()
 
     except Exception as e:
@@ -435,15 +465,7 @@ def get_statut_traitement(chemin_dossier: str) -> Optional[Dict]:
     """
     Récupère le statut du traitement
     """
-    chemin_statut = os.path.join(chemin_dossier, "traitement_status.json")
-    if not os.path.exists(chemin_statut):
-        return None
-
-    try:
-        with open(chemin_statut, "r", encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return None
+    return lire_statut_traitement(chemin_dossier)
 
 
 def get_icone_fichier(extension: str) -> str:
@@ -0,0 +1,14 @@
+"""
+run_ocr_lot.py - Point d'entrée pour le traitement OCR par lot
+Lancer avec: python run_ocr_lot.py [--type conso] [--statut-ocr aucun error] [-j 4]
+"""
+import sys
+import os
+
+# Ajouter le répertoire racine au path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.agent_OCR.main import main_cli
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
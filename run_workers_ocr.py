@@ -0,0 +1,21 @@
+"""
+run_workers_ocr.py - Point d'entrée pour le pool de workers OCR
+Lancer avec: python run_workers_ocr.py [--workers N]
+"""
+import sys
+import os
+
+# Ajouter le répertoire racine au path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.agent_OCR.file_attente import lancer_pool_workers
+from backend.config import NB_WORKERS_OCR
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pool de workers OCR")
+    parser.add_argument("--workers", type=int, default=NB_WORKERS_OCR, help="Nombre de processus workers")
+    args = parser.parse_args()
+
+    lancer_pool_workers(args.workers)
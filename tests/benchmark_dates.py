@@ -0,0 +1,61 @@
+"""
+tests/benchmark_dates.py - Micro-benchmark de backend/services/dates.py sur 100 000 valeurs
+Lancer avec: python tests/benchmark_dates.py
+"""
+import os
+import sys
+import time
+import random
+from datetime import date, datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.dates import parser_date, parser_dates_serie, _parser_date
+
+FORMATS_GENERATION = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d.%m.%y", "%Y/%m/%d"]
+
+
+def generer_echantillon(taille: int = 100000) -> list:
+    """Dates tirees parmi 3000 jours dans des formats varies, une valeur illisible sur 97"""
+    random.seed(0)
+    jours = [date(2020, 1, 1).toordinal() + random.randrange(2000) for _ in range(3000)]
+    echantillon = [date.fromordinal(random.choice(jours)).strftime(random.choice(FORMATS_GENERATION))
+                   for _ in range(taille)]
+    echantillon[::97] = ["illisible"] * len(echantillon[::97])
+    return echantillon
+
+
+def reference(texte):
+    # Approche precedente : jusqu'a neuf strptime par valeur
+    for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d',
+                '%d/%m/%y', '%d-%m-%y', '%d.%m.%y']:
+        try:
+            return datetime.strptime(texte.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - debut
+
+
+if __name__ == "__main__":
+    echantillon = generer_echantillon()
+
+    attendu, t_reference = chronometrer(lambda: [reference(t) for t in echantillon])
+    _parser_date.cache_clear()
+    obtenu, t_froid = chronometrer(lambda: [parser_date(t) for t in echantillon])
+    _, t_chaud = chronometrer(lambda: [parser_date(t) for t in echantillon])
+    serie, t_serie = chronometrer(lambda: parser_dates_serie(pd.Series(echantillon)))
+
+    assert obtenu == attendu
+    assert [None if pd.isna(v) else v.date() for v in serie] == attendu
+
+    for libelle, duree in (("reference (strptime x9)", t_reference), ("parser_date (cache froid)", t_froid),
+                           ("parser_date (cache chaud)", t_chaud), ("parser_dates_serie (pandas)", t_serie)):
+        print(f"{libelle:<30} {duree * 1000:9.1f} ms  ({duree / len(echantillon) * 1e6:6.2f} us/valeur)")
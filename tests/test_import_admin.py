@@ -0,0 +1,43 @@
+"""
+tests/test_import_admin.py - Budget d'import de l'application d'administration
+
+La pile OCR (langgraph, openai, PyMuPDF, reportlab) ne doit etre chargee
+qu'au premier traitement, jamais a l'import des pages d'administration.
+"""
+import os
+import sys
+import json
+import subprocess
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules de la pile OCR interdits a l'import (fitz : PyMuPDF)
+MODULES_OCR = ["langgraph", "openai", "fitz", "reportlab"]
+
+# Duree maximale de l'import (s) : environ 1,1 s mesure, 2,1 s avec la pile OCR
+BUDGET_IMPORT_S = float(os.environ.get("BUDGET_IMPORT_ADMIN_S", "2.0"))
+
+SCRIPT = f"""
+import sys, json, time
+debut = time.perf_counter()
+import frontend.admin_main
+duree = time.perf_counter() - debut
+print(json.dumps({{"duree_s": duree, "modules": [m for m in {MODULES_OCR!r} if m in sys.modules]}}))
+"""
+
+
+def _importer_admin() -> dict:
+    """Importe frontend.admin_main dans un interpreteur neuf (aucun module deja en cache)"""
+    sortie = subprocess.run([sys.executable, "-c", SCRIPT], cwd=RACINE, capture_output=True, text=True,
+                            check=True, timeout=120)
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def test_import_admin_sans_pile_ocr():
+    assert _importer_admin()["modules"] == []
+
+
+def test_import_admin_dans_le_budget():
+    # Meilleure de trois mesures : un seul import lent (disque froid) ne fait pas echouer le test
+    duree = min(_importer_admin()["duree_s"] for _ in range(3))
+    assert duree < BUDGET_IMPORT_S, f"import de frontend.admin_main en {duree:.2f} s (budget {BUDGET_IMPORT_S} s)"